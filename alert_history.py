@@ -1,53 +1,63 @@
 """Alert history tracking system."""
-import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
-import fcntl
-import tempfile
-import shutil
+from typing import Dict, List, Optional, Tuple
+from store import Store
 
-HISTORY_FILE = "alert_history.json"
+HISTORY_FILE = "alert_history.json"  # pre-log layout, imported into HISTORY_DIR on first use
+HISTORY_DIR = os.path.join("data", "alert_history")  # append-only log (see store.LogBackend)
+MAX_ALERTS_PER_USER = 1000
+
+STATS_FILE = "alert_stats.json"  # counters per user, plus ALL_USERS
+ALL_USERS = "_all"
+STATS_HOURS = 7 * 24  # hourly buckets kept
+
+_store = Store("alert_history", lambda: HISTORY_FILE, log=lambda: HISTORY_DIR, keep=MAX_ALERTS_PER_USER)
+_stats = Store("alert_stats", lambda: STATS_FILE)
 
 
 def load_history() -> Dict:
-    """Load alert history from JSON file."""
-    if not os.path.exists(HISTORY_FILE):
-        return {}
-    
-    try:
-        with open(HISTORY_FILE, 'r') as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-            try:
-                data = json.load(f)
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            return data
-    except Exception as e:
-        print(f"⚠️ Error loading history: {e}")
-        return {}
+    """Load alert history."""
+    return _store.load()
 
 
 def save_history(history: Dict):
-    """Save alert history to JSON file."""
-    try:
-        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(HISTORY_FILE) or ".")
-        try:
-            with os.fdopen(fd, "w") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                try:
-                    json.dump(history, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            shutil.move(temp_path, HISTORY_FILE)
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise e
-    except (IOError, OSError) as e:
-        print(f"⚠️ Error saving history: {e}")
+    """Save alert history."""
+    _store.save(history)
+    _stats.save(_build_stats(history))
+
+
+# ========================
+# Counters - kept up to date by log_alert(), so stats never read history
+# ========================
+
+def _count(stats: Optional[Dict], alert: Dict) -> Dict:
+    """Add one alert to a counters entry."""
+    stats = stats or {"total": 0, "by_type": {}, "by_ca": {}, "by_hour": {}}
+    stats["total"] += 1
+    for key, value in (("by_type", alert["type"]), ("by_ca", alert["ca"]), ("by_hour", alert["timestamp"][:13])):
+        stats[key][value] = stats[key].get(value, 0) + 1
+    
+    # Hour keys ("2024-01-31T13") sort by time
+    for hour in sorted(stats["by_hour"])[:-STATS_HOURS]:
+        del stats["by_hour"][hour]
+    return stats
+
+
+def _build_stats(history: Dict) -> Dict:
+    """Counters for a whole history document."""
+    stats = {ALL_USERS: {"total": 0, "by_type": {}, "by_ca": {}, "by_hour": {}}}
+    for user_id_str, alerts in history.items():
+        for alert in alerts:
+            stats[user_id_str] = _count(stats.get(user_id_str), alert)
+            _count(stats[ALL_USERS], alert)
+    return stats
+
+
+def _ensure_stats():
+    """Build the counters from history once (history logged before they existed)."""
+    if ALL_USERS not in _stats.get():
+        _stats.save(_build_stats(_store.load()))
 
 
 def log_alert(user_id: int, alert_type: str, coin_ca: str, details: Dict):
@@ -60,12 +70,6 @@ def log_alert(user_id: int, alert_type: str, coin_ca: str, details: Dict):
         coin_ca: Contract address of the coin
         details: Additional information about the alert (value, threshold, etc.)
     """
-    history = load_history()
-    
-    user_id_str = str(user_id)
-    if user_id_str not in history:
-        history[user_id_str] = []
-    
     alert_record = {
         "timestamp": datetime.now().isoformat(),
         "type": alert_type,
@@ -73,13 +77,14 @@ def log_alert(user_id: int, alert_type: str, coin_ca: str, details: Dict):
         "details": details
     }
     
-    history[user_id_str].append(alert_record)
+    _ensure_stats()
     
-    # Keep only last 1000 alerts per user to prevent bloat
-    if len(history[user_id_str]) > 1000:
-        history[user_id_str] = history[user_id_str][-1000:]
+    # One line appended; only the last MAX_ALERTS_PER_USER are kept
+    _store.append(str(user_id), alert_record)
     
-    save_history(history)
+    with _stats.batch():
+        _stats.update(str(user_id), lambda stats: _count(stats, alert_record))
+        _stats.update(ALL_USERS, lambda stats: _count(stats, alert_record))
 
 
 def get_user_history(user_id: int, limit: Optional[int] = None) -> List[Dict]:
@@ -93,21 +98,77 @@ def get_user_history(user_id: int, limit: Optional[int] = None) -> List[Dict]:
     Returns:
         List of alert records
     """
-    history = load_history()
-    user_id_str = str(user_id)
+    # Only the last `limit` records are read
+    alerts = _store.tail(str(user_id), limit or None)
     
-    if user_id_str not in history:
-        return []
+    # Return most recent first
+    return sorted(alerts, key=lambda x: x["timestamp"], reverse=True)
+
+
+def query_history(user_id: int, since: Optional[str] = None, until: Optional[str] = None,
+                  alert_type: Optional[str] = None, page_size: int = 10,
+                  cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a user's alert history, most recent first.
     
-    alerts = history[user_id_str]
+    Reads about one page of records (more with a type filter), however
+    long the history is.
     
-    # Return most recent first
-    alerts_sorted = sorted(alerts, key=lambda x: x["timestamp"], reverse=True)
+    Args:
+        user_id: Telegram user ID
+        since: Only alerts at or after this ISO timestamp
+        until: Only alerts before this ISO timestamp
+        alert_type: Only alerts of this type
+        page_size: Alerts per page
+        cursor: Returned by the previous page, to get the next one
     
-    if limit:
-        return alerts_sorted[:limit]
+    Returns:
+        (alerts, cursor for the next page - None on the last page)
+    """
+    user_id_str = str(user_id)
     
-    return alerts_sorted
+    def first_at(timestamp: str) -> int:
+        """Index of the first record at or after `timestamp` (stored oldest first)."""
+        lo, hi = 0, _store.count(user_id_str)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _store.slice(user_id_str, mid, mid + 1)[0]["timestamp"] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    end = _store.count(user_id_str)
+    if until:
+        end = min(end, first_at(until))
+    if cursor:
+        # "<timestamp>|<n>": the next page ends before the n-th record
+        # at that timestamp (records sharing it can span pages). Counted
+        # from the first such record, so trimming old records and new
+        # alerts don't move it; a bare timestamp is an older cursor
+        timestamp, sep, offset = cursor.rpartition("|")
+        if not sep:
+            timestamp, offset = cursor, "0"
+        end = min(end, first_at(timestamp) + int(offset))
+    
+    page = []
+    while end > 0 and len(page) < page_size:
+        start = max(0, end - page_size)
+        alerts = _store.slice(user_id_str, start, end)
+        for index in range(end - 1, start - 1, -1):
+            alert = alerts[index - start]
+            if since and alert["timestamp"] < since:
+                return page, None
+            if alert_type and alert["type"] != alert_type:
+                continue
+            page.append(alert)
+            if len(page) == page_size:
+                if index == 0:
+                    return page, None
+                return page, f"{alert['timestamp']}|{index - first_at(alert['timestamp'])}"
+        end = start
+    
+    return page, None
 
 
 def get_history_stats(user_id: int) -> Dict:
@@ -115,43 +176,45 @@ def get_history_stats(user_id: int) -> Dict:
     Get statistics about user's alert history.
     
     Returns:
-        Dict with total_alerts, alerts_by_type, most_alerted_coin
+        Dict with total_alerts, alerts_by_type, most_alerted_coin, alerts_by_hour
     """
-    alerts = get_user_history(user_id)
+    _ensure_stats()
+    stats = _stats.get().get(str(user_id))
     
-    if not alerts:
+    if not stats:
         return {
             "total_alerts": 0,
             "alerts_by_type": {},
-            "most_alerted_coin": None
+            "most_alerted_coin": None,
+            "alerts_by_hour": {}
         }
     
-    alerts_by_type = {}
-    coin_counts = {}
-    
-    for alert in alerts:
-        alert_type = alert["type"]
-        coin_ca = alert["ca"]
-        
-        alerts_by_type[alert_type] = alerts_by_type.get(alert_type, 0) + 1
-        coin_counts[coin_ca] = coin_counts.get(coin_ca, 0) + 1
-    
+    coin_counts = stats["by_ca"]
     most_alerted_coin = max(coin_counts.items(), key=lambda x: x[1])[0] if coin_counts else None
     
     return {
-        "total_alerts": len(alerts),
-        "alerts_by_type": alerts_by_type,
-        "most_alerted_coin": most_alerted_coin
+        "total_alerts": stats["total"],
+        "alerts_by_type": dict(stats["by_type"]),
+        "most_alerted_coin": most_alerted_coin,
+        "alerts_by_hour": dict(stats["by_hour"])
     }
 
 
+def get_global_stats() -> Dict:
+    """Alert counters across all users (alerts fired, by type, by hour)."""
+    stats = get_history_stats(ALL_USERS)
+    stats.pop("most_alerted_coin")
+    return stats
+
+
 def clear_user_history(user_id: int):
     """Clear all alert history for a user."""
-    history = load_history()
     user_id_str = str(user_id)
+    history = _store.load(user_id_str)
     
     # Use pop to safely remove - won't error if key doesn't exist
     if history.pop(user_id_str, None) is not None:
-        save_history(history)
+        _store.save(history, user_id_str)
+        _stats.update(user_id_str, lambda stats: None)  # ALL_USERS keeps counting them
         return True
     return False
@@ -15,7 +15,7 @@ from telegram.ext import (
     filters
 )
 
-from config import BOT_TOKEN, CHECK_INTERVAL
+from config import BOT_TOKEN, CHECK_INTERVAL, MONITOR_MODE, METRICS_PORT
 from ui.home import show_home, handle_home_callback
 from ui.coins import (
     show_coins_menu, 
@@ -50,7 +50,11 @@ from ui.search import start_coin_search, handle_coin_search, pause_all_coins, re
 from ui.notifications import show_notification_settings, toggle_notification
 from ui.admin import show_admin_dashboard, show_admin_users, admin_clear_cache, show_admin_stats
 from core.monitor import start_monitor
+from core.leadership import LeaderLease, run_as_leader
+from core.delivery import start_delivery
 from webhook_config import should_use_webhook, get_webhook_config, setup_webhook
+from metrics import start_metrics_server, monitor_event_loop_lag
+from store import flush as flush_store
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -251,8 +255,6 @@ async def handle_alert_config(update: Update, context: ContextTypes.DEFAULT_TYPE
             coin_data = {
                 "ca": ca,
                 "start_mc": mc,
-                "ath_mc": mc,
-                "low_mc": mc,
                 "alerts": alerts,
                 "triggered": {}
             }
@@ -368,22 +370,17 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.message.edit_text("⚠️ Invalid selection")
             return
         
-        from storage import load_data, save_data
-        data = load_data()
-        user_id_str = str(query.from_user.id)
+        from storage import get_user_coins, update_coin
+        coins = get_user_coins(query.from_user.id)
         
-        if user_id_str in data:
-            user_data = data[user_id_str]
-            coins = user_data.get("coins", []) if isinstance(user_data, dict) else user_data
-            
-            if coin_index < len(coins):
-                coin = coins[coin_index]
+        if coin_index < len(coins):
+            def toggle_reclaim(coin):
                 alerts = coin.setdefault("alerts", {})
-                current = alerts.get("reclaim", False)
-                alerts["reclaim"] = not current
-                save_data(data)
-                
-                status = "ON" if alerts["reclaim"] else "OFF"
+                alerts["reclaim"] = not alerts.get("reclaim", False)
+            
+            coin = update_coin(query.from_user.id, coins[coin_index].get("ca"), toggle_reclaim)
+            if coin:
+                status = "ON" if coin["alerts"]["reclaim"] else "OFF"
                 await query.message.reply_text(f"✅ ATH Reclaim: {status}")
         return
     
@@ -395,19 +392,15 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.message.edit_text("⚠️ Invalid selection")
             return
         
-        from storage import load_data, save_data
-        data = load_data()
-        user_id_str = str(query.from_user.id)
+        from storage import get_user_coins, update_coin
+        coins = get_user_coins(query.from_user.id)
         
-        if user_id_str in data:
-            user_data = data[user_id_str]
-            coins = user_data.get("coins", []) if isinstance(user_data, dict) else user_data
-            
-            if coin_index < len(coins):
-                coin = coins[coin_index]
+        if coin_index < len(coins):
+            def clear_alerts(coin):
                 coin["alerts"] = {}
                 coin["triggered"] = {}
-                save_data(data)
+            
+            if update_coin(query.from_user.id, coins[coin_index].get("ca"), clear_alerts):
                 await query.message.reply_text("✅ All alerts cleared")
         return
     
@@ -454,6 +447,11 @@ async def callback_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await show_alert_history(update, context)
         return
     
+    if choice.startswith("history_page_"):
+        await query.answer()
+        await show_alert_history(update, context, cursor=choice[len("history_page_"):])
+        return
+    
     if choice == "history_clear":
         await query.answer()
         await clear_history_confirm(update, context)
@@ -658,7 +656,7 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Edit alert flow
     if step == "editing_alert":
-        from storage import load_data, save_data
+        from storage import get_user_coins, update_coin
         
         alert_type = state["alert_type"]
         coin_index = state["coin_index"]
@@ -676,21 +674,13 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
             
             # Update the alert
-            data = load_data()
-            user_id_str = str(user_id)
+            coins = get_user_coins(user_id)
             
-            if user_id_str in data:
-                user_data = data[user_id_str]
-                coins = user_data.get("coins", []) if isinstance(user_data, dict) else user_data
+            if coin_index < len(coins):
+                def set_alert(coin):
+                    coin.setdefault("alerts", {})[alert_type] = value
                 
-                if coin_index < len(coins):
-                    coin = coins[coin_index]
-                    if "alerts" not in coin:
-                        coin["alerts"] = {}
-                    
-                    coin["alerts"][alert_type] = value
-                    save_data(data)
-                    
+                if update_coin(user_id, coins[coin_index].get("ca"), set_alert):
                     alert_names = {"mc": "MC Target", "pct": "% Move", "x": "X Multiple"}
                     keyboard = [
                         [InlineKeyboardButton("📋 View Coins", callback_data="coin_list")],
@@ -931,12 +921,31 @@ def main():
         ])
         print("✅ Commands registered")
         
-        # Start monitor loop
-        asyncio.create_task(start_monitor(application.bot))
-        print("✅ Monitor loop started")
+        asyncio.create_task(monitor_event_loop_lag())
+        
+        # Deliver queued alerts (from the inline monitor or a worker process)
+        asyncio.create_task(start_delivery(application.bot))
+        print("✅ Delivery loop started")
+        
+        if MONITOR_MODE == "worker":
+            print("ℹ️ Monitor runs as a separate worker process")
+        else:
+            # Start monitor loop (only on the replica holding leadership)
+            asyncio.create_task(run_as_leader(
+                LeaderLease("monitor"),
+                lambda lease: start_monitor(leader=lease)
+            ))
+            print("✅ Monitor loop started")
     
     app.post_init = post_init
     
+    # Write-behind saves still in memory go to disk before exit
+    async def post_shutdown(application):
+        flush_store()
+        print("✅ State flushed")
+    
+    app.post_shutdown = post_shutdown
+    
     # Register handlers
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("help", help_command))
@@ -945,6 +954,9 @@ def main():
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
     
     print("✅ All handlers registered")
+    
+    # Metrics run on their own thread in both polling and webhook mode
+    start_metrics_server(METRICS_PORT)
     print("=" * 50)
     
     # Check if webhook mode
@@ -44,7 +44,6 @@ from groups import (
     get_all_group_ids
 )
 from intelligence import (
-    update_coin_history,
     compute_range_position,
     detect_dump_stabilize_bounce,
     format_smart_alert,
@@ -1723,8 +1722,6 @@ def monitor_loop_sync(bot_arg):
                                 liquidity = token.get("liquidity", 0)
                                 volume_24h = token.get("volume_24h", 0)
                                 start = coin["start_mc"]
-
-                                coin = update_coin_history(coin, mc, volume_24h, liquidity)
                                 
                                 if should_suppress_alert(coin, "default", user_mode):
                                     continue
@@ -1875,9 +1872,6 @@ async def monitor_loop(app):
                             liquidity = token.get("liquidity", 0)
                             volume_24h = token.get("volume_24h", 0)
                             start = coin["start_mc"]
-
-                            # UPDATE INTELLIGENCE LAYER
-                            coin = update_coin_history(coin, mc, volume_24h, liquidity)
                             
                             dd = ((start - mc) / start) * 100
                             x = mc / start
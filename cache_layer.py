@@ -2,6 +2,7 @@
 import json
 from typing import Optional, Dict
 import time
+from metrics import cache_requests_total
 
 try:
     import redis  # type: ignore
@@ -136,7 +137,9 @@ cache = CacheLayer()
 
 def get_cached_market_data(ca: str) -> Optional[Dict]:
     """Get cached market data for contract address."""
-    return cache.get(f"market:{ca}")
+    value = cache.get(f"market:{ca}")
+    cache_requests_total.inc(result="hit" if value else "miss")
+    return value
 
 
 def cache_market_data(ca: str, data: Dict, ttl: int = 30):
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Snapshot Codec - Compact binary files for the hot documents (see store.py)
+
+A snapshot is an 8-byte header followed by the body:
+
+    magic b"TRSN" | schema version (u8) | body format (u8) | reserved (u16)
+
+The body is msgpack when the msgpack package is installed, else compact
+UTF-8 JSON (the C parser reads it far faster than pretty-printed JSON,
+and the pretty printer is the slow part of saving). decode() reads either
+format, and plain JSON files written before snapshots existed.
+
+Debugging:
+    python codec.py export <snapshot> [out.json]   # pretty JSON (stdout if no out)
+    python codec.py import <in.json> <snapshot>    # JSON back into a snapshot
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Optional
+
+try:
+    import msgpack  # type: ignore
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MAGIC = b"TRSN"
+SCHEMA_VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+
+FORMAT_MSGPACK = 1
+FORMAT_JSON = 2
+
+
+def encode(data: Any, body_format: Optional[int] = None) -> bytes:
+    """
+    Encode a document as a snapshot.
+
+    Args:
+        data: JSON-compatible value
+        body_format: FORMAT_MSGPACK or FORMAT_JSON (default: msgpack if installed)
+    """
+    if body_format is None:
+        body_format = FORMAT_MSGPACK if MSGPACK_AVAILABLE else FORMAT_JSON
+    if body_format == FORMAT_MSGPACK:
+        body = msgpack.packb(data, use_bin_type=True)
+    else:
+        body = json.dumps(data, separators=(",", ":")).encode()
+    return HEADER.pack(MAGIC, SCHEMA_VERSION, body_format, 0) + body
+
+
+def decode(blob: bytes) -> Any:
+    """
+    Decode a snapshot, or a plain JSON file.
+
+    Raises:
+        ValueError: Corrupt data, a newer schema, or msgpack needed but missing
+    """
+    if not blob.startswith(MAGIC):
+        return json.loads(blob)
+    if len(blob) < HEADER.size:
+        raise ValueError("Truncated snapshot header")
+
+    _, version, body_format, _ = HEADER.unpack_from(blob)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Snapshot schema v{version} is newer than this code (v{SCHEMA_VERSION})")
+    body = memoryview(blob)[HEADER.size:]
+    if body_format == FORMAT_MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("Snapshot is msgpack but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if body_format == FORMAT_JSON:
+        return json.loads(bytes(body))
+    raise ValueError(f"Unknown snapshot body format {body_format}")
+
+
+def is_snapshot(blob: bytes) -> bool:
+    return blob.startswith(MAGIC)
+
+
+def _write(path: str, blob: bytes):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+if __name__ == "__main__":
+    command, args = sys.argv[1:2], sys.argv[2:]
+    if command == ["export"] and len(args) in (1, 2):
+        with open(args[0], "rb") as f:
+            text = json.dumps(decode(f.read()), indent=2)
+        if len(args) == 2:
+            _write(args[1], text.encode())
+            print(f"✅ Exported {args[0]} to {args[1]}")
+        else:
+            print(text)
+    elif command == ["import"] and len(args) == 2:
+        with open(args[0], "rb") as f:
+            _write(args[1], encode(decode(f.read())))
+        print(f"✅ Imported {args[0]} into {args[1]}")
+    else:
+        print("Usage: python codec.py export <snapshot> [out.json]\n"
+              "       python codec.py import <in.json> <snapshot>")
+        sys.exit(1)
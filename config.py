@@ -4,3 +4,66 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", 60))
 BIRDEYE_API_KEY = os.getenv("BIRDEYE_API_KEY", "PASTE_YOUR_BIRDEYE_KEY")
 CHAIN = "solana"
+
+# "inline" runs the monitor inside the bot process,
+# "worker" expects a separate `python -m core.monitor_worker` process
+MONITOR_MODE = os.getenv("MONITOR_MODE", "inline")
+
+# Port for the Prometheus /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+
+# How often the monitor wakes to fetch CAs that are due (seconds).
+# Per-plan freshness targets live in plans.POLL_INTERVALS.
+MONITOR_TICK = float(os.getenv("MONITOR_TICK", 5))
+
+# Sharded monitor workers: each worker owns MONITOR_SHARD_ID of MONITOR_SHARDS
+# (see core/sharding.py). 1 shard = a single worker tracks everything.
+MONITOR_SHARDS = int(os.getenv("MONITOR_SHARDS", 1))
+MONITOR_SHARD_ID = int(os.getenv("MONITOR_SHARD_ID", 0))
+
+# Monitor pipeline concurrency (see core/monitor.py). The evaluator is
+# always a single worker because it owns the coin state.
+PIPELINE_FETCHERS = int(os.getenv("PIPELINE_FETCHERS", 4))
+PIPELINE_FORMATTERS = int(os.getenv("PIPELINE_FORMATTERS", 1))
+PIPELINE_DELIVERERS = int(os.getenv("PIPELINE_DELIVERERS", 2))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 500))
+
+# Recent quotes kept per CA for pattern alerts (see core/ticks.py):
+# samples older than TICK_WINDOW seconds expire, at most TICK_RING_SIZE kept.
+TICK_WINDOW = int(os.getenv("TICK_WINDOW", 1200))
+TICK_RING_SIZE = int(os.getenv("TICK_RING_SIZE", 512))
+
+# Where every JSON-backed document lives (see store.py): "json" (one file
+# each), "sqlite" (STATE_DB) or "redis" (REDIS_URL). Run
+# `python store.py migrate sqlite|redis` once before switching.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# User state on JSON storage goes through a write-ahead log (see
+# store.WALBackend): each change is appended and fsynced, and the log is
+# folded into data/users/ once it reaches WAL_COMPACT_BYTES.
+WAL_ENABLED = os.getenv("WAL_ENABLED", "1") == "1"
+WAL_FSYNC = os.getenv("WAL_FSYNC", "1") == "1"  # one fsync per commit (a Store.batch() is one commit)
+WAL_COMPACT_BYTES = int(os.getenv("WAL_COMPACT_BYTES", 1_000_000))
+
+# When saves reach disk (see store.py): "strict" writes every save before
+# returning; "grouped" collects saves in memory and writes each changed
+# store at most every STORE_FLUSH_MS with one fsync; "relaxed" is grouped
+# without fsync (a power cut can lose the last few seconds of changes).
+STORE_DURABILITY = os.getenv("STORE_DURABILITY", "grouped")
+STORE_FLUSH_MS = int(os.getenv("STORE_FLUSH_MS", 200))
+
+# File format of the hot documents on JSON storage (coins, lists, groups):
+# "binary" writes compact .snap snapshots (see codec.py; msgpack if installed),
+# "json" pretty-printed JSON. Either is read back, so it can be switched.
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "binary")
+
+# Alert history is an append-only log in data/alert_history/ (see
+# store.LogBackend), split into segments of this size.
+LOG_SEGMENT_BYTES = int(os.getenv("LOG_SEGMENT_BYTES", 4_000_000))
+
+# Every quote the monitor fetches is archived per CA and UTC day in
+# TICK_ARCHIVE_DIR/<day>/<ca>.ticks (see core/archive.py). Days older than
+# TICK_ARCHIVE_DAYS are deleted; 0 turns the archive off.
+TICK_ARCHIVE_DIR = os.getenv("TICK_ARCHIVE_DIR", os.path.join("data", "ticks"))
+TICK_ARCHIVE_DAYS = int(os.getenv("TICK_ARCHIVE_DAYS", 30))
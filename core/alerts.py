@@ -6,6 +6,7 @@ No UI. No Telegram. Just "should we alert?"
 
 from typing import Optional, Tuple
 from intelligence import (
+    coin_history,
     detect_dump_stabilize_bounce,
     format_smart_alert,
     should_suppress_alert,
@@ -17,6 +18,9 @@ from intelligence import (
 class AlertEngine:
     """Evaluate if alerts should fire - pure logic"""
     
+    # Always-on checks that compare the quote with the CA's tick history
+    AUTOMATIC_ALERTS = ("bounce", "volume_spike", "liquidity_drop")
+    
     @staticmethod
     def should_alert_mc(coin: dict, current_mc: float) -> Tuple[bool, Optional[str]]:
         """Check if MC alert should fire."""
@@ -116,7 +120,7 @@ class AlertEngine:
     @staticmethod
     def should_alert_volume_spike(coin: dict, current_volume: float) -> Tuple[bool, Optional[str]]:
         """Check if volume spike alert should fire."""
-        history = coin.get("history", [])
+        history = coin_history(coin)
         triggered = coin.get("triggered", {})
         
         if triggered.get("volume_spike"):
@@ -125,8 +129,9 @@ class AlertEngine:
         if len(history) < 3:
             return False, None
         
-        # Calculate average volume from history
-        avg_volume = sum(h.get("volume_24h", 0) for h in history[-5:]) / min(len(history), 5)
+        # Average volume of the (up to 5) quotes before this one
+        volumes = history.last(6).column("volume")[:-1]
+        avg_volume = sum(volumes) / len(volumes)
         
         if avg_volume > 0 and current_volume > avg_volume * 3:  # 3x volume spike
             msg = (
@@ -143,7 +148,7 @@ class AlertEngine:
     @staticmethod
     def should_alert_liquidity_change(coin: dict, current_liquidity: float) -> Tuple[bool, Optional[str]]:
         """Check if liquidity change alert should fire."""
-        history = coin.get("history", [])
+        history = coin_history(coin)
         triggered = coin.get("triggered", {})
         
         if triggered.get("liquidity_drop"):
@@ -152,7 +157,8 @@ class AlertEngine:
         if len(history) < 2:
             return False, None
         
-        prev_liquidity = history[-1].get("liquidity", current_liquidity)
+        # The quote before this one (the newest sample is this quote)
+        prev_liquidity = history.last(2).column("liquidity")[0]
         
         if prev_liquidity > 0:
             change_pct = ((current_liquidity - prev_liquidity) / prev_liquidity) * 100
@@ -185,10 +191,14 @@ class AlertEngine:
         return False, None
     
     @staticmethod
-    def evaluate_all(coin: dict, current_mc: float, volume_24h: float, user_mode: str = "aggressive", liquidity: float = 0) -> list:
+    def evaluate_all(coin: dict, current_mc: float, volume_24h: float, user_mode: str = "aggressive",
+                     liquidity: float = 0, history: bool = True) -> list:
         """
         Evaluate all alerts for a coin.
         Returns list of (alert_type, message) tuples that should fire.
+        
+        history=False skips the AUTOMATIC_ALERTS: they take the newest
+        history sample to be this quote, which is wrong when it was shed.
         """
         alerts_to_fire = []
         
@@ -196,20 +206,21 @@ class AlertEngine:
         if should_suppress_alert(coin, "default", user_mode):
             return []
         
-        # Bounce (highest priority - pattern detection)
-        should_alert, msg = AlertEngine.should_alert_bounce(coin, current_mc, volume_24h, user_mode)
-        if should_alert:
-            alerts_to_fire.append(("bounce", msg))
-        
-        # Volume spike
-        should_alert, msg = AlertEngine.should_alert_volume_spike(coin, volume_24h)
-        if should_alert:
-            alerts_to_fire.append(("volume_spike", msg))
-        
-        # Liquidity change
-        should_alert, msg = AlertEngine.should_alert_liquidity_change(coin, liquidity)
-        if should_alert:
-            alerts_to_fire.append(("liquidity_drop", msg))
+        if history:
+            # Bounce (highest priority - pattern detection)
+            should_alert, msg = AlertEngine.should_alert_bounce(coin, current_mc, volume_24h, user_mode)
+            if should_alert:
+                alerts_to_fire.append(("bounce", msg))
+            
+            # Volume spike
+            should_alert, msg = AlertEngine.should_alert_volume_spike(coin, volume_24h)
+            if should_alert:
+                alerts_to_fire.append(("volume_spike", msg))
+            
+            # Liquidity change
+            should_alert, msg = AlertEngine.should_alert_liquidity_change(coin, liquidity)
+            if should_alert:
+                alerts_to_fire.append(("liquidity_drop", msg))
         
         # MC target
         should_alert, msg = AlertEngine.should_alert_mc(coin, current_mc)
@@ -232,3 +243,72 @@ class AlertEngine:
             alerts_to_fire.append(("reclaim", msg))
         
         return alerts_to_fire
+    
+    @staticmethod
+    def armed_alerts(coin: dict) -> list:
+        """User-configured alerts (incl. combos) that haven't fired yet."""
+        alerts = coin.get("alerts", {})
+        triggered = coin.get("triggered", {})
+        combo_triggered = coin.get("combo_triggered", {})
+        
+        armed = [t for t, value in alerts.items() if value and not triggered.get(t)]
+        armed += [
+            f"combo_{t}" for t, value in coin.get("combo_alerts", {}).items()
+            if value and not combo_triggered.get(t)
+        ]
+        return armed
+    
+    @staticmethod
+    def needs_history(coin: dict) -> bool:
+        """Whether a quote must go into the CA's history for this coin (see evaluate_all)."""
+        triggered = coin.get("triggered", {})
+        return bool(AlertEngine.armed_alerts(coin)) or not all(triggered.get(t) for t in AlertEngine.AUTOMATIC_ALERTS)
+    
+    @staticmethod
+    def threshold_distance(coin: dict, current_mc: float) -> Optional[float]:
+        """
+        How far the coin is from its nearest armed price alert, as a
+        fraction of the threshold (0 = at the threshold).
+        
+        Returns None if no armed alert is price based (combos, or none armed).
+        """
+        alerts = coin.get("alerts", {})
+        triggered = coin.get("triggered", {})
+        start_mc = coin.get("start_mc", 0)
+        distances = []
+        
+        if current_mc <= 0:
+            return 0.0
+        
+        if "mc" in alerts and not triggered.get("mc") and alerts["mc"] > 0:
+            distances.append((current_mc - alerts["mc"]) / alerts["mc"])
+        
+        if "x" in alerts and not triggered.get("x") and start_mc > 0:
+            target = start_mc * alerts["x"]
+            distances.append((target - current_mc) / target)
+        
+        if "pct" in alerts and not triggered.get("pct") and start_mc > 0 and alerts["pct"]:
+            pct_change = abs(current_mc - start_mc) / start_mc * 100
+            distances.append((alerts["pct"] - pct_change) / alerts["pct"])
+        
+        if alerts.get("reclaim") and not triggered.get("reclaim"):
+            reclaim_level = coin.get("ath_mc", current_mc) * 0.95
+            if reclaim_level > 0:
+                distances.append((reclaim_level - current_mc) / reclaim_level)
+        
+        if not distances:
+            return None
+        
+        return max(0.0, min(distances))
+    
+    @staticmethod
+    def evaluate_quote(coin: dict, quote, user_mode: str = "aggressive", history: bool = True) -> list:
+        """
+        Evaluate all alerts for a coin against a MarketQuote from the cycle snapshot.
+        Returns list of (alert_type, message) tuples that should fire.
+        
+        history: Whether the quote was recorded in the CA's history
+        """
+        return AlertEngine.evaluate_all(
+            coin, quote.mc, quote.volume_24h, user_mode, quote.liquidity, history
+        )
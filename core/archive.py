@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tick Archive - Every fetched quote on disk, per CA and UTC day
+
+<ARCHIVE_DIR>/<YYYY-MM-DD>/<ca>.ticks holds fixed-width records of four
+little-endian doubles (ts, mc, volume, liquidity), appended in time order.
+Scans mmap the day files and read each field as a strided view, so a
+range is found by binary search without parsing or copying the file.
+Nothing here touches the live state files.
+
+Each CA's files must have a single writer: appends from two processes
+would interleave out of time order (breaking the binary search) and
+each one's torn-tail cut could clip the other's record. The monitor
+only archives CAs its shard owns (see core.sharding).
+
+Usage: python -m core.archive <ca> [hours]   (CSV of the last hours, default 24)
+"""
+
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from config import TICK_ARCHIVE_DAYS, TICK_ARCHIVE_DIR
+
+FIELDS = ("ts", "mc", "volume", "liquidity")
+RECORD = struct.Struct("<" + "d" * len(FIELDS))
+
+ARCHIVE_DIR = TICK_ARCHIVE_DIR
+
+_pending: Dict[str, bytearray] = {}  # day file -> records not yet written
+_lock = threading.Lock()
+_pruned_day: Optional[str] = None
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _path(day: str, ca: str) -> str:
+    return os.path.join(ARCHIVE_DIR, day, re.sub(r"[^A-Za-z0-9_-]", "_", ca) + ".ticks")
+
+
+def record(ca: str, ts: float, mc: float, volume: float, liquidity: float):
+    """Queue a quote for the archive (written by flush()); only the CA's owning shard may call this."""
+    if TICK_ARCHIVE_DAYS <= 0:
+        return
+    packed = RECORD.pack(ts, mc, volume, liquidity)
+    with _lock:
+        _pending.setdefault(_path(_day(ts), ca), bytearray()).extend(packed)
+
+
+def flush() -> int:
+    """
+    Append queued quotes to their day files.
+
+    Returns:
+        Number of records written
+    """
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+
+    written = 0
+    for path, records in pending.items():
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                # A crash mid-record leaves a torn tail: cut it so
+                # records stay aligned (safe only because each CA has a
+                # single writer, see the module docstring)
+                size = os.fstat(fd).st_size
+                if size % RECORD.size:
+                    os.ftruncate(fd, size - size % RECORD.size)
+                os.write(fd, records)
+            finally:
+                os.close(fd)
+            written += len(records) // RECORD.size
+        except OSError as e:
+            print(f"⚠️ Tick archive write failed for {path}: {e}")
+
+    _prune()
+    return written
+
+
+def _prune():
+    """Delete day directories older than TICK_ARCHIVE_DAYS (once per day)."""
+    global _pruned_day
+    today = _day(time.time())
+    if _pruned_day == today or not os.path.isdir(ARCHIVE_DIR):
+        return
+    _pruned_day = today
+
+    oldest = _day(time.time() - TICK_ARCHIVE_DAYS * 86400)
+    for day in os.listdir(ARCHIVE_DIR):
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", day) and day < oldest:
+            shutil.rmtree(os.path.join(ARCHIVE_DIR, day), ignore_errors=True)
+
+
+def _first_at(ts, count: int, t: float) -> int:
+    """Index of the first record with ts >= t (records are in time order)."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if ts[mid] < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _scan_file(path: str, since: float, until: float, out: Dict[str, List[float]]):
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        count = os.fstat(f.fileno()).st_size // RECORD.size
+        if not count:
+            return
+        with mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ) as m:
+            width = len(FIELDS)
+            with memoryview(m) as raw, raw.cast("d") as values, values[0::width] as ts:
+                start, stop = _first_at(ts, count, since), _first_at(ts, count, until)
+                for i, field in enumerate(FIELDS):
+                    with values[start * width + i:stop * width:width] as column:
+                        out[field] += column.tolist()
+
+
+def scan(ca: str, since: float, until: Optional[float] = None) -> Dict[str, List[float]]:
+    """
+    Archived quotes for a CA with since <= ts < until, oldest first.
+
+    Returns:
+        {"ts": [...], "mc": [...], "volume": [...], "liquidity": [...]}
+        (queued quotes not flushed yet are not included)
+    """
+    until = time.time() if until is None else until
+    out = {field: [] for field in FIELDS}
+    day = datetime.fromtimestamp(since, timezone.utc).date()
+    last = datetime.fromtimestamp(until, timezone.utc).date()
+    while day <= last:
+        _scan_file(_path(day.isoformat(), ca), since, until, out)
+        day += timedelta(days=1)
+    return out
+
+
+def retained(ca: str) -> Dict[str, List[float]]:
+    """Every archived quote still kept for a CA (the last TICK_ARCHIVE_DAYS)."""
+    return scan(ca, time.time() - TICK_ARCHIVE_DAYS * 86400)
+
+
+if __name__ == "__main__":
+    if not sys.argv[1:2]:
+        print("Usage: python -m core.archive <ca> [hours]")
+        sys.exit(1)
+
+    hours = float(sys.argv[2]) if sys.argv[2:3] else 24
+    columns = scan(sys.argv[1], time.time() - hours * 3600)
+    print(",".join(FIELDS))
+    for row in zip(*(columns[field] for field in FIELDS)):
+        print(",".join(f"{value:.6f}" if field == "ts" else f"{value:g}" for field, value in zip(FIELDS, row)))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Alert Coalescer - Merge a chat's pending alerts into digests
+Pure formatting. No I/O.
+
+When a token rips one chat can get volume_spike, pct, x and reclaim
+in the same cycle. Sending them as one message saves API calls and
+keeps us under Telegram's per-chat limits.
+"""
+
+import html
+from typing import Dict, List
+
+TELEGRAM_MAX_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+HEADER_RESERVE = 40  # room kept for the "🔔 N ALERTS (i/n)" header
+
+
+def _split_text(text: str, limit: int) -> List[str]:
+    """Split text on line boundaries so each piece fits in `limit`."""
+    pieces = []
+    current = ""
+
+    for line in text.split("\n"):
+        # A single line longer than the limit gets hard-split
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pieces.append(current)
+            current = line
+        else:
+            current = candidate
+
+    if current:
+        pieces.append(current)
+
+    return pieces
+
+
+def build_digests(rows: List[Dict]) -> List[Dict]:
+    """
+    Merge outbox rows for one chat into as few messages as possible.
+
+    Args:
+        rows: Outbox rows (text, parse_mode, disable_notification, id),
+            oldest first
+
+    Returns:
+        List of digests, each with text, parse_mode, disable_notification
+        and row_ids (rows fully delivered once this digest is sent)
+    """
+    if not rows:
+        return []
+
+    # Only plain and HTML alerts can be merged safely
+    mergeable = [row for row in rows if row.get("parse_mode") in (None, "HTML")]
+    standalone = [row for row in rows if row.get("parse_mode") not in (None, "HTML")]
+    if len(mergeable) == 1:
+        standalone += mergeable
+        mergeable = []
+
+    digests = [
+        {
+            "text": row["text"],
+            "parse_mode": row.get("parse_mode"),
+            "disable_notification": bool(row.get("disable_notification")),
+            "row_ids": [row["id"]]
+        }
+        for row in standalone
+    ]
+
+    if not mergeable:
+        return digests
+
+    use_html = any(row.get("parse_mode") == "HTML" for row in mergeable)
+    silent = all(row.get("disable_notification") for row in mergeable)
+    limit = TELEGRAM_MAX_LENGTH - HEADER_RESERVE
+
+    # Pack alerts into chunks, keeping each alert whole where possible
+    chunks = []  # [text, row_ids]
+    current_text = ""
+    current_ids = []
+
+    for row in mergeable:
+        text = row["text"]
+        if use_html and row.get("parse_mode") != "HTML":
+            text = html.escape(text)
+
+        pieces = _split_text(text, limit)
+        for i, piece in enumerate(pieces):
+            is_last_piece = i == len(pieces) - 1
+            candidate = f"{current_text}{DIGEST_SEPARATOR}{piece}" if current_text else piece
+
+            if len(candidate) > limit and current_text:
+                chunks.append((current_text, current_ids))
+                current_text, current_ids = piece, []
+            else:
+                current_text = candidate
+
+            if is_last_piece:
+                current_ids.append(row["id"])
+
+    if current_text:
+        chunks.append((current_text, current_ids))
+
+    total = len(chunks)
+    for index, (text, row_ids) in enumerate(chunks, 1):
+        header = f"🔔 {len(mergeable)} ALERTS"
+        if total > 1:
+            header += f" ({index}/{total})"
+
+        digests.append({
+            "text": f"{header}\n\n{text}",
+            "parse_mode": "HTML" if use_html else None,
+            "disable_notification": silent,
+            "row_ids": row_ids
+        })
+
+    return digests
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Alert Delivery - Drains the outbox into Telegram
+Runs inside the bot process. No evaluation logic.
+
+Respects Telegram's bot limits:
+- ~30 messages/second overall
+- ~1 message/second per private chat
+- 20 messages/minute per group
+
+Different chats are delivered in parallel, so a burst of alerts
+drains as fast as Telegram allows without one chat holding up others.
+Alerts waiting for the same chat are merged into digests first.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from core.coalescer import build_digests
+from core.leadership import LeaderLease, run_as_leader
+from core.outbox import (
+    fetch_pending,
+    mark_sent,
+    mark_retry,
+    mark_dead,
+    purge_delivered
+)
+from rate_limiter import RateLimiter
+from metrics import (
+    alerts_delivered_total,
+    messages_sent_total,
+    delivery_failures_total
+)
+
+POLL_INTERVAL = 0.5  # seconds between outbox checks
+BATCH_SIZE = 200  # rows pulled from the outbox per check
+
+GLOBAL_RATE = 30.0  # messages/second across all chats
+PRIVATE_CHAT_RATE = 1.0  # messages/second per private chat
+GROUP_CHAT_RATE = 20 / 60  # messages/second per group
+
+COALESCE_WINDOW = 2.0  # seconds to wait for more alerts to the same chat
+
+PURGE_EVERY = 1200  # loops between cleanup of delivered rows (~10 min)
+
+
+def is_group_chat(chat_id) -> bool:
+    """Group and channel chat IDs are negative."""
+    return str(chat_id).startswith("-")
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """retry_after is an int on older PTB releases and a timedelta on newer ones."""
+    delay = error.retry_after
+    if hasattr(delay, "total_seconds"):
+        delay = delay.total_seconds()
+    return float(delay)
+
+
+class DeliveryWorker:
+    """Rate-aware outbox consumer with one send queue per chat."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.global_limiter = RateLimiter(GLOBAL_RATE, burst=GLOBAL_RATE, name="telegram_global")
+        self.chat_limiters = {}
+        self.chat_queues = {}
+        self.chat_tasks = {}
+        self.in_flight = set()
+
+    def _chat_limiter(self, chat_id: str) -> RateLimiter:
+        """Per-chat token bucket (no burst - Telegram counts every message)."""
+        limiter = self.chat_limiters.get(chat_id)
+        if limiter is None:
+            rate = GROUP_CHAT_RATE if is_group_chat(chat_id) else PRIVATE_CHAT_RATE
+            limiter = RateLimiter(rate, burst=1.0, name="telegram_chat")
+            self.chat_limiters[chat_id] = limiter
+        return limiter
+
+    def _dispatch(self, row: dict):
+        """Hand a row to its chat's queue, starting a sender if idle."""
+        chat_id = row["chat_id"]
+        self.in_flight.add(row["id"])
+        self.chat_queues.setdefault(chat_id, deque()).append(row)
+
+        task = self.chat_tasks.get(chat_id)
+        if task is None or task.done():
+            self.chat_tasks[chat_id] = asyncio.create_task(self._drain_chat(chat_id))
+
+    async def _drain_chat(self, chat_id: str):
+        """Send everything queued for one chat, merged into digests."""
+        queue = self.chat_queues[chat_id]
+        limiter = self._chat_limiter(chat_id)
+
+        while queue:
+            # Give alerts from the same cycle a moment to arrive
+            age = time.time() - queue[0]["created_at"]
+            if age < COALESCE_WINDOW:
+                await asyncio.sleep(COALESCE_WINDOW - age)
+
+            rows = list(queue)
+            queue.clear()
+
+            try:
+                for digest in build_digests(rows):
+                    await self._send(chat_id, digest, rows, limiter)
+            except Exception as e:
+                print(f"Delivery error for chat {chat_id}: {e}")
+            finally:
+                for row in rows:
+                    self.in_flight.discard(row["id"])
+
+        self.chat_queues.pop(chat_id, None)
+        self.chat_tasks.pop(chat_id, None)
+
+    async def _send(self, chat_id: str, digest: dict, rows: list, limiter: RateLimiter):
+        """Send one digest, honouring flood waits."""
+        row_ids = digest["row_ids"]
+
+        while True:
+            await limiter.acquire_async()
+            await self.global_limiter.acquire_async()
+
+            try:
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=digest["text"],
+                    disable_notification=digest["disable_notification"],
+                    parse_mode=digest["parse_mode"]
+                )
+            except RetryAfter as e:
+                # Telegram told us exactly how long to back off this chat
+                delay = _retry_after_seconds(e)
+                delivery_failures_total.inc(reason="flood_wait")
+                print(f"⏳ Flood wait {delay:.0f}s for chat {chat_id}")
+                await asyncio.sleep(delay)
+                continue
+            except (Forbidden, BadRequest) as e:
+                # Bot blocked / chat gone / malformed message - retrying won't help
+                delivery_failures_total.inc(reason="rejected")
+                for row_id in row_ids:
+                    mark_dead(row_id, str(e))
+                return
+            except NetworkError as e:
+                attempts = max((row.get("attempts", 0) for row in rows if row["id"] in row_ids), default=0)
+                delay = min(2 ** (attempts + 1), 300)
+                delivery_failures_total.inc(reason="network")
+                for row_id in row_ids:
+                    mark_retry(row_id, delay, str(e))
+                return
+
+            mark_sent(row_ids)
+            messages_sent_total.inc()
+            alerts_delivered_total.inc(len(row_ids))
+            return
+
+    async def run(self, lease: Optional[LeaderLease] = None):
+        """Poll the outbox forever (or until `lease` is lost)."""
+        print("📬 Delivery loop running...")
+        loops = 0
+
+        while True:
+            if lease and not lease.is_leader():
+                print("⚠️ No longer delivery leader - stopping delivery loop")
+                return
+
+            try:
+                for row in fetch_pending(BATCH_SIZE, exclude_ids=self.in_flight):
+                    self._dispatch(row)
+
+                loops += 1
+                if loops % PURGE_EVERY == 0:
+                    purge_delivered()
+
+            except Exception as e:
+                print(f"Delivery loop error: {e}")
+
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+async def start_delivery(bot: Bot):
+    """
+    Deliver queued alerts forever.
+
+    Only one replica delivers at a time, so alerts aren't sent twice
+    when several bot processes share an outbox.
+    """
+    await run_as_leader(
+        LeaderLease("delivery"),
+        lambda lease: DeliveryWorker(bot).run(lease)
+    )
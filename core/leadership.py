@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Monitor Leadership - Only one replica monitors at a time
+
+Every bot replica (or unsharded worker) competes for one exclusive flock.
+The holder runs the monitor; the others serve UI and stand by, retrying
+every LEADER_POLL seconds. The OS drops the lock the moment a leader
+dies, so failover happens well inside one monitor tick.
+
+Each new leader gets a higher fencing token. State writes made under
+leadership go through fenced_write(), which rejects a token lower than
+the highest one already written - a stalled ex-leader can't overwrite
+what its successor saved.
+"""
+
+import asyncio
+import fcntl
+import os
+import tempfile
+from typing import Awaitable, Callable, Optional
+
+LEASE_DIR = os.getenv("LEASE_DIR", "monitor_leases")
+LEADER_POLL = 1.0  # seconds between standby attempts to take leadership
+
+
+class StaleLeaderError(Exception):
+    """A write carried a fencing token older than one already used."""
+
+
+def _read_int(path: str) -> int:
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def fenced_write(path: str, token: int, write: Callable[[], None]):
+    """
+    Run `write` only if `token` is the newest fencing token seen for `path`.
+
+    Args:
+        path: File being written (its token lives in path + ".fence")
+        token: Writer's fencing token
+        write: Performs the actual save
+
+    Raises:
+        StaleLeaderError: A newer leader has already written this file
+    """
+    with open(path + ".fence", "a+") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            content = f.read().strip()
+            highest = int(content) if content.isdigit() else 0
+
+            if token < highest:
+                raise StaleLeaderError(f"fencing token {token} < {highest} for {path}")
+
+            write()
+
+            f.seek(0)
+            f.truncate()
+            f.write(str(token))
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LeaderLease:
+    """Exclusive leadership lock plus a monotonically increasing fencing token."""
+
+    def __init__(self, name: str = "monitor", lease_dir: Optional[str] = None):
+        self.lease_dir = lease_dir or LEASE_DIR
+        self.lock_path = os.path.join(self.lease_dir, f"{name}.leader")
+        self.token_path = os.path.join(self.lease_dir, f"{name}.token")
+        self.fd = None
+        self.token = 0
+        os.makedirs(self.lease_dir, exist_ok=True)
+
+    def try_acquire(self) -> bool:
+        """Take leadership if nobody holds it. Bumps the fencing token."""
+        if self.fd is not None:
+            return True
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self.fd = fd
+        self.token = _read_int(self.token_path) + 1
+
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.lease_dir)
+        with os.fdopen(tmp_fd, "w") as f:
+            f.write(str(self.token))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.token_path)
+        return True
+
+    def is_leader(self) -> bool:
+        """Still holding the lock, and nobody newer has taken over."""
+        return self.fd is not None and _read_int(self.token_path) == self.token
+
+    def fenced(self, path: str, write: Callable[[], None]):
+        """fenced_write() with this lease's token."""
+        fenced_write(path, self.token, write)
+
+    def release(self):
+        """Give up leadership."""
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+async def run_as_leader(lease: LeaderLease, run: Callable[[LeaderLease], Awaitable[None]], poll: float = LEADER_POLL):
+    """
+    Run `run(lease)` whenever this replica is leader, forever.
+
+    `run` should return (or raise StaleLeaderError) once
+    lease.is_leader() is False; we then go back to standing by.
+    """
+    standing_by = False
+
+    while True:
+        if lease.try_acquire():
+            standing_by = False
+            print(f"👑 Monitor leadership acquired (fencing token {lease.token})")
+            try:
+                await run(lease)
+            except StaleLeaderError as e:
+                print(f"⚠️ Lost leadership: {e}")
+            finally:
+                lease.release()
+        elif not standing_by:
+            standing_by = True
+            print("⏸️ Another replica is monitoring - standing by")
+
+        await asyncio.sleep(poll)
@@ -1,5 +1,7 @@
 """Format meta alert messages."""
 
+import meta_engine
+
 
 def format_meta_alert(result: dict) -> str:
     """
@@ -52,5 +54,8 @@ def format_meta_alert(result: dict) -> str:
         
         return msg
     
+    elif alert_type == "movement":
+        return meta_engine.format_meta_alert(list_name, result.get("movers", []))
+    
     else:
         return f"🔔 META ALERT: {list_name}\n\n{result}"
@@ -5,284 +5,699 @@ Pure background task - No UI logic
 """
 
 import asyncio
-from telegram import Bot
-from config import CHECK_INTERVAL
-from storage import load_data, save_data
-from wallets import load_wallets
-from mc import get_market_cap
-from intelligence import update_coin_history
+import time
+from datetime import datetime
+from typing import Optional
+from config import (
+    MONITOR_TICK,
+    PIPELINE_FETCHERS,
+    PIPELINE_FORMATTERS,
+    PIPELINE_DELIVERERS,
+    PIPELINE_QUEUE_SIZE
+)
+import storage
+import store
+from storage import load_data
 from core.alerts import AlertEngine
-from settings import get_chat_settings
-from plans import can_loud_alerts, can_wallet_alerts
+from core import archive, rollups, ticks
+from entitlements import get_delivery_profile
 from alert_history import log_alert
 from meta_alerts import evaluate_meta_alerts
+import meta_engine
+import lists
+import tokens
 from lists import load_lists
 from core.meta_formatter import format_meta_alert
-from timebased_alerts import should_alert_timeased
+from timebased_alerts import should_alert_timeased, get_scheduler
 from combination_alerts import CombinationAlerts
 from core.combo_formatter import format_combo_alert
+from core.outbox import OutboxBot
+from core.snapshot import MarketSnapshot, fetch_quote, publish_snapshot
+from core.pipeline import Stage, StageQueue
+from core.scheduler import PollScheduler
+from core.sharding import ShardLeases
+from core.leadership import LeaderLease, StaleLeaderError
+from core.shedding import LoadShedder, SKIP_HISTORY, DEFER_META, NEAR_ONLY, NEAR_THRESHOLD
+from metrics import (
+    monitor_cycle_seconds,
+    monitor_cycle_lag_seconds,
+    monitor_phase_seconds,
+    alerts_generated_total
+)
 
 
-async def start_monitor(bot: Bot):
-    """Main monitoring loop - runs forever."""
-    print("📡 Monitor loop running...")
+def _user_coins(user_data) -> list:
+    """Coins for a user in either data format."""
+    if isinstance(user_data, list):
+        return user_data
+    return user_data.get("coins", [])
+
+
+def _owns_all(key: str) -> bool:
+    return True
+
+
+def _list_key(user_id, list_name: str) -> str:
+    """Shard key for a list (a list is evaluated by one shard as a whole)."""
+    return f"{user_id}:list:{list_name}"
+
+
+def tracked_pairs(data: dict, lists_data: dict, owns=_owns_all):
+    """
+    (user_id, ca) for unpaused coins plus coins in lists with meta alerts.
     
-    while True:
-        try:
-            data = load_data()
-            wallets_data = load_wallets()
-            lists_data = load_lists()
+    A list's coins come with the list even when another shard owns
+    the CA; they're only priced there, never archived or saved.
+    
+    Args:
+        owns: Shard filter - coins by CA, lists by list key
+    """
+    for user_id, user_data in data.items():
+        for coin in _user_coins(user_data):
+            if coin.get("ca") and not coin.get("paused", False) and owns(coin["ca"]):
+                yield user_id, coin["ca"]
+    
+    for user_id, user_lists in lists_data.items():
+        if not isinstance(user_lists, dict):
+            continue
+        for list_name, list_info in user_lists.items():
+            if isinstance(list_info, dict) and list_info.get("meta_alerts") and owns(_list_key(user_id, list_name)):
+                for ca in list_info.get("coins", []):
+                    yield user_id, ca
+
+
+def collect_cas(data: dict, lists_data: dict) -> list:
+    """Every CA the monitor tracks, once each."""
+    return list(dict.fromkeys(ca for _, ca in tracked_pairs(data, lists_data)))
+
+
+def _plan_for(user_id) -> str:
+    return get_delivery_profile(user_id).plan
+
+
+def near_threshold_cas(data: dict, snapshot: MarketSnapshot) -> set:
+    """
+    CAs worth polling under heavy load: close to an armed alert, or
+    with armed alerts we can't measure (combos, no price yet).
+    """
+    near = set()
+    
+    for user_data in data.values():
+        for coin in _user_coins(user_data):
+            ca = coin.get("ca")
+            if not ca or coin.get("paused", False) or ca in near:
+                continue
+            if not AlertEngine.armed_alerts(coin):
+                continue
             
-            # Monitor meta alerts for lists
-            for user_id_str, user_lists in lists_data.items():
-                try:
-                    # Skip non-numeric user IDs (test/verification users)
+            mc = snapshot.mc(ca)
+            distance = AlertEngine.threshold_distance(coin, mc) if mc else None
+            if distance is None or distance <= NEAR_THRESHOLD:
+                near.add(ca)
+    
+    return near
+
+
+def _save(path: str, save, value, leader: Optional[LeaderLease]):
+    """Save state, fenced by the leader's token when running under leadership."""
+    if leader:
+        # Write-behind saves must reach the file inside the fence
+        leader.fenced(path, lambda: (save(value), store.flush()))
+    else:
+        save(value)
+
+
+def _lists_touched(lists_data: dict, cas: set) -> int:
+    """Lists the meta stage evaluates (meta alerts or enough coins to move together) that contain any of these CAs."""
+    return sum(
+        1
+        for user_lists in lists_data.values() if isinstance(user_lists, dict)
+        for list_info in user_lists.values()
+        if isinstance(list_info, dict)
+        and (list_info.get("meta_alerts") or len(list_info.get("coins", [])) >= meta_engine.MIN_MOVERS)
+        and cas.intersection(list_info.get("coins", []))
+    )
+
+
+def _meta_movement(user_id_str: str, list_name: str, list_coins: list, all_coins: dict) -> Optional[dict]:
+    """
+    Narrative rotation: enough of a list's coins up 20%+ over the last
+    hour (meta_engine, 1h change from core.rollups), at most once per
+    meta_engine.COOLDOWN_SECONDS per list, for plans with meta alerts.
+    """
+    key = _list_key(user_id_str, list_name)
+    if (len(list_coins) < meta_engine.MIN_MOVERS or not meta_engine.should_send_meta_alert(key)
+            or not get_delivery_profile(user_id_str).meta_alerts):
+        return None
+    movers = meta_engine.detect_meta_movement(list_name, list_coins, all_coins)
+    if not movers:
+        return None
+    meta_engine.mark_meta_alert_sent(key)
+    return {"type": "movement", "list_name": list_name, "movers": movers}
+
+
+def collect_expired_timebased(data: dict, snapshot, owns=_owns_all) -> dict:
+    """
+    Time-based alerts whose deadline has passed, grouped by user.
+    
+    Fires on time even for coins that weren't priced this cycle
+    (the scheduler falls back to the last price it saw).
+    
+    Returns:
+        user_id_str -> [(coin, result), ...]
+    """
+    def find_coin(user_id_str, ca):
+        for coin in _user_coins(data.get(user_id_str, {})):
+            if coin.get("ca") == ca:
+                return coin
+        return None
+    
+    def lookup(user_id_str, ca):
+        coin = find_coin(user_id_str, ca)
+        mc = snapshot.mc(ca)
+        if coin is None or mc is None:
+            return None
+        return (mc, coin.get("start_mc", 0))
+    
+    expired = {}
+    for user_id_str, ca, result in get_scheduler().pop_expired(lookup=lookup, owns=owns):
+        coin = find_coin(user_id_str, ca) or {"ca": ca}
+        expired.setdefault(user_id_str, []).append((coin, result))
+    
+    return expired
+
+
+def _format_alert(item) -> dict:
+    """
+    Turn an evaluated alert into an outbox message.
+    
+    Args:
+        item: ("coin", user_id, coin, alert_type, message, mc, arming)
+              or ("meta", user_id_str, list_name, result, arming)
+    
+    Returns:
+        send_message kwargs plus what to count and log once queued
+    """
+    kind, user_id = item[0], item[1]
+    profile = get_delivery_profile(user_id)
+    
+    if kind == "meta":
+        _, _, list_name, result, arming = item
+        alert_type = f"meta_{result['type']}"
+        return {
+            "chat_id": int(user_id),
+            "text": format_meta_alert(result),
+            "disable_notification": profile.disable_notification(alert_type),
+            "dedupe_key": f"{user_id}:list:{list_name}:{result['type']}:{arming}",
+            "alert_type": alert_type,
+            "log": (list_name, result),
+        }
+    
+    _, _, coin, alert_type, message, mc, arming = item
+    ca = coin.get("ca")
+    start_mc = coin.get("start_mc", 0)
+    timestamp = datetime.now().strftime("%H:%M")
+    return {
+        "chat_id": user_id,
+        "text": f"[⏰ {timestamp}] {message}",
+        "disable_notification": profile.disable_notification(alert_type),
+        "parse_mode": "HTML",
+        "dedupe_key": f"{user_id}:{ca}:{alert_type}:{start_mc}:{arming}",
+        "alert_type": alert_type,
+        "log": (ca, {"message": message, "mc": mc}),
+    }
+
+
+def _arming(coin: dict, alert_type: str) -> str:
+    """
+    Which arming of a coin alert fired, for its dedupe key: the coin's
+    rev (bumped by every user edit, so a reset re-arms it) and the
+    alert's configured value.
+    """
+    if alert_type.startswith("combo_"):
+        config = (coin.get("combo_alerts") or {}).get(alert_type[len("combo_"):])
+    else:
+        config = (coin.get("alerts") or {}).get(alert_type)
+    return f"r{coin.get('rev', 0)}:{config}"
+
+
+def _timebased_arming(result: dict) -> str:
+    """The time-based alert a result came from (each has its own created_at)."""
+    return f"{result.get('subtype')}:{result.get('target')}:{result.get('created_at')}"
+
+
+def _untrigger(tick, item):
+    """Clear the triggered flag of an alert that never reached the outbox."""
+    if item[0] == "coin":
+        _, _, coin, alert_type, _, _, _ = item
+        (coin.get("triggered") or {}).pop(alert_type, None)
+    else:
+        _, user_id_str, list_name, result, _ = item
+        list_info = tick.lists_data.get(user_id_str, {}).get(list_name) or {}
+        (list_info.get("meta_triggered") or {}).pop(result["type"], None)
+
+
+async def _deliver_alert(outbox: OutboxBot, message: dict):
+    """Queue a formatted alert in the outbox and log it to history."""
+    alert_type = message.pop("alert_type")
+    subject, details = message.pop("log")
+    
+    await outbox.send_message(**message)
+    alerts_generated_total.inc(type=alert_type)
+    
+    # Log alert to history
+    try:
+        user_id_int = int(message["chat_id"])
+        log_alert(user_id_int, alert_type, subject, details)
+    except (ValueError, TypeError):
+        pass  # Skip logging for invalid user IDs
+
+
+def _evaluate_coin(user_id: str, coin: dict, quote, user_mode: str, history: bool = True) -> list:
+    """
+    Every alert a fresh quote fires for one user's coin.
+    
+    The coin shows its token's ATH/low/avg volume (see tokens.join).
+    history: Whether the quote went into the CA's history (see AlertEngine.evaluate_all)
+    
+    Returns:
+        (alert_type, message, arming) tuples (arming: see _arming)
+    """
+    ca = coin["ca"]
+    mc = quote.mc
+    
+    # Evaluate standard alerts
+    alerts_to_fire = [
+        (alert_type, message, _arming(coin, alert_type))
+        for alert_type, message in AlertEngine.evaluate_quote(coin, quote, user_mode, history)
+    ]
+    
+    # Evaluate time-based alerts
+    start_mc = coin.get("start_mc", 0)
+    try:
+        user_id_int = int(user_id)
+        timebased_result = should_alert_timeased(user_id_int, ca, mc, start_mc)
+    except (ValueError, TypeError):
+        timebased_result = None
+    if timebased_result:
+        alerts_to_fire.append((timebased_result["type"], timebased_result["message"],
+                               _timebased_arming(timebased_result)))
+    
+    # Evaluate combination alerts
+    combo_alerts = coin.get("combo_alerts", {})
+    combo_triggered = coin.get("combo_triggered", {})
+    avg_volume = coin.get("avg_volume", 0)
+    
+    if combo_alerts:
+        combo_results = CombinationAlerts.evaluate_all_combos(
+            mc, start_mc, quote.volume_24h, quote.liquidity,
+            avg_volume, combo_alerts, combo_triggered
+        )
+        
+        for combo_type, details in combo_results:
+            msg = format_combo_alert(combo_type, details, ca)
+            alerts_to_fire.append((f"combo_{combo_type}", msg, _arming(coin, f"combo_{combo_type}")))
+            coin.setdefault("combo_triggered", {})
+            coin["combo_triggered"][combo_type] = True
+    
+    return alerts_to_fire
+
+
+class _Tick:
+    """One scheduler tick as it moves through the pipeline."""
+    
+    def __init__(self, data: dict, lists_data: dict, owns, targets: dict, due: list, started: float):
+        self.data = data
+        self.lists_data = lists_data
+        self.owns = owns
+        self.targets = targets
+        self.due = due
+        self.started = started
+        self.subscribers = {}  # ca -> [(user_id, coin, user_mode), ...]
+        self.quotes = {}  # ca -> MarketQuote fetched this tick
+        self.waiting = len(due)  # quotes the evaluator hasn't seen yet
+        self.history_shed = 0
+        self.coin_seconds = 0.0  # spent evaluating subscribers' coins
+        self.done = asyncio.Event()
+        self.error = None
+        self.alerts = 0  # alerts queued for format/deliver, not in the outbox yet
+        self.alerts_queued = asyncio.Event()
+        self.alerts_queued.set()
+    
+    def alert_started(self):
+        self.alerts += 1
+        self.alerts_queued.clear()
+    
+    def alert_finished(self):
+        self.alerts -= 1
+        if self.alerts == 0:
+            self.alerts_queued.set()
+
+
+async def start_monitor(
+    outbox: Optional[OutboxBot] = None,
+    leases: Optional[ShardLeases] = None,
+    leader: Optional[LeaderLease] = None
+):
+    """
+    Main monitoring loop - runs forever.
+    
+    Runs as a pipeline of stages joined by bounded queues (see
+    core.pipeline), each with its own worker count:
+        
+        scheduler -> fetch (PIPELINE_FETCHERS) -> evaluate (1)
+                  -> format (PIPELINE_FORMATTERS) -> deliver (PIPELINE_DELIVERERS)
+    
+    Every MONITOR_TICK seconds the scheduler emits the CAs whose plan
+    freshness target is due (see core.scheduler). Each quote is evaluated
+    for its subscribers as soon as it arrives, while the rest are still
+    being fetched. Once the tick's last quote is in, the evaluator runs
+    meta and time-based alerts and saves state; the next tick waits for
+    that. A full queue makes the stage before it wait, so a slow outbox
+    slows fetching instead of growing memory.
+    
+    With `leases`, only the CAs and lists on shards this worker holds
+    are monitored (see core.sharding); other workers cover the rest.
+    
+    With `leader`, the loop returns as soon as leadership is lost and
+    state saves carry its fencing token (see core.leadership).
+    
+    Alerts are queued in the outbox and delivered to Telegram separately
+    (see core.delivery). A tick saves its triggered flags only once every
+    alert it fired is in the outbox.
+    """
+    outbox = outbox or OutboxBot()
+    poll_scheduler = PollScheduler(MONITOR_TICK)
+    shedder = LoadShedder(MONITOR_TICK)
+    snapshot = MarketSnapshot({})
+    meta_backlog = set()  # refreshed CAs whose lists were deferred
+    token_state = {}  # ca -> tokens state, loaded on a CA's first quote
+    
+    fetch_q = StageQueue("fetch", PIPELINE_QUEUE_SIZE)
+    quote_q = StageQueue("evaluate", PIPELINE_QUEUE_SIZE)
+    format_q = StageQueue("format", PIPELINE_QUEUE_SIZE)
+    deliver_q = StageQueue("deliver", PIPELINE_QUEUE_SIZE)
+    
+    async def fetch(item):
+        tick, ca = item
+        quote = None
+        try:
+            quote = await asyncio.to_thread(fetch_quote, ca)
+        except Exception as e:
+            print(f"Snapshot fetch error for {ca}: {e}")
+        finally:
+            await quote_q.put((tick, ca, quote))
+    
+    async def evaluate(item):
+        tick, ca, quote = item
+        try:
+            if quote:
+                tick.quotes[ca] = quote
+                subscribers = tick.subscribers.get(ca, [])
+                skip_history = shedder.sheds(SKIP_HISTORY)
+                
+                if not rollups.has(ca):
+                    # Bars outlive restarts: rebuilt from the tick archive in
+                    # the background (features unknown until then)
+                    rollups.schedule_restore(ca, lambda: archive.retained(ca))
+                
+                # One history sample per quote, shared by every subscriber;
+                # rollups are a few in-place updates, so they're never shed
+                now = time.time()
+                rollups.record(ca, now, quote.mc, quote.volume_24h)
+                if not tick.owns(ca):
+                    # A coin of one of our lists that another shard owns:
+                    # priced here for meta alerts only (rollups are in
+                    # memory). Its archive file and token state have one
+                    # writer, the owning shard
+                    return
+                archive.record(ca, now, quote.mc, quote.volume_24h, quote.liquidity)
+                history = not skip_history or any(AlertEngine.needs_history(coin) for _, coin, _ in subscribers)
+                if history:
+                    ticks.record(ca, now, quote.mc, quote.volume_24h, quote.liquidity)
+                else:
+                    tick.history_shed += 1
+                
+                # Token state (ATH/low/avg volume) updated once per quote
+                token = token_state.get(ca)
+                if token is None:
+                    token = token_state[ca] = tokens.seed([coin for _, coin, _ in subscribers], tokens.get_token(ca))
+                tokens.record_mc(token, quote.mc)
+                
+                for user_id, coin, user_mode in subscribers:
                     try:
-                        user_id_int = int(user_id_str)
-                    except (ValueError, TypeError):
-                        continue
-                    
-                    # Build coin_data dict from user's tracked coins
-                    user_data = data.get(user_id_str, {})
-                    if isinstance(user_data, list):
-                        coins = user_data
-                    else:
-                        coins = user_data.get("coins", [])
-                    
-                    coin_data = {coin.get("ca"): coin for coin in coins if coin.get("ca")}
-                    
-                    # Check each list
-                    for list_name, list_info in user_lists.items():
-                        if isinstance(list_info, dict):
-                            list_coins = list_info.get("coins", [])
-                            meta_alerts = list_info.get("meta_alerts", {})
-                            meta_triggered = list_info.get("meta_triggered", {})
-                            
-                            if meta_alerts and list_coins:
-                                result = evaluate_meta_alerts(
-                                    list_name,
-                                    list_coins,
-                                    coin_data,
-                                    meta_alerts,
-                                    meta_triggered
-                                )
-                                
-                                if result:
-                                    # Format alert message
-                                    msg = format_meta_alert(result)
-                                    
-                                    # Send alert
-                                    chat = get_chat_settings(user_id_str)
-                                    disable_notification = not can_loud_alerts(chat, user_id_str)
-                                    
-                                    await bot.send_message(
-                                        chat_id=user_id_int,
-                                        text=msg,
-                                        disable_notification=disable_notification
-                                    )
-                                    
-                                    # Log alert
-                                    log_alert(user_id_int, f"meta_{result['type']}", list_name, result)
-                                    
-                                    # Mark as triggered
-                                    list_info["meta_triggered"][result["type"]] = True
+                        tokens.join(coin, token)
+                        evaluated = time.perf_counter()
+                        fired = _evaluate_coin(user_id, coin, quote, user_mode, history)
+                        tick.coin_seconds += time.perf_counter() - evaluated
+                        for alert_type, message, arming in fired:
+                            # Marked triggered in memory now; saved only once
+                            # the outbox row exists (finish waits for it)
+                            coin.setdefault("triggered", {})
+                            coin["triggered"][alert_type] = True
+                            await queue_alert(tick, ("coin", user_id, coin, alert_type, message, quote.mc, arming))
+                    except Exception as e:
+                        print(f"Coin error: {e}")
                 
+                # After the checks, so a spike is compared with the volume before it
+                tokens.record_volume(token, quote.volume_24h)
+        finally:
+            if ca is not None:
+                tick.waiting -= 1
+            if tick.waiting == 0 and not tick.done.is_set():
+                try:
+                    await finish(tick)
                 except Exception as e:
-                    print(f"Meta alert error for user {user_id_str}: {e}")
+                    tick.error = e
+                finally:
+                    tick.done.set()
+    
+    async def finish(tick):
+        """Tick-wide work once every due quote has been evaluated."""
+        nonlocal snapshot, meta_backlog
+        data, lists_data, owns = tick.data, tick.lists_data, tick.owns
+        refreshed = set(tick.quotes)
+        owned = {ca for ca in refreshed if owns(ca)}
+        
+        poll_scheduler.record(tick.due, refreshed)
+        poll_scheduler.measure_sla(tick.targets)
+        poll_scheduler.forget_untracked(tick.targets)
+        ticks.forget_untracked(tick.targets)
+        rollups.forget_untracked(tick.targets)
+        
+        # Token state leaves memory with the CA; the saved row goes once
+        # no user has the coin at all (paused coins keep theirs)
+        untracked = [ca for ca in token_state if ca not in tick.targets]
+        for ca in untracked:
+            del token_state[ca]
+        if untracked:
+            held = {coin.get("ca") for user_data in data.values() for coin in _user_coins(user_data)}
+            gone = [ca for ca in untracked if ca not in held and owns(ca)]
+        else:
+            gone = []
+        
+        snapshot = snapshot.merge(MarketSnapshot(tick.quotes), keep=tick.targets)
+        publish_snapshot(snapshot)
+        shedder.record("history", tick.history_shed)
+        
+        monitor_phase_seconds.observe(tick.coin_seconds, phase="coins")
+        phase_start = time.perf_counter()
+        
+        # Monitor meta alerts for lists with a fresh price
+        # (deferred while shedding or once the tick is already late)
+        if shedder.sheds(DEFER_META) or shedder.past_deadline(tick.started):
+            shedder.record("meta", _lists_touched(lists_data, refreshed - meta_backlog))
+            meta_backlog |= refreshed
+            meta_cas = set()
+        else:
+            meta_cas = refreshed | meta_backlog
+            meta_backlog = set()
+        
+        touched_lists = {}  # user_id_str -> {list_name: list} with new meta flags
+        all_coins = {user_id: _user_coins(user_data) for user_id, user_data in data.items()}
+        for user_id_str, user_lists in lists_data.items():
+            try:
+                # Skip non-numeric user IDs (test/verification users)
+                try:
+                    int(user_id_str)
+                except (ValueError, TypeError):
                     continue
+                
+                # Build coin_data dict from user's tracked coins
+                coins = _user_coins(data.get(user_id_str, {}))
+                coin_data = {coin.get("ca"): coin for coin in coins if coin.get("ca")}
+                
+                # Check each list
+                for list_name, list_info in user_lists.items():
+                    if isinstance(list_info, dict):
+                        list_coins = list_info.get("coins", [])
+                        meta_alerts = list_info.get("meta_alerts", {})
+                        meta_triggered = list_info.get("meta_triggered", {})
+                        
+                        if not (meta_cas.intersection(list_coins) and owns(_list_key(user_id_str, list_name))):
+                            continue
+                        
+                        if meta_alerts:
+                            result = evaluate_meta_alerts(
+                                list_name,
+                                list_coins,
+                                coin_data,
+                                meta_alerts,
+                                meta_triggered,
+                                snapshot
+                            )
+                            
+                            if result:
+                                # Mark as triggered (saved once the alert is in the outbox)
+                                list_info.setdefault("meta_triggered", {})[result["type"]] = True
+                                touched_lists.setdefault(user_id_str, {})[list_name] = list_info
+                                arming = f"{list_info.get('created_at')}:{meta_alerts.get(result['type'])}"
+                                await queue_alert(tick, ("meta", user_id_str, list_name, result, arming))
+                        
+                        # Coins moving together (cooldown instead of a triggered flag)
+                        movement = _meta_movement(user_id_str, list_name, list_coins, all_coins)
+                        if movement:
+                            arming = int(time.time() // meta_engine.COOLDOWN_SECONDS)
+                            await queue_alert(tick, ("meta", user_id_str, list_name, movement, arming))
             
-            # Save updated list states
-            from lists import save_lists
-            save_lists(lists_data)
+            except Exception as e:
+                print(f"Meta alert error for user {user_id_str}: {e}")
+                continue
+        
+        monitor_phase_seconds.observe(time.perf_counter() - phase_start, phase="meta")
+        phase_start = time.perf_counter()
+        
+        # Time-based deadlines due this tick
+        expired_timebased = collect_expired_timebased(data, snapshot, owns)
+        for user_id, expired in expired_timebased.items():
+            for coin, result in expired:
+                coin.setdefault("triggered", {})
+                coin["triggered"][result["type"]] = True
+                mc = snapshot.mc(coin["ca"]) or 0
+                await queue_alert(tick, ("coin", user_id, coin, result["type"], result["message"], mc,
+                                         _timebased_arming(result)))
+        
+        # Triggered flags only reach disk after their alerts are in the
+        # outbox, so a crash in between can't lose an alert
+        await tick.alerts_queued.wait()
+        
+        # Save updated state - only the lists and coins evaluated this
+        # tick, merged into each user's latest entry (keeps UI edits and
+        # other shards' changes)
+        if touched_lists:
+            _save(lists.LIST_FILE, lists.save_meta_state, touched_lists, leader)
+        
+        touched = {}
+        for ca in refreshed:
+            for user_id, coin, _ in tick.subscribers.get(ca, []):
+                touched.setdefault(user_id, []).append(coin)
+        for user_id, expired in expired_timebased.items():
+            touched.setdefault(user_id, []).extend(coin for coin, _ in expired)
+        if touched:
+            _save(storage.DATA_FILE, storage.save_coin_state, touched, leader)
+        if owned or gone:
+            _save(tokens.TOKENS_FILE, lambda state: tokens.save_token_state(state, owned | set(gone)),
+                  token_state, leader)
+        get_scheduler().flush()
+        await asyncio.to_thread(archive.flush)
+        
+        monitor_phase_seconds.observe(time.perf_counter() - phase_start, phase="save")
+    
+    async def queue_alert(tick, item):
+        tick.alert_started()
+        await format_q.put((tick, item))
+    
+    async def format_alert(entry):
+        tick, item = entry
+        try:
+            message = _format_alert(item)
+        except Exception:
+            _untrigger(tick, item)
+            tick.alert_finished()
+            raise
+        await deliver_q.put((tick, item, message))
+    
+    async def deliver(entry):
+        tick, item, message = entry
+        try:
+            await _deliver_alert(outbox, message)
+        except Exception:
+            _untrigger(tick, item)  # not queued: fire again next tick
+            raise
+        finally:
+            tick.alert_finished()
+    
+    stages = [
+        Stage("fetch", fetch_q, fetch, PIPELINE_FETCHERS),
+        Stage("evaluate", quote_q, evaluate, 1),  # sole owner of coin state
+        Stage("format", format_q, format_alert, PIPELINE_FORMATTERS),
+        Stage("deliver", deliver_q, deliver, PIPELINE_DELIVERERS),
+    ]
+    for stage in stages:
+        stage.start()
+    print("📡 Monitor loop running...")
+    
+    try:
+        while True:
+            if leader and not leader.is_leader():
+                print("⚠️ No longer monitor leader - stopping monitor loop")
+                return
             
-            # Monitor coins
-            for user_id, user_data in data.items():
-                try:
+            cycle_start = time.perf_counter()
+            try:
+                data = load_data()
+                lists_data = load_lists()
+                
+                if leases:
+                    leases.refresh()
+                    owns = leases.owns
+                else:
+                    owns = _owns_all
+                
+                # Schedule the CAs that are due, once each
+                targets = poll_scheduler.targets(tracked_pairs(data, lists_data, owns), _plan_for)
+                due = poll_scheduler.due(targets)
+                if shedder.sheds(NEAR_ONLY):
+                    due = shedder.filter_due(due, near_threshold_cas(data, snapshot))
+                
+                tick = _Tick(data, lists_data, owns, targets, due, cycle_start)
+                
+                # Who each quote fans out to
+                for user_id, user_data in data.items():
                     # Handle both data formats
                     if isinstance(user_data, list):
-                        coins = user_data
                         user_mode = "aggressive"
                     else:
-                        coins = user_data.get("coins", [])
                         user_mode = user_data.get("profile", {}).get("mode", "aggressive")
                     
-                    for coin in coins:
-                        try:
-                            ca = coin.get("ca")
-                            if not ca:
-                                continue
-                            
-                            # Skip paused coins
-                            if coin.get("paused", False):
-                                continue
-                            
-                            # Fetch current market data
-                            token = get_market_cap(ca)
-                            if not token:
-                                continue
-                            
-                            mc = token["mc"]
-                            volume_24h = token.get("volume_24h", 0)
-                            liquidity = token.get("liquidity", 0)
-                            
-                            # Update coin history
-                            coin = update_coin_history(coin, mc, volume_24h, liquidity)
-                            
-                            # Evaluate standard alerts
-                            alerts_to_fire = AlertEngine.evaluate_all(
-                                coin, mc, volume_24h, user_mode, liquidity
-                            )
-                            
-                            # Evaluate time-based alerts
-                            start_mc = coin.get("start_mc", 0)
-                            try:
-                                user_id_int = int(user_id)
-                                timebased_result = should_alert_timeased(
-                                    user_id_int, ca, mc, start_mc
-                                )
-                            except (ValueError, TypeError):
-                                timebased_result = None
-                            if timebased_result:
-                                alerts_to_fire.append((
-                                    timebased_result["type"],
-                                    timebased_result["message"]
-                                ))
-                            
-                            # Evaluate combination alerts
-                            combo_alerts = coin.get("combo_alerts", {})
-                            combo_triggered = coin.get("combo_triggered", {})
-                            avg_volume = coin.get("avg_volume", 0)
-                            
-                            if combo_alerts:
-                                combo_results = CombinationAlerts.evaluate_all_combos(
-                                    mc, start_mc, volume_24h, liquidity,
-                                    avg_volume, combo_alerts, combo_triggered
-                                )
-                                
-                                for combo_type, details in combo_results:
-                                    msg = format_combo_alert(combo_type, details, ca)
-                                    alerts_to_fire.append((f"combo_{combo_type}", msg))
-                                    coin.setdefault("combo_triggered", {})
-                                    coin["combo_triggered"][combo_type] = True
-                            
-                            # Send alerts
-                            for alert_type, message in alerts_to_fire:
-                                chat = get_chat_settings(user_id)
-                                disable_notification = not can_loud_alerts(chat, user_id)
-                                
-                                # Add timestamp and quick action buttons
-                                from datetime import datetime
-                                timestamp = datetime.now().strftime("%H:%M")
-                                enhanced_message = f"[⏰ {timestamp}] {message}"
-                                
-                                await bot.send_message(
-                                    chat_id=user_id,
-                                    text=enhanced_message,
-                                    disable_notification=disable_notification,
-                                    parse_mode="HTML"
-                                )
-                                
-                                # Log alert to history
-                                try:
-                                    user_id_int = int(user_id)
-                                    log_alert(user_id_int, alert_type, ca, {"message": message, "mc": mc})
-                                except (ValueError, TypeError):
-                                    pass  # Skip logging for invalid user IDs
-                                
-                                # Mark as triggered
-                                coin.setdefault("triggered", {})
-                                coin["triggered"][alert_type] = True
-                            
-                            await asyncio.sleep(1)  # Throttle
-                        
-                        except Exception as e:
-                            print(f"Coin error: {e}")
+                    for coin in _user_coins(user_data):
+                        ca = coin.get("ca")
+                        # Skip paused coins and coins on other shards
+                        if not ca or coin.get("paused", False) or not owns(ca):
                             continue
-                    
-                    # Save updated data
-                    if isinstance(user_data, dict):
-                        data[user_id] = user_data
-                    
-                except Exception as e:
-                    print(f"User error: {e}")
-                    continue
+                        tick.subscribers.setdefault(ca, []).append((user_id, coin, user_mode))
+                
+                if due:
+                    for ca in due:
+                        await fetch_q.put((tick, ca))
+                else:
+                    await quote_q.put((tick, None, None))
+                
+                await tick.done.wait()
+                if tick.error:
+                    raise tick.error
             
-            # Monitor wallets for buys
-            # TODO: Re-enable after Helius/paid RPC is configured
-            # Currently disabled to prevent rate limiting on free tier
-            if False:  # Disabled - causes 429 errors on free RPC
-                for user_id, wallets in wallets_data.items():
-                    try:
-                        # Convert user_id to int safely
-                        try:
-                            user_id_int = int(user_id)
-                        except (ValueError, TypeError):
-                            # Skip invalid user IDs (like test_999 from tests)
-                            continue
-                        
-                        chat = get_chat_settings(user_id)
-                        
-                        # Check if user has wallet alert permission
-                        if not can_wallet_alerts(chat, user_id_int):
-                            continue
-                        
-                        for wallet in wallets:
-                            try:
-                                address = wallet.get("address")
-                                if not address:
-                                    continue
-                                
-                                # Check for new buys (using existing wallet_alert_engine)
-                                from wallet_alert_engine import detect_wallet_buys
-                                from onchain import format_wallet_buy_alert
-                                
-                                # Get user's tracked coins for context
-                                user_data = data.get(str(user_id), {})
-                                if isinstance(user_data, dict):
-                                    tracked_coins = user_data.get("coins", [])
-                                else:
-                                    tracked_coins = user_data if isinstance(user_data, list) else []
-                                
-                                # Check each tracked coin for wallet buys
-                                for coin in tracked_coins:
-                                    ca = coin.get("ca")
-                                    if not ca:
-                                        continue
-                                    
-                                    buy_info = detect_wallet_buys(address, coin, min_usd=100)
-                                    
-                                    if buy_info:
-                                        alert_msg = format_wallet_buy_alert(
-                                            {
-                                                "type": "wallet_buy",
-                                                "wallet": address,
-                                                "amount_usd": buy_info.get("amount_usd", 0),
-                                                "signature": buy_info.get("signature", "")
-                                            },
-                                            coin_symbol=ca[:8]
-                                        )
-                                        
-                                        disable_notification = not can_loud_alerts(chat, user_id)
-                                        
-                                        await bot.send_message(
-                                            chat_id=user_id,
-                                            text=alert_msg,
-                                            disable_notification=disable_notification
-                                        )
-                                    
-                                    await asyncio.sleep(0.5)  # Throttle
-                            
-                            except Exception as e:
-                                print(f"Wallet monitoring error: {e}")
-                                continue
-                    
-                    except Exception as e:
-                        print(f"User wallet error: {e}")
-                        continue
+            except StaleLeaderError:
+                raise
+            except Exception as e:
+                print(f"Monitor error: {e}")
             
-            save_data(data)
+            cycle_duration = time.perf_counter() - cycle_start
+            monitor_cycle_seconds.observe(cycle_duration)
+            monitor_cycle_lag_seconds.set(max(0.0, cycle_duration - MONITOR_TICK))
+            shedder.observe(cycle_duration)
             
-        except Exception as e:
-            print(f"Monitor error: {e}")
-        
-        await asyncio.sleep(CHECK_INTERVAL)
+            await asyncio.sleep(max(0.0, MONITOR_TICK - cycle_duration))
+    finally:
+        for stage in stages:
+            await stage.stop()
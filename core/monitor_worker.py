@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Monitor Worker - Standalone monitor process
+
+Runs the monitor loop without the Telegram front end.
+Alerts are written to the outbox and delivered by the bot process.
+
+Usage:
+    python -m core.monitor_worker
+    python -m core.monitor_worker --shard 0 --shards 4   (one of 4 workers)
+"""
+
+import argparse
+import asyncio
+from typing import Optional
+from config import METRICS_PORT, MONITOR_SHARDS, MONITOR_SHARD_ID
+from core.monitor import start_monitor
+from core.outbox import OUTBOX_FILE
+from core.sharding import ShardLeases
+from core.leadership import LeaderLease, run_as_leader
+from metrics import start_metrics_server, monitor_event_loop_lag
+from store import flush as flush_store
+
+
+async def run_worker(leases: Optional[ShardLeases] = None):
+    """
+    Monitor loop plus event-loop lag sampling.
+
+    Sharded workers are kept exclusive by their shard leases; an
+    unsharded worker competes for monitor leadership with any other
+    replica (including inline app.py monitors).
+    """
+    if leases:
+        monitor = start_monitor(leases=leases)
+    else:
+        monitor = run_as_leader(
+            LeaderLease("monitor"),
+            lambda lease: start_monitor(leader=lease)
+        )
+
+    await asyncio.gather(monitor, monitor_event_loop_lag())
+
+
+def main():
+    """Worker entry point."""
+    parser = argparse.ArgumentParser(description="Trench Alert Bot monitor worker")
+    parser.add_argument("--shard", type=int, default=MONITOR_SHARD_ID, help="Shard this worker owns")
+    parser.add_argument("--shards", type=int, default=MONITOR_SHARDS, help="Total number of shards")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Port for /metrics (0 = off)")
+    args = parser.parse_args()
+
+    if not 0 <= args.shard < args.shards:
+        parser.error(f"--shard must be between 0 and {args.shards - 1}")
+
+    leases = ShardLeases(args.shard, args.shards) if args.shards > 1 else None
+
+    print("🛰️ Trench Alert Bot - Monitor Worker")
+    print("=" * 50)
+    print(f"📮 Outbox: {OUTBOX_FILE}")
+    if leases:
+        print(f"🧩 Shard: {args.shard} of {args.shards} (leases in {leases.lease_dir})")
+    start_metrics_server(args.metrics_port)
+    print("=" * 50)
+
+    try:
+        asyncio.run(run_worker(leases))
+    except KeyboardInterrupt:
+        print("🛑 Monitor worker stopped")
+    finally:
+        flush_store()
+        if leases:
+            leases.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Alert Outbox - Durable queue between the monitor and delivery
+No UI. No Telegram. Just rows in SQLite.
+
+The monitor writes alerts here; the delivery worker drains them to
+Telegram. Both sides can restart independently and nothing queued is
+lost if a send fails or the process dies.
+"""
+
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+OUTBOX_FILE = os.getenv("OUTBOX_FILE", "alert_outbox.db")
+
+# Same alert re-queued within this window is ignored
+# (covers a crash between queueing and saving triggered state). Keys
+# name the alert's arming too, so a re-armed alert is queued again.
+DEDUPE_WINDOW = 3600
+
+# Give up on a message after this many failed sends
+MAX_ATTEMPTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    parse_mode TEXT,
+    disable_notification INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, id);
+"""
+
+# Columns added after the first outbox release
+_COLUMNS = {
+    "dedupe_key": "TEXT",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "next_attempt_at": "REAL NOT NULL DEFAULT 0",
+    "last_error": "TEXT",
+    "sent_at": "REAL",
+}
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the outbox database (WAL so both processes can use it)."""
+    conn = sqlite3.connect(OUTBOX_FILE, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(outbox)")}
+    for column, definition in _COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_dedupe ON outbox (dedupe_key)")
+    return conn
+
+
+def enqueue_message(
+    chat_id,
+    text: str,
+    disable_notification: bool = False,
+    parse_mode: Optional[str] = None,
+    dedupe_key: Optional[str] = None
+) -> Optional[int]:
+    """
+    Queue a message for delivery.
+
+    Args:
+        dedupe_key: Optional alert identity - a second message with the
+            same key inside DEDUPE_WINDOW is dropped
+
+    Returns:
+        Row id of the queued message, or None if it was a duplicate
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            if dedupe_key:
+                duplicate = conn.execute(
+                    "SELECT 1 FROM outbox WHERE dedupe_key = ? AND created_at > ? LIMIT 1",
+                    (dedupe_key, now - DEDUPE_WINDOW)
+                ).fetchone()
+                if duplicate:
+                    return None
+
+            cur = conn.execute(
+                "INSERT INTO outbox (chat_id, text, parse_mode, disable_notification, "
+                "created_at, dedupe_key, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(chat_id), text, parse_mode, int(bool(disable_notification)),
+                 now, dedupe_key, now)
+            )
+            return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def fetch_pending(limit: int = 50, exclude_ids=()) -> List[Dict]:
+    """
+    Get the oldest messages that are due for a send attempt.
+
+    Args:
+        limit: Max rows to return
+        exclude_ids: Row ids already being delivered
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+            "ORDER BY id LIMIT ?",
+            (time.time(), limit + len(exclude_ids))
+        ).fetchall()
+        excluded = set(exclude_ids)
+        return [dict(row) for row in rows if row["id"] not in excluded][:limit]
+    finally:
+        conn.close()
+
+
+def mark_sent(message_ids: List[int]):
+    """Mark messages as delivered."""
+    if not message_ids:
+        return
+
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "UPDATE outbox SET status = 'sent', sent_at = ? WHERE id = ?",
+                [(now, message_id) for message_id in message_ids]
+            )
+    finally:
+        conn.close()
+
+
+def mark_retry(message_id: int, delay: float, error: str = ""):
+    """
+    Schedule another attempt after `delay` seconds.
+
+    Messages that keep failing are marked dead after MAX_ATTEMPTS.
+    """
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END "
+                "WHERE id = ?",
+                (time.time() + delay, error[:500], MAX_ATTEMPTS, message_id)
+            )
+    finally:
+        conn.close()
+
+
+def reschedule(message_id: int, delay: float):
+    """Push a message back without counting a failed attempt (e.g. flood wait)."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                (time.time() + delay, message_id)
+            )
+    finally:
+        conn.close()
+
+
+def mark_dead(message_id: int, error: str = ""):
+    """Give up on a message that can never be delivered (blocked bot, bad chat)."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE outbox SET status = 'dead', last_error = ? WHERE id = ?",
+                (error[:500], message_id)
+            )
+    finally:
+        conn.close()
+
+
+def count_pending() -> int:
+    """Number of messages waiting for delivery."""
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def purge_delivered(older_than: float = 86400) -> int:
+    """Delete sent/dead rows older than `older_than` seconds."""
+    conn = _connect()
+    try:
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?",
+                (time.time() - older_than,)
+            )
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+class OutboxBot:
+    """
+    Stand-in for telegram.Bot used by the monitor.
+
+    Only implements send_message - everything goes to the outbox.
+    """
+
+    async def send_message(
+        self,
+        chat_id,
+        text: str,
+        disable_notification: bool = False,
+        parse_mode: Optional[str] = None,
+        dedupe_key: Optional[str] = None
+    ):
+        """Queue the message instead of sending it."""
+        return enqueue_message(chat_id, text, disable_notification, parse_mode, dedupe_key)
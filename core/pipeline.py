@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pipeline - Stages connected by bounded asyncio queues
+Generic plumbing. No monitor logic.
+
+Each stage pulls from its inbox with its own number of workers. Queues
+are bounded, so a slow stage makes the one before it wait on put()
+instead of piling up work in memory. Queue depth and per-item time are
+exported per stage, which points straight at the bottleneck.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+from metrics import pipeline_queue_depth, pipeline_stage_seconds, pipeline_items_total
+
+
+class StageQueue(asyncio.Queue):
+    """Bounded queue that reports its depth."""
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize)
+        self.name = name
+
+    async def put(self, item):
+        await super().put(item)
+        pipeline_queue_depth.set(self.qsize(), queue=self.name)
+
+    def put_nowait(self, item):
+        super().put_nowait(item)
+        pipeline_queue_depth.set(self.qsize(), queue=self.name)
+
+    async def get(self):
+        item = await super().get()
+        pipeline_queue_depth.set(self.qsize(), queue=self.name)
+        return item
+
+
+class Stage:
+    """A pool of workers running `handler` on every item from `inbox`."""
+
+    def __init__(self, name: str, inbox: StageQueue, handler: Callable[[object], Awaitable[None]], workers: int = 1):
+        """
+        Args:
+            name: Stage label for metrics and logs
+            inbox: Queue this stage consumes
+            handler: Coroutine run once per item (it puts results on the next queue)
+            workers: Concurrent workers - the stage's concurrency knob
+        """
+        self.name = name
+        self.inbox = inbox
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.tasks: List[asyncio.Task] = []
+
+    async def _work(self):
+        while True:
+            item = await self.inbox.get()
+            start = time.perf_counter()
+            try:
+                await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pipeline {self.name} error: {e}")
+            finally:
+                pipeline_stage_seconds.observe(time.perf_counter() - start, stage=self.name)
+                pipeline_items_total.inc(stage=self.name)
+                self.inbox.task_done()
+
+    def start(self) -> List[asyncio.Task]:
+        """Spawn the workers."""
+        self.tasks = [
+            asyncio.create_task(self._work(), name=f"{self.name}-{i}")
+            for i in range(self.workers)
+        ]
+        return self.tasks
+
+    async def stop(self):
+        """Cancel the workers and wait for them to finish."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
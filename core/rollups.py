@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Rollups - OHLCV bars per CA at 1m, 5m, 1h and 1d
+
+Every quote updates the current bar of each resolution in place, so
+longer horizons (1h change, 24h high, ATH) come from a handful of bars
+instead of raw history. Each resolution keeps a bounded number of bars
+(RESOLUTIONS); older bars expire as new ones start.
+
+"volume" is the last 24h volume seen in the bar (quotes carry a rolling
+24h volume, not per-trade volume).
+
+Bars live in memory; after a restart a CA's bars are rebuilt from the
+tick archive (core.archive) on a background thread, see
+schedule_restore(). Until that finishes the CA's features are unknown
+(None), like a CA that was just added.
+"""
+
+import queue
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+
+# name -> (bar seconds, bars kept)
+RESOLUTIONS = {
+    "1m": (60, 120),       # 2 hours
+    "5m": (300, 288),      # 24 hours
+    "1h": (3600, 168),     # 7 days
+    "1d": (86400, 365),    # 1 year
+}
+
+
+class BarRing:
+    """The last `capacity` bars of one resolution, oldest overwritten first."""
+
+    def __init__(self, seconds: int, capacity: int):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.buckets = array("q", bytes(8 * capacity))  # bar start // seconds
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in BAR_FIELDS}
+        self.end = 0  # bars ever started; bar n is at n % capacity
+        self.size = 0
+
+    def add(self, ts: float, price: float, volume: float):
+        bucket = int(ts // self.seconds)
+        columns = self.columns
+        if self.size and self.buckets[(self.end - 1) % self.capacity] >= bucket:
+            i = (self.end - 1) % self.capacity  # current bar (or a late quote)
+            columns["high"][i] = max(columns["high"][i], price)
+            columns["low"][i] = min(columns["low"][i], price)
+            columns["close"][i] = price
+            columns["volume"][i] = volume
+            return
+
+        i = self.end % self.capacity
+        self.buckets[i] = bucket
+        for field in ("open", "high", "low", "close"):
+            columns[field][i] = price
+        columns["volume"][i] = volume
+        self.end += 1
+        self.size = min(self.size + 1, self.capacity)
+
+        # Bounded retention in time too, for CAs quoted sparsely
+        while self.size and self.buckets[(self.end - self.size) % self.capacity] <= bucket - self.capacity:
+            self.size -= 1
+
+    def _find(self, bucket: int) -> int:
+        """Index of the first kept bar at or after `bucket` (binary search)."""
+        lo, hi = self.end - self.size, self.end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.buckets[mid % self.capacity] < bucket:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def close_at(self, ts: float) -> Optional[float]:
+        """Close of the last bar that started at or before `ts`, if kept."""
+        n = self._find(int(ts // self.seconds) + 1) - 1
+        if n < self.end - self.size:
+            return None
+        return self.columns["close"][n % self.capacity]
+
+    def high_since(self, ts: float) -> Optional[float]:
+        """Highest high of the bars from the one holding `ts` onwards."""
+        start = self._find(int(ts // self.seconds))
+        highs = [self.columns["high"][n % self.capacity] for n in range(start, self.end)]
+        return max(highs) if highs else None
+
+    def restore(self, bars: List[list]):
+        """Replace the ring's bars with [start, open, high, low, close, volume] bars, oldest first."""
+        if bars:
+            newest = int(bars[-1][0] // self.seconds)
+            bars = [bar for bar in bars[-self.capacity:] if int(bar[0] // self.seconds) > newest - self.capacity]
+        for n, (start, *values) in enumerate(bars):
+            self.buckets[n] = int(start // self.seconds)
+            for field, value in zip(BAR_FIELDS, values):
+                self.columns[field][n] = value
+        self.end = self.size = len(bars)
+
+    def last(self) -> Optional[Dict[str, float]]:
+        bars = self.bars(1)
+        return bars[0] if bars else None
+
+    def bars(self, n: Optional[int] = None) -> List[Dict[str, float]]:
+        """The newest n bars (all if None), oldest first."""
+        count = self.size if n is None else min(n, self.size)
+        return [
+            {"ts": self.buckets[i] * self.seconds, **{field: self.columns[field][i] for field in BAR_FIELDS}}
+            for i in (k % self.capacity for k in range(self.end - count, self.end))
+        ]
+
+
+def _downsample(bars: Iterable, seconds: int) -> List[list]:
+    """Fold time-ordered (start, open, high, low, close, volume) bars into `seconds` bars."""
+    out = []
+    for start, open_, high_, low, close, volume in bars:
+        bucket = start - start % seconds
+        if out and out[-1][0] == bucket:
+            bar = out[-1]
+            bar[2] = max(bar[2], high_)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            bar[5] = volume
+        else:
+            out.append([bucket, open_, high_, low, close, volume])
+    return out
+
+
+class Rollup:
+    """Bars at every resolution for one CA, plus its all-time high."""
+
+    def __init__(self):
+        self.series = {name: BarRing(seconds, capacity) for name, (seconds, capacity) in RESOLUTIONS.items()}
+        self.ath = 0.0
+        self.since = None  # first quote seen
+        self.updated = 0.0
+
+    def add(self, ts: float, price: float, volume: float):
+        for series in self.series.values():
+            series.add(ts, price, volume)
+        self.ath = max(self.ath, price)
+        self.since = ts if self.since is None else min(self.since, ts)
+        self.updated = max(self.updated, ts)
+
+    def covers(self, seconds: float) -> bool:
+        """Whether quotes go back at least `seconds` from the newest."""
+        return self.since is not None and self.updated - self.since >= seconds
+
+    def resolution(self, seconds: float) -> BarRing:
+        """Finest resolution that still covers `seconds` back."""
+        for series in self.series.values():
+            if series.seconds * series.capacity >= seconds:
+                return series
+        return self.series["1d"]
+
+
+_rollups: Dict[str, Rollup] = {}
+_restoring: Dict[str, list] = {}  # CA -> (ts, mc, volume) quoted while its bars are rebuilt
+_restore_queue: "queue.Queue" = queue.Queue()
+_restorer: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def record(ca: str, ts: float, mc: float, volume: float):
+    """Fold a quote into the CA's bars."""
+    if mc <= 0:
+        return
+    with _lock:
+        pending = _restoring.get(ca)
+        if pending is not None:
+            pending.append((ts, mc, volume))  # applied once the restore lands
+            return
+        rollup = _rollups.get(ca)
+        if rollup is None:
+            rollup = _rollups[ca] = Rollup()
+    rollup.add(ts, mc, volume)
+
+
+def _rebuild(quotes: Dict[str, List[float]]) -> Rollup:
+    """
+    Bars from archived quotes (core.archive.scan columns).
+
+    Each resolution is folded from the one below it, so the quotes are
+    walked only once.
+    """
+    ticks = [(ts, mc, mc, mc, mc, volume) for ts, mc, volume in zip(quotes["ts"], quotes["mc"], quotes["volume"]) if mc > 0]
+    rollup = Rollup()
+    if ticks:
+        bars = ticks
+        for series in rollup.series.values():
+            bars = _downsample(bars, series.seconds)
+            series.restore(bars)
+        rollup.ath = max(bar[2] for bar in bars)
+        rollup.since, rollup.updated = ticks[0][0], ticks[-1][0]
+    return rollup
+
+
+def restore(ca: str, quotes: Dict[str, List[float]]):
+    """Rebuild a CA's bars from archived quotes, now (see schedule_restore())."""
+    rollup = _rebuild(quotes)
+    with _lock:
+        _restoring.pop(ca, None)
+        _rollups[ca] = rollup
+
+
+def schedule_restore(ca: str, load: Callable[[], Dict[str, List[float]]]):
+    """
+    Rebuild a CA's bars from load() (e.g. core.archive.retained) on the
+    restore thread, one CA at a time, so a restart with many CAs doesn't
+    hold up alert evaluation. Quotes recorded meanwhile are kept and
+    folded in afterwards.
+    """
+    global _restorer
+    with _lock:
+        if ca in _rollups or ca in _restoring:
+            return
+        _restoring[ca] = []
+        if _restorer is None or not _restorer.is_alive():
+            _restorer = threading.Thread(target=_restore_loop, name="rollup-restore", daemon=True)
+            _restorer.start()
+    _restore_queue.put((ca, load))
+
+
+def _restore_loop():
+    while True:
+        ca, load = _restore_queue.get()
+        try:
+            rollup = _rebuild(load())
+        except Exception as e:
+            print(f"⚠️ Rollup restore failed for {ca}: {e}")
+            rollup = Rollup()
+        with _lock:
+            pending = _restoring.pop(ca, None)
+            if pending is not None:  # None: forgotten while restoring
+                for ts, mc, volume in pending:
+                    if rollup.since is None or ts > rollup.updated:  # not already archived
+                        rollup.add(ts, mc, volume)
+                _rollups[ca] = rollup
+        _restore_queue.task_done()
+
+
+def has(ca: str) -> bool:
+    """Whether the CA has bars in memory or on the way (restored or recorded)."""
+    return ca in _rollups or ca in _restoring
+
+
+def pct_change(ca: str, seconds: float) -> Optional[float]:
+    """
+    % change of the CA's MC over the last `seconds` (e.g. 3600 = pct_1h).
+
+    Returns None until the CA has been quoted for that long.
+    """
+    rollup = _rollups.get(ca)
+    if rollup is None:
+        return None
+    series = rollup.resolution(seconds)
+    then = series.close_at(rollup.updated - seconds)
+    now = series.last()
+    if not then or not now:
+        return None
+    return (now["close"] - then) / then * 100
+
+
+def high(ca: str, seconds: float) -> Optional[float]:
+    """
+    Highest MC seen over the last `seconds` (e.g. 86400 = 24h high).
+
+    Returns None until the CA has been quoted for that long.
+    """
+    rollup = _rollups.get(ca)
+    if rollup is None or not rollup.covers(seconds):
+        return None
+    return rollup.resolution(seconds).high_since(rollup.updated - seconds)
+
+
+def drawdown(ca: str, seconds: float = 86400) -> Optional[float]:
+    """% the CA is down from its high over the last `seconds`."""
+    rollup = _rollups.get(ca)
+    peak = high(ca, seconds)
+    if not peak or rollup is None:
+        return None
+    return (peak - rollup.series["1m"].last()["close"]) / peak * 100
+
+
+def ath(ca: str) -> Optional[float]:
+    """Highest MC seen while the CA was tracked."""
+    rollup = _rollups.get(ca)
+    return rollup.ath if rollup else None
+
+
+def bars(ca: str, resolution: str, n: Optional[int] = None) -> List[Dict[str, float]]:
+    """The newest n bars of a resolution ("1m", "5m", "1h", "1d"), oldest first."""
+    rollup = _rollups.get(ca)
+    return rollup.series[resolution].bars(n) if rollup else []
+
+
+def forget_untracked(tracked):
+    """Drop bars for CAs nobody tracks any more."""
+    with _lock:
+        for ca in list(_rollups):
+            if ca not in tracked:
+                del _rollups[ca]
+        for ca in list(_restoring):
+            if ca not in tracked:
+                del _restoring[ca]
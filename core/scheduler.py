@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Poll Scheduler - Decides which CAs to fetch each monitor tick
+Pure bookkeeping. No I/O.
+
+Each plan has a freshness target (plans.POLL_INTERVALS). A CA is
+fetched once for everyone who tracks it, at the freshest target of
+any of them - a CA tracked by one pro user is pro-fresh for all.
+Attainment is measured per tier so the API budget spent on paying
+users is visible.
+"""
+
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from plans import get_poll_interval
+from metrics import poll_sla_checks_total, poll_sla_attainment
+
+
+class PollScheduler:
+    """Tracks when each CA was last fetched and which ones are due."""
+
+    def __init__(self, tick: float, interval_for: Callable[[str], float] = get_poll_interval):
+        """
+        Args:
+            tick: Monitor wake-up interval - the scheduling granularity,
+                allowed as slack when judging SLAs
+            interval_for: plan -> freshness target in seconds
+        """
+        self.tick = tick
+        self.interval_for = interval_for
+        self.last_fetched = {}  # ca -> epoch of last successful fetch
+        self.last_attempt = {}  # ca -> epoch of last fetch attempt
+
+    def targets(self, tracked: Iterable[Tuple[str, str]], plan_for: Callable[[str], str]) -> Dict[str, Tuple[str, float]]:
+        """
+        Freshness target for every tracked CA.
+
+        Args:
+            tracked: (user_id, ca) pairs
+            plan_for: user_id -> plan name
+
+        Returns:
+            ca -> (tier, interval), using the freshest tier tracking it
+        """
+        plans = {}
+        targets = {}
+
+        for user_id, ca in tracked:
+            plan = plans.get(user_id)
+            if plan is None:
+                plan = plans[user_id] = plan_for(user_id)
+
+            interval = self.interval_for(plan)
+            current = targets.get(ca)
+            if current is None or interval < current[1]:
+                targets[ca] = (plan, interval)
+
+        return targets
+
+    def due(self, targets: Dict[str, Tuple[str, float]], now: Optional[float] = None) -> List[str]:
+        """
+        CAs whose target interval has elapsed, most overdue first.
+
+        A CA is due once its interval has passed since the last attempt
+        (failed fetches wait a full interval too, so a dead CA can't eat
+        the budget every tick).
+        """
+        now = now if now is not None else time.time()
+        overdue = []
+
+        for ca, (_, interval) in targets.items():
+            last = self.last_attempt.get(ca)
+            if last is None:
+                overdue.append((float("inf"), ca))
+                continue
+
+            # Fetch a tick early rather than a tick late
+            lateness = (now - last) - (interval - self.tick)
+            if lateness >= 0:
+                overdue.append((lateness / interval, ca))
+
+        overdue.sort(reverse=True)
+        return [ca for _, ca in overdue]
+
+    def record(self, attempted: Iterable[str], fetched: Iterable[str], now: Optional[float] = None):
+        """Note which CAs were attempted and which returned a quote."""
+        now = now if now is not None else time.time()
+        for ca in attempted:
+            self.last_attempt[ca] = now
+        for ca in fetched:
+            self.last_fetched[ca] = now
+
+    def measure_sla(self, targets: Dict[str, Tuple[str, float]], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Check every tracked CA against its tier's target and publish metrics.
+
+        A CA meets its SLA when its last good quote is no older than the
+        tier interval plus one tick of scheduling slack.
+
+        Returns:
+            tier -> share of CAs within target (0-1)
+        """
+        now = now if now is not None else time.time()
+        met = {}
+        total = {}
+
+        for ca, (tier, interval) in targets.items():
+            last = self.last_fetched.get(ca)
+            ok = last is not None and now - last <= interval + self.tick
+
+            total[tier] = total.get(tier, 0) + 1
+            met[tier] = met.get(tier, 0) + (1 if ok else 0)
+            poll_sla_checks_total.inc(tier=tier, result="met" if ok else "missed")
+
+        attainment = {tier: met[tier] / total[tier] for tier in total}
+        for tier, ratio in attainment.items():
+            poll_sla_attainment.set(ratio, tier=tier)
+
+        return attainment
+
+    def forget_untracked(self, targets: Dict[str, Tuple[str, float]]):
+        """Drop bookkeeping for CAs nobody tracks any more."""
+        for ca in list(self.last_attempt):
+            if ca not in targets:
+                self.last_attempt.pop(ca, None)
+                self.last_fetched.pop(ca, None)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Monitor Sharding - Split the tracked CAs across worker processes
+
+CAs are placed on a consistent-hash ring of N shards, so adding a shard
+only moves ~1/N of the tokens. Each worker prefers one shard and holds
+it with an exclusive file lock. The OS drops the lock the moment a
+worker dies; once its heartbeat is LEASE_TTL old, a surviving worker
+takes the shard over and hands it back when the owner returns.
+
+Every shard writes alerts to the same outbox, so delivery is unchanged.
+"""
+
+import bisect
+import fcntl
+import hashlib
+import os
+import time
+from typing import Dict, Set
+
+LEASE_DIR = os.getenv("LEASE_DIR", "monitor_leases")
+LEASE_TTL = 10.0  # seconds without a heartbeat before a shard is taken over
+VIRTUAL_NODES = 64  # ring points per shard, for an even spread
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys (CAs, list IDs) to shard numbers."""
+
+    def __init__(self, shards: int, vnodes: int = VIRTUAL_NODES):
+        self.shards = shards
+        points = sorted(
+            (_hash(f"shard-{shard}#{v}"), shard)
+            for shard in range(shards)
+            for v in range(vnodes)
+        )
+        self.keys = [point for point, _ in points]
+        self.owners = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        """Shard responsible for a key."""
+        if self.shards <= 1:
+            return 0
+        index = bisect.bisect(self.keys, _hash(key)) % len(self.keys)
+        return self.owners[index]
+
+
+class ShardLeases:
+    """File-lock leases over shards for one worker."""
+
+    def __init__(self, shard_id: int, shards: int, lease_dir: str = None):
+        """
+        Args:
+            shard_id: This worker's preferred shard
+            shards: Total number of shards
+            lease_dir: Directory for lock and heartbeat files
+        """
+        self.shard_id = shard_id
+        self.shards = shards
+        self.lease_dir = lease_dir or LEASE_DIR
+        self.ring = HashRing(shards)
+        self.held: Dict[int, int] = {}  # shard -> open lock fd
+        os.makedirs(self.lease_dir, exist_ok=True)
+
+    def _lock_path(self, shard: int) -> str:
+        return os.path.join(self.lease_dir, f"shard-{shard}.lock")
+
+    def _heartbeat_path(self, shard: int) -> str:
+        return os.path.join(self.lease_dir, f"shard-{shard}.alive")
+
+    def _heartbeat(self):
+        """Tell other workers our preferred shard's owner is alive."""
+        path = self._heartbeat_path(self.shard_id)
+        with open(path, "a"):
+            pass
+        os.utime(path, None)
+
+    def _owner_alive(self, shard: int) -> bool:
+        """Whether the worker that prefers this shard has checked in recently."""
+        try:
+            return time.time() - os.path.getmtime(self._heartbeat_path(shard)) < LEASE_TTL
+        except OSError:
+            return False
+
+    def _acquire(self, shard: int) -> bool:
+        fd = os.open(self._lock_path(shard), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.held[shard] = fd
+        return True
+
+    def _release(self, shard: int):
+        fd = self.held.pop(shard, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def refresh(self) -> Set[int]:
+        """
+        Renew our heartbeat, claim our shard, take over orphaned shards
+        and hand back shards whose owner has returned.
+
+        Returns:
+            Shards this worker owns for the coming tick
+        """
+        self._heartbeat()
+
+        for shard in range(self.shards):
+            preferred = shard == self.shard_id
+
+            if shard in self.held:
+                if not preferred and self._owner_alive(shard):
+                    print(f"↩️ Handing shard {shard} back to its worker")
+                    self._release(shard)
+                continue
+
+            if preferred or not self._owner_alive(shard):
+                if self._acquire(shard) and not preferred:
+                    print(f"🛟 Took over shard {shard}")
+
+        return set(self.held)
+
+    def owns(self, key: str) -> bool:
+        """Whether a key falls on a shard we hold."""
+        return self.ring.shard_for(key) in self.held
+
+    def close(self):
+        """Release every lease."""
+        for shard in list(self.held):
+            self._release(shard)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Load Shedding - Keep the alerts most likely to fire on time
+Pure bookkeeping. No I/O.
+
+When provider latency spikes and ticks overrun their deadline, the
+monitor gives up work in a fixed order instead of falling behind on
+everything equally:
+
+  1. skip_history  - no history updates for coins with nothing armed
+                     (automatic checks included)
+  2. defer_meta    - list/meta evaluation waits for a calmer tick
+  3. near_only     - only poll coins close to an armed threshold
+
+Each overrun escalates one level; a comfortably fast tick steps back
+down one. What was shed is counted in monitor_shed_total.
+"""
+
+import time
+from typing import Iterable, List, Set
+from metrics import monitor_shed_level, monitor_shed_total
+
+SHED_LEVELS = ("normal", "skip_history", "defer_meta", "near_only")
+SKIP_HISTORY = 1
+DEFER_META = 2
+NEAR_ONLY = 3
+
+RECOVER_RATIO = 0.6  # step down when a tick uses less than this share of the deadline
+NEAR_THRESHOLD = 0.15  # "near" = within 15% of an armed price alert
+
+
+class LoadShedder:
+    """Tracks the shed level from tick durations against a deadline."""
+
+    def __init__(self, deadline: float):
+        """
+        Args:
+            deadline: Seconds a monitor tick may take
+        """
+        self.deadline = deadline
+        self.level = 0
+        monitor_shed_level.set(0)
+
+    def sheds(self, level: int) -> bool:
+        """Whether work at this level is currently being shed."""
+        return self.level >= level
+
+    def past_deadline(self, tick_start: float) -> bool:
+        """Whether this tick (started at perf_counter tick_start) is already late."""
+        return time.perf_counter() - tick_start > self.deadline
+
+    def observe(self, duration: float):
+        """Adjust the level after a tick."""
+        previous = self.level
+
+        if duration > self.deadline:
+            self.level = min(self.level + 1, len(SHED_LEVELS) - 1)
+        elif duration < self.deadline * RECOVER_RATIO:
+            self.level = max(self.level - 1, 0)
+
+        if self.level != previous:
+            monitor_shed_level.set(self.level)
+            arrow = "⬆️" if self.level > previous else "⬇️"
+            print(f"{arrow} Load shedding: {SHED_LEVELS[previous]} -> {SHED_LEVELS[self.level]} (tick took {duration:.1f}s)")
+
+    def record(self, what: str, count: int = 1):
+        """Count shed work (history, meta, poll)."""
+        if count:
+            monitor_shed_total.inc(count, what=what)
+
+    def filter_due(self, due: Iterable[str], near: Set[str]) -> List[str]:
+        """At near_only, keep only due CAs close to a threshold."""
+        due = list(due)
+        if not self.sheds(NEAR_ONLY):
+            return due
+
+        kept = [ca for ca in due if ca in near]
+        self.record("poll", len(due) - len(kept))
+        return kept
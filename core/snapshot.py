@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Market Snapshot - One consistent view of the market per cycle
+
+Every due CA is fetched once per monitor tick and layered over the
+previous snapshot. Coin alerts, list/meta alerts, combos, time-based
+alerts and the UI all read the same immutable quotes, so nothing is
+evaluated against different prices and no evaluator does its own I/O.
+"""
+
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, NamedTuple, Optional
+from mc import get_market_cap
+
+
+class MarketQuote(NamedTuple):
+    """Market data for one CA at one moment."""
+    ca: str
+    price: float
+    mc: float
+    liquidity: float
+    volume_24h: float
+    fetched_at: float
+
+
+class MarketSnapshot:
+    """Read-only CA -> MarketQuote mapping for one cycle."""
+
+    __slots__ = ("_quotes", "taken_at")
+
+    def __init__(self, quotes: Dict[str, MarketQuote], taken_at: Optional[float] = None):
+        self._quotes = MappingProxyType(dict(quotes))
+        self.taken_at = taken_at if taken_at is not None else time.time()
+
+    def get(self, ca: str) -> Optional[MarketQuote]:
+        """Quote for a CA, or None if it couldn't be fetched."""
+        return self._quotes.get(ca)
+
+    def mc(self, ca: str) -> Optional[float]:
+        """Market cap for a CA, or None."""
+        quote = self._quotes.get(ca)
+        return quote.mc if quote else None
+
+    def cas(self):
+        """All CAs with a quote."""
+        return self._quotes.keys()
+
+    def __contains__(self, ca) -> bool:
+        return ca in self._quotes
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def age(self) -> float:
+        """Seconds since the snapshot was taken."""
+        return time.time() - self.taken_at
+
+    def merge(self, newer: "MarketSnapshot", keep=None) -> "MarketSnapshot":
+        """
+        New snapshot with `newer`'s quotes layered over this one's.
+
+        Args:
+            newer: Quotes fetched this tick
+            keep: Optional set of CAs to retain (drops untracked CAs)
+        """
+        quotes = dict(self._quotes)
+        quotes.update(newer._quotes)
+        if keep is not None:
+            quotes = {ca: quote for ca, quote in quotes.items() if ca in keep}
+        return MarketSnapshot(quotes, newer.taken_at)
+
+
+def quote_from_token(ca: str, token: Dict, fetched_at: Optional[float] = None) -> Optional[MarketQuote]:
+    """Convert a get_market_cap() result into a MarketQuote."""
+    if not token or not token.get("mc"):
+        return None
+
+    return MarketQuote(
+        ca=ca,
+        price=float(token.get("price", 0)),
+        mc=float(token["mc"]),
+        liquidity=float(token.get("liquidity", 0)),
+        volume_24h=float(token.get("volume_24h", 0)),
+        fetched_at=fetched_at if fetched_at is not None else time.time()
+    )
+
+
+def fetch_quote(ca: str) -> Optional[MarketQuote]:
+    """Fetch one CA (blocking)."""
+    return quote_from_token(ca, get_market_cap(ca))
+
+
+# Latest snapshot published by the monitor (same process only)
+_latest_snapshot: Optional[MarketSnapshot] = None
+
+
+def publish_snapshot(snapshot: MarketSnapshot):
+    """Make a snapshot available to the UI."""
+    global _latest_snapshot
+    _latest_snapshot = snapshot
+
+
+def get_latest_snapshot() -> Optional[MarketSnapshot]:
+    """Most recent monitor snapshot, if the monitor runs in this process."""
+    return _latest_snapshot
+
+
+def get_quotes(cas: Iterable[str], max_age: float = 120) -> MarketSnapshot:
+    """
+    Quotes for UI screens.
+
+    Reuses the monitor's snapshot when it is fresh enough and only
+    fetches CAs it doesn't cover (blocking - for handlers that already
+    called get_market_cap inline).
+    """
+    latest = _latest_snapshot
+    quotes = {}
+
+    for ca in dict.fromkeys(cas):
+        if not ca:
+            continue
+        quote = latest.get(ca) if latest and latest.age() <= max_age else None
+        if quote is None:
+            quote = fetch_quote(ca)
+        if quote:
+            quotes[ca] = quote
+
+    return MarketSnapshot(quotes)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tick History - Recent quotes per CA
+
+One ring buffer per CA, shared by every user tracking it: parallel
+float arrays for ts, mc, volume and liquidity. Appending a quote and
+expiring old ones are O(1), and nothing is copied per subscriber or
+saved with the user's coins. Readers get a TickView over the samples.
+"""
+
+from array import array
+from typing import Dict, List, Optional
+from config import TICK_RING_SIZE, TICK_WINDOW
+
+FIELDS = ("ts", "mc", "volume", "liquidity")
+
+
+class TickRing:
+    """The last `capacity` samples for one CA, oldest overwritten first."""
+
+    def __init__(self, capacity: int = TICK_RING_SIZE):
+        self.capacity = capacity
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self.end = 0  # samples ever appended; sample n is at n % capacity
+        self.size = 0
+
+    def append(self, ts: float, mc: float, volume: float, liquidity: float):
+        i = self.end % self.capacity
+        columns = self.columns
+        columns["ts"][i] = ts
+        columns["mc"][i] = mc
+        columns["volume"][i] = volume
+        columns["liquidity"][i] = liquidity
+        self.end += 1
+        self.size = min(self.size + 1, self.capacity)
+
+    def expire(self, before: float):
+        """Drop samples older than `before` (they're always the oldest)."""
+        ts = self.columns["ts"]
+        while self.size and ts[(self.end - self.size) % self.capacity] < before:
+            self.size -= 1
+
+    def view(self) -> "TickView":
+        return TickView(self, self.end - self.size, self.end)
+
+
+class TickView:
+    """
+    Samples [first, end) of a ring, oldest first.
+
+    Read it right away: the ring overwrites samples once it wraps.
+    """
+
+    def __init__(self, ring: Optional[TickRing], first: int, end: int):
+        self.ring = ring
+        self.first = first
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.first
+
+    def column(self, field: str) -> List[float]:
+        """One field ("ts", "mc", "volume", "liquidity") for every sample."""
+        count = len(self)
+        if not count:
+            return []
+        values = self.ring.columns[field]
+        start = self.first % self.ring.capacity
+        stop = start + count
+        if stop <= self.ring.capacity:
+            return values[start:stop].tolist()
+        return values[start:].tolist() + values[:stop - self.ring.capacity].tolist()
+
+    def last(self, n: int) -> "TickView":
+        """The newest n samples."""
+        return TickView(self.ring, max(self.first, self.end - n), self.end)
+
+    def since(self, ts: float) -> "TickView":
+        """Samples at or after `ts` (binary search - samples are in time order)."""
+        if not len(self):
+            return self
+        values = self.ring.columns["ts"]
+        lo, hi = self.first, self.end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[mid % self.ring.capacity] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return TickView(self.ring, lo, self.end)
+
+
+_EMPTY = TickView(None, 0, 0)
+_rings: Dict[str, TickRing] = {}
+
+
+def record(ca: str, ts: float, mc: float, volume: float, liquidity: float):
+    """Add a quote to the CA's ring and expire samples past TICK_WINDOW."""
+    ring = _rings.get(ca)
+    if ring is None:
+        ring = _rings[ca] = TickRing()
+    ring.append(ts, mc, volume, liquidity)
+    ring.expire(ts - TICK_WINDOW)
+
+
+def history(ca: str) -> TickView:
+    """Every sample kept for a CA (empty if none)."""
+    ring = _rings.get(ca)
+    return ring.view() if ring else _EMPTY
+
+
+def forget_untracked(tracked):
+    """Drop rings for CAs nobody tracks any more."""
+    for ca in list(_rings):
+        if ca not in tracked:
+            del _rings[ca]
@@ -4,9 +4,7 @@ Core Tracker - Pure data operations
 No UI. No Telegram. Just data.
 """
 
-from storage import load_data, save_data
-from wallets import load_wallets, save_wallets
-from lists import load_lists, save_lists
+import storage
 
 
 class Tracker:
@@ -15,71 +13,22 @@ class Tracker:
     @staticmethod
     def add_coin(user_id: str, coin_data: dict) -> bool:
         """Add a coin to tracking. Returns True if successful."""
-        data = load_data()
-        user_id = str(user_id)
-        
-        if user_id not in data:
-            data[user_id] = {"coins": [], "profile": {"mode": "aggressive"}}
-        
-        # Ensure coins list exists
-        if "coins" not in data[user_id]:
-            data[user_id]["coins"] = []
-        
-        # Initialize required fields
-        coin_data.setdefault("low_mc", coin_data.get("start_mc", 0))
-        coin_data.setdefault("ath_mc", coin_data.get("start_mc", 0))
-        coin_data.setdefault("history", [])
+        # Initialize required fields (ATH/low are per token, see tokens.py)
         coin_data.setdefault("triggered", {})
         
-        data[user_id]["coins"].append(coin_data)
-        save_data(data)
+        # Writes only this user's entry (see storage / store.WALBackend)
+        storage.add_coin(user_id, coin_data)
         return True
     
     @staticmethod
     def get_user_coins(user_id: str) -> list:
         """Get all coins for a user."""
-        data = load_data()
-        user_id = str(user_id)
-        
-        if user_id not in data:
-            return []
-        
-        user_data = data[user_id]
-        if isinstance(user_data, list):
-            return user_data
-        elif isinstance(user_data, dict):
-            return user_data.get("coins", [])
-        
-        return []
+        return storage.get_user_coins(user_id)
     
     @staticmethod
     def remove_coin(user_id: str, ca: str) -> bool:
         """Remove a coin by contract address."""
-        data = load_data()
-        user_id = str(user_id)
-        
-        if user_id not in data:
-            return False
-        
-        user_data = data[user_id]
-        
-        if isinstance(user_data, list):
-            before = len(user_data)
-            data[user_id] = [c for c in user_data if c.get("ca") != ca]
-            after = len(data[user_id])
-        elif isinstance(user_data, dict):
-            coins = user_data.get("coins", [])
-            before = len(coins)
-            user_data["coins"] = [c for c in coins if c.get("ca") != ca]
-            after = len(user_data["coins"])
-        else:
-            return False
-        
-        if after < before:
-            save_data(data)
-            return True
-        
-        return False
+        return storage.remove_coin(user_id, ca)
     
     @staticmethod
     def add_wallet(user_id: str, address: str, label: str = None) -> bool:
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+State Database - SQLite backend of the document store (see store.py)
+
+Used when STORAGE_BACKEND=sqlite. Users/coins, wallets, lists and groups
+have normalized tables (a coin's alerts and triggered flags are rows of
+their own); every other document is stored one row per owner.
+
+Saves are diffs: rows that didn't change aren't written, rows that
+disappeared are deleted, and saves for one owner only look at that
+owner's rows. The database runs in WAL mode so the monitor and UI can
+read while the other writes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from metrics import storage_rows_written_total
+
+DB_FILE = os.getenv("STATE_DB", "state.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS doc_versions (
+    doc TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    doc TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (doc, owner)
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT,
+    doc TEXT NOT NULL DEFAULT '{}',
+    legacy INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS coins (
+    user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+    ca TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    start_mc REAL,
+    paused INTEGER,
+    doc TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (user_id, ca)
+);
+CREATE TABLE IF NOT EXISTS coin_alerts (
+    user_id TEXT NOT NULL,
+    ca TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (user_id, ca, alert_type),
+    FOREIGN KEY (user_id, ca) REFERENCES coins (user_id, ca) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS coin_triggered (
+    user_id TEXT NOT NULL,
+    ca TEXT NOT NULL,
+    alert_type TEXT NOT NULL,
+    fired INTEGER NOT NULL,
+    PRIMARY KEY (user_id, ca, alert_type),
+    FOREIGN KEY (user_id, ca) REFERENCES coins (user_id, ca) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS wallets (
+    user_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    label TEXT,
+    doc TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (user_id, address)
+);
+CREATE TABLE IF NOT EXISTS lists (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    doc TEXT NOT NULL DEFAULT '{}',
+    legacy INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, name)
+);
+CREATE TABLE IF NOT EXISTS list_coins (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ca TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (user_id, name, ca),
+    FOREIGN KEY (user_id, name) REFERENCES lists (user_id, name) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS groups (
+    group_id TEXT PRIMARY KEY,
+    doc TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS group_admins (
+    group_id TEXT NOT NULL REFERENCES groups (group_id) ON DELETE CASCADE,
+    admin TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (group_id, admin)
+);
+CREATE TABLE IF NOT EXISTS group_coins (
+    group_id TEXT NOT NULL REFERENCES groups (group_id) ON DELETE CASCADE,
+    ca TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    doc TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (group_id, ca)
+);
+CREATE INDEX IF NOT EXISTS idx_coins_ca ON coins (ca);
+"""
+
+# Table -> (key columns, value columns). In the normalized tables the
+# first key column is the owner (user or group) scoped saves filter on.
+_TABLES = {
+    "documents": (("doc", "owner"), ("body",)),
+    "users": (("user_id",), ("profile", "doc", "legacy")),
+    "coins": (("user_id", "ca"), ("position", "start_mc", "paused", "doc")),
+    "coin_alerts": (("user_id", "ca", "alert_type"), ("value",)),
+    "coin_triggered": (("user_id", "ca", "alert_type"), ("fired",)),
+    "wallets": (("user_id", "address"), ("position", "label", "doc")),
+    "lists": (("user_id", "name"), ("doc", "legacy")),
+    "list_coins": (("user_id", "name", "ca"), ("position",)),
+    "groups": (("group_id",), ("doc",)),
+    "group_admins": (("group_id", "admin"), ("position",)),
+    "group_coins": (("group_id", "ca"), ("position", "doc")),
+}
+
+
+def _upsert_sql(table: str) -> str:
+    """Insert, or update only when a value actually changed."""
+    keys, columns = _TABLES[table]
+    names = keys + columns
+    return (
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        f"{', '.join(f'{c} = excluded.{c}' for c in columns)} "
+        f"WHERE ({', '.join(columns)}) IS NOT ({', '.join(f'excluded.{c}' for c in columns)})"
+    )
+
+
+# Built once so every save reuses the same prepared statements
+_UPSERT = {table: _upsert_sql(table) for table in _TABLES}
+_DELETE = {
+    table: f"DELETE FROM {table} WHERE {' AND '.join(f'{k} = ?' for k in keys)}"
+    for table, (keys, _) in _TABLES.items()
+}
+
+# Coin fields with a column of their own (everything else goes in doc)
+_COIN_COLUMNS = ("start_mc", "paused")
+
+# Coin columns older databases have: token fields, kept per CA in
+# tokens.py now (any values are moved into doc, see _upgrade())
+_DROPPED_COIN_COLUMNS = ("low_mc", "ath_mc")
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    """This thread's connection (kept open so statements stay prepared)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE:
+        return conn
+
+    conn = sqlite3.connect(DB_FILE, timeout=10, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    _upgrade(conn)
+    _local.conn = conn
+    _local.path = DB_FILE
+    return conn
+
+
+def _upgrade(conn: sqlite3.Connection):
+    """Bring a database created by an older version up to _SCHEMA."""
+    def stale():
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(coins)")}
+        return [column for column in _DROPPED_COIN_COLUMNS if column in columns]
+
+    if not stale():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for column in stale():  # re-read: another process may have upgraded first
+            conn.execute(
+                f"UPDATE coins SET doc = json_set(doc, '$.{column}', {column}) WHERE {column} IS NOT NULL"
+            )
+            conn.execute(f"ALTER TABLE coins DROP COLUMN {column}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _dump(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _sync(conn: sqlite3.Connection, table: str, rows: List[Tuple], scope: Optional[Dict] = None):
+    """
+    Make `table` hold exactly `rows` (within `scope`, e.g. one owner).
+
+    Unchanged rows aren't written; rows missing from `rows` are deleted.
+    """
+    keys, _ = _TABLES[table]
+    width = len(keys)
+    scope = scope or {}
+
+    sql = f"SELECT {', '.join(keys)} FROM {table}"
+    if scope:
+        sql += " WHERE " + " AND ".join(f"{column} = ?" for column in scope)
+    existing = conn.execute(sql, tuple(scope.values())).fetchall()
+
+    before = conn.total_changes
+    gone = set(existing) - {row[:width] for row in rows}
+    conn.executemany(_DELETE[table], gone)
+    conn.executemany(_UPSERT[table], rows)
+
+    written = conn.total_changes - before
+    if written:
+        storage_rows_written_total.inc(written, table=table)
+
+
+def _owner(table: str, owner: Optional[str]) -> Dict:
+    """Scope of a save limited to one owner."""
+    return {} if owner is None else {_TABLES[table][0][0]: owner}
+
+
+def _bump(conn: sqlite3.Connection, doc: str):
+    """Record that a document changed (read caches compare versions)."""
+    conn.execute(
+        "INSERT INTO doc_versions (doc, version) VALUES (?, 1) "
+        "ON CONFLICT (doc) DO UPDATE SET version = version + 1",
+        (doc,)
+    )
+
+
+def _scoped(data: dict, owner: Optional[str]) -> dict:
+    """The part of a full dict that a scoped save covers."""
+    if owner is None:
+        return data
+    return {owner: data[owner]} if owner in data else {}
+
+
+def _select(conn: sqlite3.Connection, sql: str, owner: Optional[str], owner_column: str, order: str):
+    if owner is None:
+        return conn.execute(f"{sql} ORDER BY {order}").fetchall()
+    return conn.execute(f"{sql} WHERE {owner_column} = ? ORDER BY {order}", (owner,)).fetchall()
+
+
+# ============================================================================
+# USERS AND COINS (storage.py)
+# ============================================================================
+
+def load_users(user_id: Optional[str] = None) -> Dict:
+    """
+    Users in data.json format.
+
+    Args:
+        user_id: Only this user (the dict is empty if they have no data)
+    """
+    conn = _connect()
+    alerts: Dict[Tuple[str, str], Dict] = {}
+    for uid, ca, alert_type, value in _select(
+            conn, "SELECT user_id, ca, alert_type, value FROM coin_alerts", user_id, "user_id", "rowid"):
+        alerts.setdefault((uid, ca), {})[alert_type] = json.loads(value)
+
+    triggered: Dict[Tuple[str, str], Dict] = {}
+    for uid, ca, alert_type, fired in _select(
+            conn, "SELECT user_id, ca, alert_type, fired FROM coin_triggered", user_id, "user_id", "rowid"):
+        triggered.setdefault((uid, ca), {})[alert_type] = bool(fired)
+
+    coins: Dict[str, List] = {}
+    for row in _select(
+            conn, "SELECT user_id, ca, start_mc, paused, doc FROM coins",
+            user_id, "user_id", "user_id, position"):
+        uid, ca, start_mc, paused, doc = row
+        coin = {"ca": ca, **json.loads(doc)}
+        for field, value in zip(_COIN_COLUMNS, (start_mc, paused)):
+            if value is not None:
+                coin[field] = bool(value) if field == "paused" else value
+        coin["alerts"] = alerts.get((uid, ca), {})
+        coin["triggered"] = triggered.get((uid, ca), {})
+        coins.setdefault(uid, []).append(coin)
+
+    data = {}
+    for uid, profile, doc, legacy in _select(
+            conn, "SELECT user_id, profile, doc, legacy FROM users", user_id, "user_id", "rowid"):
+        if legacy:
+            data[uid] = coins.get(uid, [])
+            continue
+        user_data = json.loads(doc)
+        if profile is not None:
+            user_data["profile"] = json.loads(profile)
+        if uid in coins or "coins" in user_data:
+            user_data["coins"] = coins.get(uid, [])
+        data[uid] = user_data
+    return data
+
+
+def save_users(data: dict, user_id: Optional[str] = None):
+    """
+    Save users in data.json format, writing only rows that changed.
+
+    Args:
+        user_id: Only save (and only delete rows of) this user
+    """
+    users, coins, alerts, triggered = [], [], [], []
+
+    for uid, user_data in _scoped(data, user_id).items():
+        uid = str(uid)
+        legacy = isinstance(user_data, list)
+        user_coins = user_data if legacy else user_data.get("coins", [])
+
+        if legacy:
+            users.append((uid, None, "{}", 1))
+        else:
+            rest = {k: v for k, v in user_data.items() if k not in ("coins", "profile")}
+            if "coins" in user_data:
+                rest["coins"] = []  # remember the key even while empty
+            profile = _dump(user_data["profile"]) if "profile" in user_data else None
+            users.append((uid, profile, _dump(rest), 0))
+
+        seen = set()
+        for position, coin in enumerate(user_coins):
+            ca = coin.get("ca")
+            if not ca:
+                continue
+            if ca in seen:
+                # (user_id, ca) is the key, so only one row can be kept
+                print(f"⚠️ User {uid} tracks {ca} twice - saving the first, dropping the one at position {position}")
+                continue
+            seen.add(ca)
+            rest = {k: v for k, v in coin.items()
+                    if k not in ("ca", "alerts", "triggered") + _COIN_COLUMNS}
+            paused = coin.get("paused")
+            coins.append((
+                uid, ca, position, coin.get("start_mc"),
+                None if paused is None else int(bool(paused)),
+                _dump(rest)
+            ))
+            for alert_type, value in (coin.get("alerts") or {}).items():
+                alerts.append((uid, ca, alert_type, _dump(value)))
+            for alert_type, fired in (coin.get("triggered") or {}).items():
+                triggered.append((uid, ca, alert_type, int(bool(fired))))
+
+    conn = _connect()
+    with conn:
+        _bump(conn, "data")
+        _sync(conn, "users", users, _owner("users", user_id))
+        _sync(conn, "coins", coins, _owner("coins", user_id))
+        _sync(conn, "coin_alerts", alerts, _owner("coin_alerts", user_id))
+        _sync(conn, "coin_triggered", triggered, _owner("coin_triggered", user_id))
+
+
+# ============================================================================
+# WALLETS (wallets.py)
+# ============================================================================
+
+def load_wallets(user_id: Optional[str] = None) -> Dict:
+    """Wallets in wallets.json format."""
+    data: Dict[str, List] = {}
+    for uid, address, label, doc in _select(
+            _connect(), "SELECT user_id, address, label, doc FROM wallets",
+            user_id, "user_id", "user_id, position"):
+        data.setdefault(uid, []).append({"address": address, "label": label, **json.loads(doc)})
+    return data
+
+
+def save_wallets(data: dict, user_id: Optional[str] = None):
+    """Save wallets in wallets.json format, writing only rows that changed."""
+    rows = []
+    for uid, wallets in _scoped(data, user_id).items():
+        seen = set()
+        for position, wallet in enumerate(wallets):
+            address = wallet.get("address")
+            if not address or address in seen:
+                continue
+            seen.add(address)
+            rest = {k: v for k, v in wallet.items() if k not in ("address", "label")}
+            rows.append((str(uid), address, position, wallet.get("label"), _dump(rest)))
+
+    conn = _connect()
+    with conn:
+        _bump(conn, "wallets")
+        _sync(conn, "wallets", rows, _owner("wallets", user_id))
+
+
+# ============================================================================
+# LISTS (lists.py)
+# ============================================================================
+
+def load_lists(user_id: Optional[str] = None) -> Dict:
+    """Lists in lists.json format."""
+    conn = _connect()
+    coins: Dict[Tuple[str, str], List] = {}
+    for uid, name, ca in _select(
+            conn, "SELECT user_id, name, ca FROM list_coins", user_id, "user_id", "user_id, name, position"):
+        coins.setdefault((uid, name), []).append(ca)
+
+    data: Dict[str, Dict] = {}
+    for uid, name, doc, legacy in _select(
+            conn, "SELECT user_id, name, doc, legacy FROM lists", user_id, "user_id", "rowid"):
+        list_coins = coins.get((uid, name), [])
+        data.setdefault(uid, {})[name] = list_coins if legacy else {"coins": list_coins, **json.loads(doc)}
+    return data
+
+
+def save_lists(data: dict, user_id: Optional[str] = None):
+    """Save lists in lists.json format, writing only rows that changed."""
+    lists, coins = [], []
+    for uid, user_lists in _scoped(data, user_id).items():
+        uid = str(uid)
+        for name, list_info in user_lists.items():
+            legacy = not isinstance(list_info, dict)
+            list_coins = list_info if legacy else list_info.get("coins", [])
+            rest = {} if legacy else {k: v for k, v in list_info.items() if k != "coins"}
+            lists.append((uid, name, _dump(rest), int(legacy)))
+            for position, ca in enumerate(dict.fromkeys(list_coins)):
+                coins.append((uid, name, ca, position))
+
+    conn = _connect()
+    with conn:
+        _bump(conn, "lists")
+        _sync(conn, "lists", lists, _owner("lists", user_id))
+        _sync(conn, "list_coins", coins, _owner("list_coins", user_id))
+
+
+# ============================================================================
+# GROUPS (groups.py)
+# ============================================================================
+
+def load_groups(group_id: Optional[str] = None) -> Dict:
+    """Groups in groups.json format."""
+    conn = _connect()
+    admins: Dict[str, List] = {}
+    for gid, admin in _select(
+            conn, "SELECT group_id, admin FROM group_admins", group_id, "group_id", "group_id, position"):
+        admins.setdefault(gid, []).append(json.loads(admin))
+
+    coins: Dict[str, List] = {}
+    for gid, ca, doc in _select(
+            conn, "SELECT group_id, ca, doc FROM group_coins", group_id, "group_id", "group_id, position"):
+        coins.setdefault(gid, []).append({"ca": ca, **json.loads(doc)})
+
+    data = {}
+    for gid, doc in _select(conn, "SELECT group_id, doc FROM groups", group_id, "group_id", "rowid"):
+        data[gid] = {"coins": coins.get(gid, []), "admins": admins.get(gid, []), **json.loads(doc)}
+    return data
+
+
+def save_groups(data: dict, group_id: Optional[str] = None):
+    """Save groups in groups.json format, writing only rows that changed."""
+    groups, admins, coins = [], [], []
+    for gid, group in _scoped(data, group_id).items():
+        gid = str(gid)
+        groups.append((gid, _dump({k: v for k, v in group.items() if k not in ("coins", "admins")})))
+        for position, admin in enumerate(dict.fromkeys(_dump(a) for a in group.get("admins", []))):
+            admins.append((gid, admin, position))
+        seen = set()
+        for position, coin in enumerate(group.get("coins", [])):
+            ca = coin.get("ca")
+            if not ca or ca in seen:
+                continue
+            seen.add(ca)
+            coins.append((gid, ca, position, _dump({k: v for k, v in coin.items() if k != "ca"})))
+
+    conn = _connect()
+    with conn:
+        _bump(conn, "groups")
+        _sync(conn, "groups", groups, _owner("groups", group_id))
+        _sync(conn, "group_admins", admins, _owner("group_admins", group_id))
+        _sync(conn, "group_coins", coins, _owner("group_coins", group_id))
+
+
+# ============================================================================
+# OTHER DOCUMENTS (one row per owner)
+# ============================================================================
+
+def load_document(name: str, owner: Optional[str] = None) -> Dict:
+    """A document in its JSON file format (only `owner`'s entry, if given)."""
+    if name in NORMALIZED:
+        return NORMALIZED[name][0](owner)
+
+    conn = _connect()
+    if owner is None:
+        rows = conn.execute(
+            "SELECT owner, body FROM documents WHERE doc = ? ORDER BY rowid", (name,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT owner, body FROM documents WHERE doc = ? AND owner = ?", (name, owner)
+        ).fetchall()
+    return {row_owner: json.loads(body) for row_owner, body in rows}
+
+
+def save_document(name: str, data: Dict, owner: Optional[str] = None):
+    """Save a document, writing only owners whose entry changed."""
+    if name in NORMALIZED:
+        NORMALIZED[name][1](data, owner)
+        return
+
+    scope = {"doc": name}
+    if owner is not None:
+        scope["owner"] = owner
+    rows = [(name, str(key), _dump(value)) for key, value in _scoped(data, owner).items()]
+
+    conn = _connect()
+    with conn:
+        _bump(conn, name)
+        _sync(conn, "documents", rows, scope)
+
+
+def document_version(name: str) -> int:
+    """Bumped on every save of the document."""
+    row = _connect().execute("SELECT version FROM doc_versions WHERE doc = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+# Store documents kept in normalized tables: name -> (load, save)
+NORMALIZED = {
+    "data": (load_users, save_users),
+    "wallets": (load_wallets, save_wallets),
+    "lists": (load_lists, save_lists),
+    "groups": (load_groups, save_groups),
+}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Delivery Profiles - What a chat is entitled to, resolved once
+
+The alert path needs the same answers for every alert: which plan the
+chat is on, whether it may get loud alerts, and which alert types the
+user wants with sound. A profile bundles those up from settings.json and
+notification_settings.json and is rebuilt only when either file changes.
+"""
+
+import threading
+from typing import Dict, FrozenSet, NamedTuple
+from plans import get_plan, can_loud_alerts, can_wallet_alerts, can_meta_alerts
+import settings
+from settings import get_chat_settings
+import notification_settings
+from notification_settings import get_user_notification_settings
+
+
+# Alert type (as fired by the monitor) -> notification setting
+NOTIFICATION_CATEGORIES = {
+    "mc": "mc",
+    "pct": "pct",
+    "x": "x",
+    "reclaim": "reclaim",
+    "volume_spike": "volume",
+    "liquidity_drop": "liquidity",
+    "wallet_buy": "wallet",
+    "time_expired": "timebased",
+    "time_target_met": "timebased",
+}
+
+
+def notification_category(alert_type: str) -> str:
+    """Map an alert type to its notification setting key."""
+    if alert_type.startswith("meta_"):
+        return "meta"
+    if alert_type.startswith("combo_"):
+        return "combo"
+    return NOTIFICATION_CATEGORIES.get(alert_type, alert_type)
+
+
+class DeliveryProfile(NamedTuple):
+    """Resolved entitlements and preferences for one chat."""
+    chat_id: str
+    plan: str
+    loud: bool  # plan allows sound and the chat hasn't chosen silent
+    muted: FrozenSet[str]  # notification categories the user turned sound off for
+    wallet_alerts: bool
+    meta_alerts: bool
+
+    def disable_notification(self, alert_type: str) -> bool:
+        """Whether an alert of this type should be delivered silently."""
+        return not self.loud or notification_category(alert_type) in self.muted
+
+
+def build_profile(chat_id) -> DeliveryProfile:
+    """Resolve a chat's profile from settings (memory-cached files)."""
+    chat_id = str(chat_id)
+    chat = get_chat_settings(chat_id)
+    notifications = get_user_notification_settings(chat_id)
+
+    return DeliveryProfile(
+        chat_id=chat_id,
+        plan=get_plan(chat, chat_id),
+        loud=can_loud_alerts(chat, chat_id) and chat.get("alert_mode", "loud") != "silent",
+        muted=frozenset(key for key, enabled in notifications.items() if not enabled),
+        wallet_alerts=can_wallet_alerts(chat, chat_id, is_group=chat_id.startswith("-")),
+        meta_alerts=can_meta_alerts(chat, chat_id)
+    )
+
+
+_profiles: Dict[str, DeliveryProfile] = {}
+_profiles_generation = None
+_lock = threading.Lock()
+
+
+def get_delivery_profile(chat_id) -> DeliveryProfile:
+    """
+    Cached profile for a chat.
+
+    All profiles are dropped when settings.json or
+    notification_settings.json changes (setter or another process).
+    """
+    global _profiles_generation
+
+    generation = (settings._store.current_generation(), notification_settings._store.current_generation())
+    chat_id = str(chat_id)
+
+    with _lock:
+        if generation != _profiles_generation:
+            _profiles.clear()
+            _profiles_generation = generation
+
+        profile = _profiles.get(chat_id)
+        if profile is None:
+            profile = build_profile(chat_id)
+            _profiles[chat_id] = profile
+
+        return profile
@@ -10,7 +10,9 @@ Provides context-aware analysis:
 """
 
 import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+from core import rollups, ticks
+from core.ticks import TickView
 
 # User modes and their thresholds
 USER_MODES = {
@@ -37,6 +39,11 @@ USER_MODES = {
 HISTORY_WINDOW = 600  # 10 minutes in seconds
 
 
+def coin_history(coin: Dict) -> TickView:
+    """Recent quotes for a coin's CA (shared by everyone tracking it)."""
+    return ticks.history(coin.get("ca"))
+
+
 def compute_range_position(mc: float, low_mc: float, ath_mc: float) -> float:
     """
     Compute where price is in historical range (0-1).
@@ -113,17 +120,13 @@ def detect_dump_stabilize_bounce(
     
     Returns: (pattern_detected, pattern_type)
     """
-    history = coin.get("history", [])
+    history = coin_history(coin)
     ath_mc = coin.get("ath_mc", mc)
     
     if len(history) < 3 or ath_mc <= 0 or mc <= 0:
         return False, ""
     
-    current_time = time.time()
-    recent_history = [
-        h for h in history 
-        if current_time - h["ts"] < HISTORY_WINDOW
-    ]
+    recent_history = history.since(time.time() - HISTORY_WINDOW)
     
     if len(recent_history) < 3:
         return False, ""
@@ -133,8 +136,9 @@ def detect_dump_stabilize_bounce(
     if dump_percent < 30:
         return False, ""
     
-    # Check: Is price stabilizing? (small range in last 10 mins)
-    recent_prices = [h["mc"] for h in recent_history if h.get("mc", 0) > 0]
+    # Check: Is price stabilizing? (small range in last 10 mins, before
+    # this quote - the newest sample)
+    recent_prices = [price for price in recent_history.column("mc")[:-1] if price > 0]
     if not recent_prices:
         return False, ""
         
@@ -150,12 +154,12 @@ def detect_dump_stabilize_bounce(
         return False, ""
     
     # Check: Is volume increasing?
-    if len(recent_history) >= 2:
-        recent_vol = recent_history[-1].get("volume", 0)
-        older_vol = recent_history[-3].get("volume", 0) if len(recent_history) >= 3 else 0
-        
-        if older_vol > 0 and recent_vol <= older_vol:
-            return False, ""
+    volumes = recent_history.last(3).column("volume")
+    recent_vol = volumes[-1]
+    older_vol = volumes[0]
+    
+    if older_vol > 0 and recent_vol <= older_vol:
+        return False, ""
     
     # Check: Has there been a small bounce?
     recent_low = min(recent_prices)
@@ -165,10 +169,13 @@ def detect_dump_stabilize_bounce(
     return False, ""
 
 
-def analyze_momentum(history: List[Dict]) -> Tuple[str, float]:
+def analyze_momentum(history: Union[TickView, List[Dict]]) -> Tuple[str, float]:
     """
     Analyze price momentum from history.
     
+    Args:
+        history: A coin's TickView (or a list of {"mc": ...} samples)
+    
     Returns: (direction, strength)
     direction: "up", "down", "stable"
     strength: 0-1 (how strong the move is)
@@ -176,7 +183,11 @@ def analyze_momentum(history: List[Dict]) -> Tuple[str, float]:
     if len(history) < 2:
         return "stable", 0.0
     
-    prices = [h["mc"] for h in history[-5:] if h.get("mc", 0) > 0]  # Last 5 valid entries
+    if isinstance(history, TickView):
+        last = history.last(5).column("mc")
+    else:
+        last = [h.get("mc", 0) for h in history[-5:]]
+    prices = [price for price in last if price > 0]  # Last 5 valid entries
     
     if not prices or len(prices) < 2:
         return "stable", 0.0
@@ -209,7 +220,7 @@ def format_smart_alert(
     """
     ath_mc = coin.get("ath_mc", mc)
     low_mc = coin.get("low_mc", mc)
-    history = coin.get("history", [])
+    history = coin_history(coin)
     quality = compute_quality_score(
         coin.get("liquidity", 0),
         coin.get("volume_24h", 0),
@@ -221,6 +232,8 @@ def format_smart_alert(
     range_pos = compute_range_position(mc, low_mc, ath_mc)
     range_desc = get_range_description(range_pos)
     momentum, momentum_strength = analyze_momentum(history)
+    dd_24h = rollups.drawdown(coin.get("ca", ""), 86400)
+    dd_24h_line = f"📉 Down {dd_24h:.1f}% from 24h high\n" if dd_24h is not None else ""
     quality_label = "🟢" if quality >= 2 else "🟡" if quality == 1 else "🔴"
     
     # Build smart message
@@ -230,6 +243,7 @@ def format_smart_alert(
             f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
             f"💰 MC: ${int(mc):,}\n"
             f"📉 Down {dd_from_ath:.1f}% from ATH\n"
+            f"{dd_24h_line}"
             f"📊 Position: {range_desc}\n"
             f"⚡ Momentum: {momentum.upper()} ({momentum_strength*100:.0f}%)\n"
             f"📈 Volume increasing\n"
@@ -245,6 +259,7 @@ def format_smart_alert(
             f"💰 Target MC reached: ${int(mc):,}\n"
             f"📊 Position in range: {range_desc}\n"
             f"📉 Drawdown from ATH: {dd_from_ath:.1f}%\n"
+            f"{dd_24h_line}"
             f"⚡ Momentum: {momentum.upper()}\n"
             f"{quality_label} Signal Quality: {quality}/3"
         )
@@ -289,38 +304,3 @@ def should_suppress_alert(
     min_score = USER_MODES[user_mode]["min_quality_score"]
     
     return quality < min_score
-
-
-def update_coin_history(coin: Dict, mc: float, volume_24h: float, liquidity: float) -> Dict:
-    """
-    Update coin history and range tracking.
-    """
-    current_time = time.time()
-    
-    # Initialize if needed
-    if "history" not in coin:
-        coin["history"] = []
-    if "low_mc" not in coin:
-        coin["low_mc"] = mc
-    if "ath_mc" not in coin:
-        coin["ath_mc"] = mc
-    
-    # Update ATH and low
-    coin["ath_mc"] = max(coin.get("ath_mc", mc), mc)
-    coin["low_mc"] = min(coin.get("low_mc", mc), mc)
-    
-    # Add to history
-    coin["history"].append({
-        "mc": mc,
-        "ts": current_time,
-        "volume": volume_24h,
-        "liquidity": liquidity
-    })
-    
-    # Trim old history (keep only last 10 minutes)
-    coin["history"] = [
-        h for h in coin["history"]
-        if current_time - h["ts"] < HISTORY_WINDOW * 2  # Keep 20 min for safety
-    ]
-    
-    return coin
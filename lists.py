@@ -1,59 +1,53 @@
-import json
-import os
-import tempfile
-import shutil
-import fcntl
 import time
+from store import Store
 
 LIST_FILE = "lists.json"
 
+_store = Store("lists", lambda: LIST_FILE, binary=True)
+
 def load_lists():
-    """Load all lists from file with retry logic."""
-    if not os.path.exists(LIST_FILE):
-        return {}
-    
-    for attempt in range(3):
-        try:
-            with open(LIST_FILE, "r") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                try:
-                    data = json.load(f)
-                    return data
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        except (json.JSONDecodeError, IOError) as e:
-            if attempt < 2:
-                time.sleep(0.1)
-                continue
-            print(f"Error loading lists: {e}")
-            return {}
-    return {}
+    """Load all lists."""
+    return _store.load()
 
 def save_lists(data):
-    """Save lists to file atomically."""
-    try:
-        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(LIST_FILE) or ".")
-        try:
-            with os.fdopen(fd, "w") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                try:
-                    json.dump(data, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            shutil.move(temp_path, LIST_FILE)
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise e
-    except (IOError, OSError) as e:
-        print(f"Error saving lists: {e}")
+    """Save all lists."""
+    _store.save(data)
+
+def merge_meta_state(user_lists, ours: dict):
+    """
+    Copy the monitor's meta_triggered flags onto a user's latest lists.
+    
+    A flag is only kept while its list (same created_at) still has that
+    meta alert with the same threshold, so edits made after the monitor
+    read the lists win.
+    
+    Args:
+        ours: list_name -> list as the monitor evaluated it
+    """
+    for list_name, mine in ours.items():
+        list_info = (user_lists or {}).get(list_name)
+        if not isinstance(list_info, dict) or list_info.get("created_at") != mine.get("created_at"):
+            continue
+        current = list_info.get("meta_alerts") or {}
+        for key, value in (mine.get("meta_triggered") or {}).items():
+            if key in current and current[key] == (mine.get("meta_alerts") or {}).get(key):
+                list_info.setdefault("meta_triggered", {})[key] = value
+    return user_lists
+
+def save_meta_state(lists_by_user: dict):
+    """
+    Write the monitor's meta alert flags, one user at a time.
+    
+    Args:
+        lists_by_user: user_id -> {list_name: list} as the monitor evaluated them
+    """
+    for user_id, ours in lists_by_user.items():
+        _store.update(str(user_id), lambda user_lists, ours=ours: merge_meta_state(user_lists, ours))
 
 def get_user_lists(user_id):
     """Get all lists for a user as a list of dicts."""
-    data = load_lists()
     uid = str(user_id)
+    data = _store.load(uid)
     
     if uid not in data:
         return []
@@ -76,8 +70,8 @@ def create_list(user_id, name, description="", meta_alerts=None):
     Args:
         meta_alerts: Optional dict with {"n_pumping": N, "total_mc": threshold, "avg_pct": threshold}
     """
-    data = load_lists()
     uid = str(user_id)
+    data = _store.load(uid)
 
     if uid not in data:
         data[uid] = {}
@@ -89,15 +83,16 @@ def create_list(user_id, name, description="", meta_alerts=None):
         "coins": [],
         "description": description,
         "meta_alerts": meta_alerts or {},
-        "meta_triggered": {}
+        "meta_triggered": {},
+        "created_at": time.time()  # tells a re-created list's alerts apart
     }
-    save_lists(data)
+    _store.save(data, uid)
     return True
 
 def add_coin_to_list(user_id, list_name, ca):
     """Add a coin (CA) to a list."""
-    data = load_lists()
     uid = str(user_id)
+    data = _store.load(uid)
 
     if uid not in data or list_name not in data[uid]:
         return False  # List doesn't exist
@@ -113,18 +108,18 @@ def add_coin_to_list(user_id, list_name, ca):
         if ca not in list_data:
             data[uid][list_name].append(ca)
 
-    save_lists(data)
+    _store.save(data, uid)
     return True
 
 def get_lists(user_id):
     """Get all lists for a user."""
-    data = load_lists()
-    return data.get(str(user_id), {})
+    uid = str(user_id)
+    return _store.load(uid).get(uid, {})
 
 def remove_coin_from_list(user_id, list_name, ca):
     """Remove a coin from a list."""
-    data = load_lists()
     uid = str(user_id)
+    data = _store.load(uid)
 
     if uid in data and list_name in data[uid]:
         list_data = data[uid][list_name]
@@ -137,15 +132,15 @@ def remove_coin_from_list(user_id, list_name, ca):
             # Old format (list)
             if ca in list_data:
                 data[uid][list_name].remove(ca)
-        save_lists(data)
+        _store.save(data, uid)
         return True
 
     return False
 
 def delete_list(user_id, list_index):
     """Delete a list by index (int) or by name (str)."""
-    data = load_lists()
     uid = str(user_id)
+    data = _store.load(uid)
 
     if uid not in data:
         return False
@@ -159,7 +154,7 @@ def delete_list(user_id, list_index):
             if list_index not in data[uid]:
                 return False
             data[uid].pop(list_index, None)
-            save_lists(data)
+            _store.save(data, uid)
             return True
 
     # Delete by numeric index
@@ -172,5 +167,5 @@ def delete_list(user_id, list_index):
 
     list_name = list_names[list_index]
     data[uid].pop(list_name, None)  # Safe deletion - prevents KeyError
-    save_lists(data)
+    _store.save(data, uid)
     return True
@@ -1,12 +1,17 @@
-"""Meta alert evaluation logic for lists/narratives."""
+"""
+Meta alert evaluation logic for lists/narratives.
+
+Pure evaluation - prices come from the cycle's MarketSnapshot.
+"""
 from typing import Dict, List, Optional
-from mc import get_market_cap
+from core.snapshot import MarketSnapshot
 
 
 def should_alert_n_pumping(
     list_coins: List[str],
     coin_data: Dict,  # user's coins with start_mc
     n_threshold: int,
+    snapshot: MarketSnapshot,
     pct_threshold: float = 10.0
 ) -> Optional[Dict]:
     """
@@ -16,6 +21,7 @@ def should_alert_n_pumping(
         list_coins: List of contract addresses in the list
         coin_data: Dict mapping CA to coin data (with start_mc)
         n_threshold: Minimum number of coins that must be pumping
+        snapshot: Market snapshot for this cycle
         pct_threshold: Percentage change threshold (default 10%)
     
     Returns:
@@ -26,12 +32,10 @@ def should_alert_n_pumping(
     
     for ca in list_coins:
         # Get current price
-        token = get_market_cap(ca)
-        if not token or not token.get("mc"):
+        current_mc = snapshot.mc(ca)
+        if not current_mc:
             continue
         
-        current_mc = token["mc"]
-        
         # Find start MC from user's coin data
         coin_info = coin_data.get(ca)
         if not coin_info:
@@ -65,7 +69,8 @@ def should_alert_n_pumping(
 
 def should_alert_total_mc(
     list_coins: List[str],
-    mc_threshold: float
+    mc_threshold: float,
+    snapshot: MarketSnapshot
 ) -> Optional[Dict]:
     """
     Check if total market cap of list exceeds threshold.
@@ -73,6 +78,7 @@ def should_alert_total_mc(
     Args:
         list_coins: List of contract addresses
         mc_threshold: Total MC threshold
+        snapshot: Market snapshot for this cycle
     
     Returns:
         Alert details if triggered, None otherwise
@@ -81,9 +87,8 @@ def should_alert_total_mc(
     coin_mcs = []
     
     for ca in list_coins:
-        token = get_market_cap(ca)
-        if token and token.get("mc"):
-            mc = token["mc"]
+        mc = snapshot.mc(ca)
+        if mc:
             total_mc += mc
             coin_mcs.append({"ca": ca, "mc": mc})
     
@@ -101,7 +106,8 @@ def should_alert_total_mc(
 def should_alert_avg_pct(
     list_coins: List[str],
     coin_data: Dict,
-    pct_threshold: float
+    pct_threshold: float,
+    snapshot: MarketSnapshot
 ) -> Optional[Dict]:
     """
     Check if average % change across list exceeds threshold.
@@ -110,6 +116,7 @@ def should_alert_avg_pct(
         list_coins: List of contract addresses
         coin_data: Dict mapping CA to coin data (with start_mc)
         pct_threshold: Average % change threshold
+        snapshot: Market snapshot for this cycle
     
     Returns:
         Alert details if triggered, None otherwise
@@ -119,12 +126,10 @@ def should_alert_avg_pct(
     coin_pcts = []
     
     for ca in list_coins:
-        token = get_market_cap(ca)
-        if not token or not token.get("mc"):
+        current_mc = snapshot.mc(ca)
+        if not current_mc:
             continue
         
-        current_mc = token["mc"]
-        
         coin_info = coin_data.get(ca)
         if not coin_info:
             continue
@@ -159,7 +164,8 @@ def evaluate_meta_alerts(
     list_coins: List[str],
     coin_data: Dict,
     meta_alerts: Dict,
-    meta_triggered: Dict
+    meta_triggered: Dict,
+    snapshot: MarketSnapshot
 ) -> Optional[Dict]:
     """
     Evaluate all meta alerts for a list.
@@ -170,6 +176,7 @@ def evaluate_meta_alerts(
         coin_data: User's coin data
         meta_alerts: Meta alert configuration
         meta_triggered: Dict tracking which alerts have fired
+        snapshot: Market snapshot for this cycle
     
     Returns:
         Alert details if any triggered, None otherwise
@@ -179,7 +186,8 @@ def evaluate_meta_alerts(
         result = should_alert_n_pumping(
             list_coins,
             coin_data,
-            meta_alerts["n_pumping"]
+            meta_alerts["n_pumping"],
+            snapshot
         )
         if result:
             result["list_name"] = list_name
@@ -189,7 +197,8 @@ def evaluate_meta_alerts(
     if "total_mc" in meta_alerts and not meta_triggered.get("total_mc"):
         result = should_alert_total_mc(
             list_coins,
-            meta_alerts["total_mc"]
+            meta_alerts["total_mc"],
+            snapshot
         )
         if result:
             result["list_name"] = list_name
@@ -200,7 +209,8 @@ def evaluate_meta_alerts(
         result = should_alert_avg_pct(
             list_coins,
             coin_data,
-            meta_alerts["avg_pct"]
+            meta_alerts["avg_pct"],
+            snapshot
         )
         if result:
             result["list_name"] = list_name
@@ -15,6 +15,7 @@ TRIGGER CONDITIONS:
 import time
 from typing import Dict, List, Optional, Tuple
 from storage import get_all_coins
+from core import rollups
 
 
 # Track last alert time per list to enforce cooldown
@@ -23,6 +24,9 @@ _last_alert_time: Dict[str, float] = {}
 # Cooldown duration (3 hours)
 COOLDOWN_SECONDS = 3 * 60 * 60
 
+# Coins that must move together
+MIN_MOVERS = 3
+
 
 def detect_meta_movement(
     list_name: str,
@@ -35,7 +39,8 @@ def detect_meta_movement(
     Args:
         list_name: Name of the list
         list_coins: List of contract addresses in the list
-        all_coins_data: Dict mapping CA -> coin data with pct_1h
+        all_coins_data: Dict mapping user -> coins (pct_1h comes from
+            core.rollups, or the coin's own pct_1h until an hour is recorded)
         
     Returns:
         List of (symbol, ca, pct_1h) for movers, or None if no movement
@@ -50,7 +55,9 @@ def detect_meta_movement(
             for coin in coins:
                 if coin.get("ca") == ca:
                     symbol = coin.get("symbol", "???")
-                    pct_1h = coin.get("pct_1h", 0)
+                    pct_1h = rollups.pct_change(ca, 3600)
+                    if pct_1h is None:
+                        pct_1h = coin.get("pct_1h", 0)
                     
                     # Check if pumping 20%+
                     if pct_1h >= 20:
@@ -63,7 +70,7 @@ def detect_meta_movement(
                 break
     
     # Need at least 3 movers
-    if len(movers) >= 3:
+    if len(movers) >= MIN_MOVERS:
         # Sort by performance (highest first)
         movers.sort(key=lambda x: x[2], reverse=True)
         return movers
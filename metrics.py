@@ -0,0 +1,304 @@
+"""Lightweight metrics with a Prometheus-format /metrics endpoint."""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    """Stable, hashable key for a label set."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Optional[Dict] = None) -> str:
+    """Render a label key as {a="1",b="2"}."""
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+class Counter:
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the counter."""
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        """Current value for a label set."""
+        return self.values.get(_label_key(labels), 0.0)
+
+    def total(self) -> float:
+        """Sum across all label sets."""
+        return sum(self.values.values())
+
+    def render(self) -> list:
+        """Prometheus text lines."""
+        with self.lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        """Set the gauge."""
+        with self.lock:
+            self.values[_label_key(labels)] = float(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}  # label key -> [bucket counts..., sum, count]
+        self.last = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation."""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = [0] * len(self.buckets) + [0.0, 0]
+                self.series[key] = series
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+            self.last[key] = value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def summary(self, **labels) -> Dict:
+        """Count, average and last value for a label set."""
+        key = _label_key(labels)
+        series = self.series.get(key)
+        if not series or not series[-1]:
+            return {"count": 0, "avg": 0.0, "last": 0.0}
+        return {
+            "count": series[-1],
+            "avg": series[-2] / series[-1],
+            "last": self.last.get(key, 0.0)
+        }
+
+    def render(self) -> list:
+        """Prometheus text lines."""
+        lines = []
+        with self.lock:
+            for key, series in self.series.items():
+                for i, bound in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {series[i]}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders the exposition text."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """Full Prometheus text exposition."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+registry = MetricsRegistry()
+
+# Monitor
+monitor_cycle_seconds = registry.histogram(
+    "monitor_cycle_seconds", "Duration of a full monitor cycle"
+)
+monitor_cycle_lag_seconds = registry.gauge(
+    "monitor_cycle_lag_seconds", "How far the last cycle overran MONITOR_TICK"
+)
+monitor_phase_seconds = registry.histogram(
+    "monitor_phase_seconds", "Time per tick in each monitor phase (coins: alert checks summed over quotes, meta, save)"
+)
+alerts_generated_total = registry.counter(
+    "alerts_generated_total", "Alerts produced by evaluation, by type"
+)
+monitor_shed_level = registry.gauge(
+    "monitor_shed_level", "Current load shedding level (0 normal, 1 skip history, 2 defer meta, 3 near thresholds only)"
+)
+monitor_shed_total = registry.counter(
+    "monitor_shed_total", "Work skipped by load shedding, by what (history, meta, poll)"
+)
+poll_sla_checks_total = registry.counter(
+    "poll_sla_checks_total", "Freshness checks of tracked CAs, by tier and result (met/missed)"
+)
+poll_sla_attainment = registry.gauge(
+    "poll_sla_attainment", "Share of tracked CAs within their tier's freshness target last tick"
+)
+
+# Monitor pipeline stages
+pipeline_queue_depth = registry.gauge(
+    "pipeline_queue_depth", "Items waiting in each monitor pipeline queue"
+)
+pipeline_stage_seconds = registry.histogram(
+    "pipeline_stage_seconds", "Time a pipeline stage spends per item, by stage"
+)
+pipeline_items_total = registry.counter(
+    "pipeline_items_total", "Items processed by each pipeline stage"
+)
+
+# Providers, cache and rate limits
+provider_request_seconds = registry.histogram(
+    "provider_request_seconds", "Latency of market data provider requests, by endpoint"
+)
+cache_requests_total = registry.counter(
+    "cache_requests_total", "Cache lookups by result (hit/miss)"
+)
+rate_limiter_wait_seconds = registry.histogram(
+    "rate_limiter_wait_seconds", "Time spent waiting on rate limiters, by limiter"
+)
+
+# State storage
+store_operations_total = registry.counter(
+    "store_operations_total", "Document store operations, by store and op (load, save, cache_hit, compact)"
+)
+store_operation_seconds = registry.histogram(
+    "store_operation_seconds", "Document store load/save latency, by store and op"
+)
+store_wal_bytes = registry.gauge(
+    "store_wal_bytes", "Size of each document's write-ahead log since it was last compacted"
+)
+storage_rows_written_total = registry.counter(
+    "storage_rows_written_total", "Rows inserted, updated or deleted in the state database, by table"
+)
+
+# Delivery
+alerts_delivered_total = registry.counter(
+    "alerts_delivered_total", "Alerts delivered to Telegram"
+)
+messages_sent_total = registry.counter(
+    "messages_sent_total", "Telegram messages sent (digests count once)"
+)
+delivery_failures_total = registry.counter(
+    "delivery_failures_total", "Failed Telegram sends, by reason"
+)
+
+# Process
+event_loop_lag_seconds = registry.gauge(
+    "event_loop_lag_seconds", "Delay between a scheduled wake-up and the event loop running it"
+)
+
+
+def cache_hit_ratio() -> float:
+    """Share of cache lookups that were hits (0-1)."""
+    hits = cache_requests_total.get(result="hit")
+    total = cache_requests_total.total()
+    return hits / total if total else 0.0
+
+
+async def monitor_event_loop_lag(interval: float = 1.0):
+    """Measure how late the event loop wakes us up, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - start - interval
+        event_loop_lag_seconds.set(max(0.0, lag))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep scrapes out of the bot log."""
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics from a background thread.
+
+    Runs independently of the Telegram polling/webhook loop.
+
+    Returns:
+        The server, or None if disabled (port 0) or the port is taken
+    """
+    if not port:
+        return None
+
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics server not started on port {port}: {e}")
+        return None
+
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    print(f"📈 Metrics available on :{port}/metrics")
+    return server
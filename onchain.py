@@ -78,10 +78,7 @@ def detect_wallet_buys(
         for wallet in tracked_wallets:
             try:
                 # Create coin dict structure expected by engine
-                coin = {
-                    "ca": token_ca,
-                    "wallet_state": {}  # Engine will manage last_signature
-                }
+                coin = {"ca": token_ca}  # last_signature is kept in token state
                 
                 # Use production engine
                 buy = engine_detect(wallet, coin, min_buy_usd)
@@ -16,6 +16,14 @@ from settings import get_chat_settings
 # 👑 OWNER IDS - Full access, no limits, no checks
 OWNER_IDS = [7483359361]  # Your Telegram user ID
 
+# Price freshness target per plan (seconds between polls of a tracked CA)
+POLL_INTERVALS = {
+    "owner": 10,
+    "pro": 10,
+    "basic": 30,
+    "free": 120
+}
+
 
 def is_owner(user_id: int) -> bool:
     """Check if user is owner (bypasses all gates)."""
@@ -97,6 +105,11 @@ def can_loud_alerts(chat: dict, user_id: int) -> bool:
     return get_plan(chat, user_id) in ["basic", "pro"]
 
 
+def get_poll_interval(plan: str) -> float:
+    """Seconds between price polls for a plan (free tier if unknown)."""
+    return POLL_INTERVALS.get(plan, POLL_INTERVALS["free"])
+
+
 def get_max_coins(user_id: int) -> int:
     """
     Get max number of coins user can track.
@@ -1,6 +1,7 @@
 import requests
 import time
 from rate_limiter import with_rate_limit
+from metrics import provider_request_seconds
 
 MAX_RETRIES = 3
 
@@ -11,7 +12,8 @@ def get_token_price_usd(ca):
     
     for attempt in range(MAX_RETRIES):
         try:
-            r = requests.get(url, timeout=10)
+            with provider_request_seconds.time(endpoint="dexscreener"):
+                r = requests.get(url, timeout=10)
 
             if r.status_code != 200:
                 if attempt < MAX_RETRIES - 1:
@@ -1,24 +1,30 @@
 """Rate limiting system for API calls."""
+import asyncio
+import threading
 import time
 from typing import Dict, Optional
 from collections import defaultdict, deque
+from metrics import rate_limiter_wait_seconds
 
 
 class RateLimiter:
     """Token bucket rate limiter."""
     
-    def __init__(self, requests_per_second: float = 10.0):
+    def __init__(self, requests_per_second: float = 10.0, burst: Optional[float] = None, name: str = "default"):
         """
         Initialize rate limiter.
         
         Args:
             requests_per_second: Max requests allowed per second
+            burst: Max tokens that can accumulate (default 2x rate)
+            name: Label used for wait-time metrics
         """
+        self.name = name
         self.rate = requests_per_second
-        self.capacity = requests_per_second * 2  # Burst capacity
+        self.capacity = burst if burst is not None else requests_per_second * 2  # Burst capacity
         self.tokens = self.capacity
         self.last_update = time.time()
-        self.lock = False
+        self.lock = threading.Lock()  # snapshot fetches run in worker threads
     
     def _refill(self):
         """Refill tokens based on time elapsed."""
@@ -43,13 +49,14 @@ class RateLimiter:
         Returns:
             True if tokens acquired, False if rate limit exceeded
         """
-        self._refill()
-        
-        if self.tokens >= tokens:
-            self.tokens -= tokens
-            return True
-        
-        return False
+        with self.lock:
+            self._refill()
+            
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            
+            return False
     
     def wait_and_acquire(self, tokens: float = 1.0, timeout: float = 5.0):
         """
@@ -66,12 +73,37 @@ class RateLimiter:
         
         while time.time() - start < timeout:
             if self.acquire(tokens):
+                rate_limiter_wait_seconds.observe(time.time() - start, limiter=self.name)
                 return True
             
             # Sleep for a fraction of expected wait time
             time.sleep(0.1)
         
+        rate_limiter_wait_seconds.observe(time.time() - start, limiter=self.name)
         return False
+    
+    def time_until_available(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` can be acquired (0 if available now)."""
+        with self.lock:
+            self._refill()
+            
+            if self.tokens >= tokens:
+                return 0.0
+            
+            return (tokens - self.tokens) / self.rate
+    
+    async def acquire_async(self, tokens: float = 1.0):
+        """
+        Wait without blocking the event loop until tokens are acquired.
+        
+        Sleeps exactly as long as the bucket needs to refill.
+        """
+        start = time.time()
+        
+        while not self.acquire(tokens):
+            await asyncio.sleep(self.time_until_available(tokens))
+        
+        rate_limiter_wait_seconds.observe(time.time() - start, limiter=self.name)
 
 
 class APIRateLimiter:
@@ -80,14 +112,14 @@ class APIRateLimiter:
     def __init__(self):
         """Initialize API rate limiter with different limits per endpoint."""
         self.limiters = {
-            "dexscreener": RateLimiter(requests_per_second=5.0),  # 5 req/s
-            "solana_rpc": RateLimiter(requests_per_second=10.0),  # 10 req/s
-            "wallet_alerts": RateLimiter(requests_per_second=2.0),  # 2 req/s
+            "dexscreener": RateLimiter(requests_per_second=5.0, name="dexscreener"),  # 5 req/s
+            "solana_rpc": RateLimiter(requests_per_second=10.0, name="solana_rpc"),  # 10 req/s
+            "wallet_alerts": RateLimiter(requests_per_second=2.0, name="wallet_alerts"),  # 2 req/s
             "default": RateLimiter(requests_per_second=10.0)
         }
         
         # Per-user rate limits
-        self.user_limits = defaultdict(lambda: RateLimiter(requests_per_second=2.0))
+        self.user_limits = defaultdict(lambda: RateLimiter(requests_per_second=2.0, name="per_user"))
         
         # Request history for monitoring
         self.request_history = defaultdict(lambda: deque(maxlen=100))
@@ -7,38 +7,27 @@ Handles per-chat preferences:
 - Future: notification preferences, display settings, etc.
 """
 
-import json
-import os
-import fcntl
+from store import Store
 
 SETTINGS_FILE = "settings.json"
 
+# Hot-path reads (monitor, plan checks) come from memory via get()
+_store = Store("settings", lambda: SETTINGS_FILE)
+
 
 def load_settings():
-    """Load settings from JSON file."""
-    if not os.path.exists(SETTINGS_FILE):
-        return {}
-    
-    with open(SETTINGS_FILE, "r") as f:
-        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-        try:
-            return json.load(f)
-        finally:
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    """Load settings."""
+    return _store.load()
 
 
 def save_settings(data):
-    """Save settings to JSON file with atomic write."""
-    temp_file = SETTINGS_FILE + ".tmp"
-    
-    with open(temp_file, "w") as f:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-        try:
-            json.dump(data, f, indent=2)
-        finally:
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-    
-    os.replace(temp_file, SETTINGS_FILE)
+    """Save settings."""
+    _store.save(data)
+
+
+def cached_settings():
+    """All chat settings, from memory (reloaded when settings.json changes)."""
+    return _store.get()
 
 
 def get_alert_mode(chat_id):
@@ -49,7 +38,7 @@ def get_alert_mode(chat_id):
         "loud" - Alerts play sound (default)
         "silent" - Alerts delivered quietly
     """
-    data = load_settings()
+    data = cached_settings()
     chat_id = str(chat_id)
     
     # Default = loud (professional behavior)
@@ -67,34 +56,34 @@ def set_alert_mode(chat_id, mode):
     if mode not in ["loud", "silent"]:
         raise ValueError(f"Invalid mode: {mode}")
     
-    data = load_settings()
     chat_id = str(chat_id)
+    data = _store.load(chat_id)
     
     if chat_id not in data:
         data[chat_id] = {}
     
     data[chat_id]["alert_mode"] = mode
-    save_settings(data)
+    _store.save(data, chat_id)
 
 
 def get_chat_settings(chat_id):
     """Get all settings for a chat."""
-    data = load_settings()
+    data = cached_settings()
     chat_id = str(chat_id)
     
-    return data.get(chat_id, {
+    return dict(data.get(chat_id, {
         "alert_mode": "loud",
         "plan": "free"  # For future monetization
-    })
+    }))
 
 
 def set_chat_setting(chat_id, key, value):
     """Set a specific setting for a chat."""
-    data = load_settings()
     chat_id = str(chat_id)
+    data = _store.load(chat_id)
     
     if chat_id not in data:
         data[chat_id] = {}
     
     data[chat_id][key] = value
-    save_settings(data)
+    _store.save(data, chat_id)
@@ -1,65 +1,29 @@
-import json
 import os
-import tempfile
-import shutil
-import fcntl
-import time
+import tokens
+from store import Store
 
-DATA_FILE = "data.json"
+DATA_FILE = "data.json"  # pre-sharding layout, split into USERS_DIR on first use
+USERS_DIR = os.path.join("data", "users")  # one <user_id>.snap (.json if SNAPSHOT_FORMAT=json) per user
+
+_store = Store("data", lambda: DATA_FILE, shards=lambda: USERS_DIR, wal=True, binary=True)
 
 def load_data():
-    """Load data with retry logic for concurrent access."""
-    if not os.path.exists(DATA_FILE):
-        return {}
-    
-    for attempt in range(3):
-        try:
-            with open(DATA_FILE, "r") as f:
-                # Acquire shared lock for reading
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                try:
-                    data = json.load(f)
-                    return data
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        except (json.JSONDecodeError, IOError) as e:
-            if attempt < 2:
-                time.sleep(0.1)  # Brief retry delay
-                continue
-            print(f"Error loading data after retries: {e}")
-            return {}
-    return {}
+    """
+    Load every user's data (from STORAGE_BACKEND, see store.py).
+
+    With JSON storage this is a lazy view: a user's file is only read
+    when their entry is accessed.
+    """
+    return _store.load()
 
 def save_data(data):
-    """Save data atomically with temp file to prevent corruption."""
-    try:
-        # Write to temp file first
-        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(DATA_FILE) or ".")
-        try:
-            with os.fdopen(fd, "w") as f:
-                # Acquire exclusive lock
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                try:
-                    json.dump(data, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())  # Ensure written to disk
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            
-            # Atomic rename
-            shutil.move(temp_path, DATA_FILE)
-        except Exception as e:
-            # Clean up temp file on error
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise e
-    except (IOError, OSError) as e:
-        print(f"Error saving data: {e}")
+    """Save every user's data (unchanged users aren't rewritten)."""
+    _store.save(data)
 
 def get_user_profile(user_id: str) -> dict:
     """Get user profile settings."""
-    data = load_data()
     user_id = str(user_id)
+    data = _store.load(user_id)
     
     if user_id not in data:
         return {"mode": "aggressive"}  # Default mode
@@ -68,36 +32,23 @@ def get_user_profile(user_id: str) -> dict:
 
 def set_user_profile(user_id: str, profile: dict) -> None:
     """Update user profile settings."""
-    data = load_data()
-    user_id = str(user_id)
-    
-    if user_id not in data:
-        data[user_id] = {}
+    def change(user_data):
+        user_data["profile"] = profile
     
-    data[user_id]["profile"] = profile
-    save_data(data)
+    update_user(user_id, change)
 
 def add_coin(user_id, coin_data):
-    data = load_data()
-    user_id = str(user_id)
-
-    if user_id not in data:
-        data[user_id] = {"coins": [], "profile": {"mode": "aggressive"}}
-
-    # Ensure coins list exists
-    if "coins" not in data[user_id]:
-        data[user_id]["coins"] = []
+    # ATH/low live with the token (tokens.py), not on the user's coin;
+    # the MC it was added at is one more observation of the token
+    coin_data = tokens.strip(dict(coin_data))
+    if coin_data.get("ca") and coin_data.get("start_mc"):
+        tokens.update_token(coin_data["ca"], lambda token: tokens.record_mc(token, coin_data["start_mc"]))
     
-    # Initialize intelligence fields
-    if "low_mc" not in coin_data:
-        coin_data["low_mc"] = coin_data.get("start_mc", 0)
-    if "ath_mc" not in coin_data:
-        coin_data["ath_mc"] = coin_data.get("start_mc", 0)
-    if "history" not in coin_data:
-        coin_data["history"] = []
-
-    data[user_id]["coins"].append(coin_data)
-    save_data(data)
+    def change(user_data):
+        # Ensure coins list exists
+        user_data.setdefault("coins", []).append(dict(coin_data))
+    
+    update_user(user_id, change)
 
 def get_all_coins():
     """Get all coins organized by user."""
@@ -119,8 +70,8 @@ def get_all_coins():
 
 def get_user_coins(user_id: str) -> list:
     """Get coins for a specific user."""
-    data = load_data()
     user_id = str(user_id)
+    data = _store.load(user_id)
     
     if user_id not in data:
         return []
@@ -136,35 +87,121 @@ def get_user_coins(user_id: str) -> list:
     return []
 
 def remove_coin(user_id, ca):
-    data = load_data()
-    user_id = str(user_id)
-
-    if user_id not in data:
+    """Stop tracking a coin (drops the user once they have no coins left)."""
+    if not any(c.get("ca") == ca for c in get_user_coins(user_id)):
         return False
+    
+    def change(user_data):
+        if user_data is None:
+            return None
+        
+        # Handle both formats
+        if isinstance(user_data, list):
+            coins = [c for c in user_data if c.get("ca") != ca]
+            return coins or None
+        
+        elif isinstance(user_data, dict):
+            user_data["coins"] = [c for c in user_data.get("coins", []) if c.get("ca") != ca]
+            return user_data if user_data["coins"] else None
+        
+        return user_data
+    
+    _store.update(str(user_id), change)
+    return True
 
-    user_data = data[user_id]
+# ========================
+# Concurrent writers: the UI edits a user's coins while the monitor
+# updates the same coins every tick. Both write through update_user() /
+# update_coin() / save_coin_state(), which re-apply their change to the
+# latest stored entry instead of saving a copy loaded earlier.
+# ========================
+
+def _coins(user_data) -> list:
+    if isinstance(user_data, list):  # Old format (list of coins)
+        return user_data
+    if isinstance(user_data, dict):
+        return user_data.get("coins", [])
+    return []
+
+def update_user(user_id, change) -> dict:
+    """
+    Edit one user's entry without overwriting concurrent changes.
     
-    # Handle both formats
-    if isinstance(user_data, list):
-        before = len(user_data)
-        data[user_id] = [c for c in user_data if c.get("ca") != ca]
-        if len(data[user_id]) == 0:
-            data.pop(user_id)
-        save_data(data)
-        return len(data.get(user_id, [])) < before
+    Args:
+        change: Edits the entry in place ({"coins": [], "profile": ...}
+            for a new user). May run again on a newer copy of the entry
+            when the write is flushed, so it should only depend on the
+            entry it's given.
     
-    elif isinstance(user_data, dict):
-        coins = user_data.get("coins", [])
-        before = len(coins)
-        user_data["coins"] = [c for c in coins if c.get("ca") != ca]
+    Returns:
+        The user's updated entry
+    """
+    def apply(user_data):
+        if user_data is None:
+            user_data = {"coins": [], "profile": {"mode": "aggressive"}}
+        elif isinstance(user_data, list):
+            user_data = {"coins": user_data, "profile": {"mode": "aggressive"}}
+        change(user_data)
+        return user_data
+    
+    return _store.update(str(user_id), apply)
+
+def update_coin(user_id, ca: str, change):
+    """
+    Edit one of a user's coins (by CA) and bump its "rev", so the
+    monitor knows the user changed it.
+    
+    Returns:
+        The updated coin, or None if the user doesn't track it
+    """
+    def apply(user_data):
+        for coin in _coins(user_data):
+            if coin.get("ca") == ca:
+                change(coin)
+                coin["rev"] = coin.get("rev", 0) + 1
+    
+    user_data = update_user(user_id, apply)
+    return next((coin for coin in _coins(user_data) if coin.get("ca") == ca), None)
+
+def merge_coin_state(user_data, coins: list):
+    """
+    Copy the monitor's state for these coins onto a user's latest entry.
+    
+    Trigger flags are compare-and-set on the coin's "rev": if the user
+    edited the coin after the monitor read it, a flag is only kept if
+    the alert it fired for is still configured the same way (flags with
+    no config, like automatic and time-based alerts, give way to the
+    edit, e.g. a "clear all alerts" reset). Market
+    fields (tokens.TOKEN_FIELDS) are saved per token, so they're dropped
+    from the user's coin.
+    """
+    ours = {coin.get("ca"): coin for coin in coins if coin.get("ca")}
+    
+    for coin in _coins(user_data):
+        mine = ours.get(coin.get("ca"))
+        if mine is None:
+            continue  # removed or not ours (other shard)
         
-        if len(user_data["coins"]) == 0:
-            data.pop(user_id)
+        tokens.strip(coin)
         
-        save_data(data)
-        return len(data.get(user_id, {}).get("coins", [])) < before
+        unchanged = coin.get("rev", 0) == mine.get("rev", 0)
+        for flags, config in (("triggered", "alerts"), ("combo_triggered", "combo_alerts")):
+            current = coin.get(config) or {}
+            for key, value in (mine.get(flags) or {}).items():
+                if unchanged or (key in current and current[key] == (mine.get(config) or {}).get(key)):
+                    coin.setdefault(flags, {})[key] = value
+    
+    return user_data
+
+def save_coin_state(coins_by_user: dict):
+    """
+    Write the monitor's per-coin state, one user at a time.
     
-    return False
+    Args:
+        coins_by_user: user_id -> [coin, ...] as the monitor evaluated them
+    """
+    for user_id, coins in coins_by_user.items():
+        _store.update(str(user_id), lambda user_data, coins=coins: merge_coin_state(user_data, coins))
 
 # ========================
 # NOTE: Wallet and List storage has been moved to dedicated modules:
@@ -0,0 +1,1362 @@
+#!/usr/bin/env python3
+"""
+Document Store - One load/save layer for every JSON-backed module
+
+A document is a dict keyed by owner (user, chat or group ID): data.json,
+wallets.json, lists.json, alert_history.json and so on. Each module owns
+a Store and calls load()/save(); STORAGE_BACKEND decides where documents
+live:
+
+- json:   one file per document - flock, temp file, fsync, atomic rename.
+          Stores given a `shards` directory keep one file per owner
+          instead (data/users/<id>.snap), listed in an index. Stores
+          given a `log` directory append records to segment files.
+          Hot documents (`binary`) are saved as snapshots (codec.py)
+- sqlite: STATE_DB (see db.py). Users, wallets, lists and groups use
+          normalized tables; other documents get one row per owner
+- redis:  one hash per document, one field per owner
+
+load(owner)/save(data, owner) touch a single owner where the backend
+can (SQLite, Redis, sharded JSON); the plain JSON backend always reads
+and writes the whole file, so callers write the same code either way.
+
+Every store shares the same read cache (get()), batching (batch()) and
+metrics (store_operations_total, store_operation_seconds).
+
+STORE_DURABILITY sets when saves reach the backend:
+
+- strict:  every save is written (and fsynced) before it returns
+- grouped: saves are kept in memory and a background thread writes each
+           changed store at most every STORE_FLUSH_MS, once
+- relaxed: grouped, without fsync
+
+Loads in this process always see unflushed saves. flush() writes them
+now (shutdown, tests, fenced writes).
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+from urllib.parse import quote
+from config import STORAGE_BACKEND, REDIS_URL, WAL_ENABLED, WAL_FSYNC, WAL_COMPACT_BYTES
+from config import STORE_DURABILITY, STORE_FLUSH_MS, LOG_SEGMENT_BYTES, SNAPSHOT_FORMAT
+from metrics import store_operations_total, store_operation_seconds, store_wal_bytes
+import codec
+import db
+
+try:
+    import redis  # type: ignore
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CHECK_INTERVAL = 1.0  # seconds between cache freshness checks
+REDIS_PREFIX = "trench:"
+SNAPSHOT_SUFFIX = ".snap"  # binary snapshots of "<name>.json" documents
+
+_MISSING = object()
+
+_stores: Dict[str, "Store"] = {}  # name -> Store, for migrate()
+
+
+def _copy(value):
+    """Deep copy of a JSON value."""
+    return value if value is _MISSING else json.loads(json.dumps(value))
+
+
+def _apply_changes(data, owner: str, changes: list):
+    """Run update() changes on data[owner] in place."""
+    value = _copy(data.get(owner))
+    for change in changes:
+        value = change(value)
+    if value is None:
+        data.pop(owner, None)
+    else:
+        data[owner] = _copy(value)  # don't share objects held by the changes
+
+
+class JSONBackend:
+    """
+    A document as one JSON file (or a binary snapshot, see codec.py).
+
+    Snapshots of a "<name>.json" document are saved as "<name>.snap"
+    next to it. The .json file is never removed by a snapshot save: it
+    stays as a read-only fallback (e.g. a seed file checked into git)
+    until a .snap exists. Loads read the .snap when there is one, since
+    saves with SNAPSHOT_FORMAT=json remove it once they've written the
+    .json again.
+    """
+
+    scoped = False
+
+    def __init__(self, name: str, path: Callable[[], str], binary: bool = False):
+        """
+        Args:
+            name: Document name
+            path: Returns the file path (a .json name)
+            binary: Save as a snapshot when SNAPSHOT_FORMAT is "binary"
+                (loads read either format)
+        """
+        self.name = name
+        self.path = path
+        self.binary = binary
+
+    def _snap(self) -> Optional[str]:
+        """The document's snapshot file, or None if it never has one."""
+        root, ext = os.path.splitext(self.path())
+        if not self.binary or ext != ".json":
+            return None
+        return root + SNAPSHOT_SUFFIX
+
+    def target(self) -> str:
+        """The file save() writes."""
+        snap = self._snap()
+        return snap if snap and SNAPSHOT_FORMAT == "binary" else self.path()
+
+    def _current(self) -> Optional[str]:
+        """The file load() reads, or None if there is none."""
+        for path in (self._snap(), self.path()):
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    def exists(self) -> bool:
+        return self._current() is not None
+
+    def remove(self):
+        """Delete the document's file(s)."""
+        for path in (self._snap(), self.path()):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        for attempt in range(3):
+            path = self._current()
+            if path is None:
+                return {}
+            try:
+                with open(path, "rb") as f:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+                    try:
+                        blob = f.read()
+                    finally:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                data = codec.decode(blob)
+                if path == self.path() != self.target() and codec.is_snapshot(blob):
+                    self._rename(path)
+                return data
+            except (ValueError, IOError) as e:
+                if attempt < 2:
+                    time.sleep(0.1)  # Brief retry delay (a writer may be mid-rename)
+                    continue
+                print(f"⚠️ Error loading {self.name}: {e}")
+        return {}
+
+    def _rename(self, legacy: str):
+        """Move a snapshot an older version saved under the .json name to the .snap."""
+        try:
+            os.link(legacy, self.target())  # unlike a rename, never replaces a newer save
+        except FileExistsError:
+            return
+        except OSError as e:
+            print(f"⚠️ Error renaming {legacy}: {e}")
+            return
+        try:
+            os.unlink(legacy)  # binary, so our own output - never a JSON seed file
+        except FileNotFoundError:
+            pass
+
+    def encode(self, data) -> bytes:
+        """The file contents save() writes for `data`."""
+        if self.binary and SNAPSHOT_FORMAT == "binary":
+            return codec.encode(data)
+        return json.dumps(data, indent=2).encode()
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        path = self.target()
+        snap = self._snap()
+        try:
+            blob = self.encode(data)
+            fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=os.path.dirname(path) or ".")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    try:
+                        f.write(blob)
+                        f.flush()
+                        if STORE_DURABILITY != "relaxed":
+                            os.fsync(f.fileno())
+                    finally:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            if snap and path != snap:
+                try:
+                    os.unlink(snap)  # SNAPSHOT_FORMAT=json: the .json is current again
+                except FileNotFoundError:
+                    pass
+        except (IOError, OSError) as e:
+            print(f"⚠️ Error saving {self.name}: {e}")
+            raise  # callers (the WAL above all) must know nothing was written
+
+    def version(self) -> Hashable:
+        path = self._current() or self.target()
+        try:
+            st = os.stat(path)
+            return (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (path, None, None)
+
+
+class ShardView(MutableMapping):
+    """
+    Every owner of a sharded document, each owner's file read on first access.
+
+    Saving the view back writes only the owners that were read, set or
+    deleted through it (and of those, only the ones that changed).
+    """
+
+    def __init__(self, backend: "ShardedJSONBackend", owners: Iterable[str]):
+        self.backend = backend
+        self.owners = dict.fromkeys(owners)  # ordered set, from the index
+        self.loaded: Dict[str, object] = {}
+        self.removed = set()
+
+    def __getitem__(self, owner):
+        if owner not in self.loaded:
+            if owner not in self.owners:
+                raise KeyError(owner)
+            value = self.backend.read(owner)
+            if value is _MISSING:
+                raise KeyError(owner)
+            self.loaded[owner] = value
+        return self.loaded[owner]
+
+    def __setitem__(self, owner, value):
+        self.owners[owner] = None
+        self.loaded[owner] = value
+        self.removed.discard(owner)
+
+    def __delitem__(self, owner):
+        if owner not in self.owners:
+            raise KeyError(owner)
+        del self.owners[owner]
+        self.loaded.pop(owner, None)
+        self.removed.add(owner)
+
+    def __contains__(self, owner):
+        return owner in self.owners  # no file read
+
+    def __iter__(self):
+        return iter(list(self.owners))
+
+    def __len__(self):
+        return len(self.owners)
+
+    def __repr__(self):
+        return f"<ShardView {self.backend.name}: {len(self.owners)} owners, {len(self.loaded)} loaded>"
+
+
+def _view_changes(view: ShardView) -> Dict:
+    """owner -> value (or _MISSING) for everything read, set or deleted through a view."""
+    changes = dict(view.loaded)
+    changes.update(dict.fromkeys(view.removed, _MISSING))
+    return changes
+
+
+class ShardedJSONBackend:
+    """A document as one JSON file per owner plus an index of owners."""
+
+    scoped = True
+    INDEX = "index"  # no .json suffix, so no owner's file can clash with it
+
+    def __init__(self, name: str, path: Callable[[], str], shards: Callable[[], str], binary: bool = False):
+        """
+        Args:
+            name: Document name
+            path: Single-file document to import on first use
+            shards: Directory holding <owner>.json (or .snap) files and the index
+            binary: Save the files as snapshots (see JSONBackend)
+        """
+        self.name = name
+        self.path = path
+        self.shards = shards
+        self.binary = binary
+
+    def _file(self, owner: str) -> JSONBackend:
+        path = os.path.join(self.shards(), quote(owner, safe="") + ".json")
+        return JSONBackend(f"{self.name}/{owner}", lambda: path, self.binary)
+
+    def _index(self) -> JSONBackend:
+        path = os.path.join(self.shards(), self.INDEX)
+        return JSONBackend(f"{self.name} index", lambda: path, self.binary)
+
+    @contextmanager
+    def _index_lock(self):
+        """Serialize index updates across processes."""
+        with open(os.path.join(self.shards(), self.INDEX + ".lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _owners(self) -> list:
+        self._ensure_split()
+        return self._index().load() or []
+
+    def _ensure_split(self):
+        """Create the shard directory, splitting the single-file document once."""
+        index = self._index()
+        if index.exists():
+            return
+
+        os.makedirs(self.shards(), exist_ok=True)
+        with self._index_lock():
+            if index.exists():
+                return  # another process got here first
+            legacy = JSONBackend(self.name, self.path, self.binary).load()
+            for owner, value in legacy.items():
+                self._file(str(owner)).save(value)
+            index.save([str(owner) for owner in legacy])
+            if legacy:
+                print(f"📦 Split {self.path()} into {len(legacy)} files in {self.shards()}/")
+
+    def read(self, owner: str):
+        """One owner's entry, or _MISSING."""
+        shard = self._file(owner)
+        if not shard.exists():
+            return _MISSING
+        return shard.load()
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        if owner is None:
+            return ShardView(self, self._owners())
+        self._ensure_split()
+        value = self.read(owner)
+        return {} if value is _MISSING else {owner: value}
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        if owner is not None:
+            changes = {owner: data.get(owner, _MISSING)}
+        elif isinstance(data, ShardView) and data.backend is self:
+            changes = _view_changes(data)
+        else:
+            changes = {str(k): v for k, v in data.items()}
+            changes.update(dict.fromkeys(set(self._owners()) - set(changes), _MISSING))
+        self.save_owners(changes)
+
+    def save_owners(self, changes: Dict):
+        """Write owner -> value (or _MISSING to delete); other owners are untouched."""
+        self._ensure_split()
+        for o, value in changes.items():
+            if value is not _MISSING:
+                self._write(o, value)
+        self._update_index(changes)
+        for o, value in changes.items():
+            if value is _MISSING:
+                self._file(o).remove()
+
+    def _write(self, owner: str, value):
+        """Write one owner's file unless it already holds this value."""
+        shard = self._file(owner)
+        try:
+            with open(shard.target(), "rb") as f:
+                if f.read() == shard.encode(value):
+                    return
+        except OSError:
+            pass
+        shard.save(value)
+
+    def _update_index(self, changes: Dict):
+        """Add/remove owners in the index (files are written first, deleted after)."""
+        with self._index_lock():
+            index = self._index()
+            owners = index.load() or []
+            present = set(owners)
+            updated = [o for o in owners if changes.get(o) is not _MISSING]
+            updated += [o for o, value in changes.items() if value is not _MISSING and o not in present]
+            if updated != owners:
+                index.save(updated)
+
+    def version(self) -> Hashable:
+        # Every save renames a file into the directory, which bumps its mtime
+        path = self.shards()
+        try:
+            return (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return (path, None)
+
+
+class WALBackend:
+    """
+    A write-ahead log in front of a JSON backend.
+
+    Saves append one line per changed owner (`"<owner>"<TAB><json>`, an
+    empty value for a delete) and fsync once per commit (WAL_FSYNC).
+    Loads read the wrapped backend (the snapshot) and replay the log on
+    top. Once the log passes WAL_COMPACT_BYTES its records are folded
+    into the snapshot and a new log is started. A crash can only tear
+    the last line, which replay ignores.
+    """
+
+    scoped = True
+
+    def __init__(self, inner, path: Callable[[], str]):
+        """
+        Args:
+            inner: JSONBackend or ShardedJSONBackend holding the snapshot
+            path: Log file path
+        """
+        self.inner = inner
+        self.name = inner.name
+        self.path = path
+
+        # Replay cache: owner -> value JSON ("" = deleted), as of offset in the log with this header
+        self.tail: Dict[str, str] = {}
+        self.tail_header = None
+        self.tail_offset = 0
+
+    @contextmanager
+    def _locked(self, mode: int):
+        """Appends and compaction hold LOCK_EX; loads hold LOCK_SH."""
+        path = self.path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".lock", "a") as f:
+            fcntl.flock(f.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _replay(self) -> Dict[str, str]:
+        """Latest record per owner, reading only what was appended since the last call."""
+        try:
+            f = open(self.path(), "rb")
+        except FileNotFoundError:
+            self.tail, self.tail_header, self.tail_offset = {}, None, 0
+            return self.tail
+
+        with f:
+            header = f.readline()
+            if header != self.tail_header:  # new log since we last looked
+                self.tail, self.tail_header, self.tail_offset = {}, header, len(header)
+            f.seek(self.tail_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn by a crash mid-append
+                self.tail_offset += len(line)
+                owner, _, value = line.decode().rstrip("\n").partition("\t")
+                try:
+                    self.tail[json.loads(owner)] = value
+                except json.JSONDecodeError:
+                    continue
+        return self.tail
+
+    @staticmethod
+    def _apply(data, tail: Dict[str, str], owner: Optional[str] = None):
+        for o, value in tail.items():
+            if owner is not None and o != owner:
+                continue
+            if value:
+                data[o] = json.loads(value)
+            else:
+                data.pop(o, None)
+        return data
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        with self._locked(fcntl.LOCK_SH):
+            data = self.inner.load(owner)
+            return self._apply(data, self._replay(), owner)
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        if owner is not None:
+            self.append({owner: data.get(owner, _MISSING)})
+        elif isinstance(data, ShardView):
+            self.save_owners(_view_changes(data))
+        else:
+            candidates = {str(k): v for k, v in data.items()}
+            current = self.load()
+            candidates.update(dict.fromkeys(set(current) - set(candidates), _MISSING))
+            self.append(self._changed(candidates, current))
+
+    def save_owners(self, candidates: Dict):
+        """Log the owners in owner -> value (or _MISSING) whose value changed."""
+        self.append(self._changed(candidates, self.load()))
+
+    @staticmethod
+    def _changed(candidates: Dict, current) -> Dict:
+        changes = {}
+        for o, value in candidates.items():
+            old = current.get(o, _MISSING)
+            if value is _MISSING:
+                if old is not _MISSING:
+                    changes[o] = _MISSING
+            elif old is _MISSING or json.dumps(old) != json.dumps(value):
+                changes[o] = value
+        return changes
+
+    def append(self, changes: Dict):
+        """Log owner -> value (or _MISSING to delete) as one commit."""
+        if not changes:
+            return
+        records = "".join(
+            f"{json.dumps(o)}\t{'' if value is _MISSING else json.dumps(value)}\n"
+            for o, value in changes.items()
+        ).encode()
+
+        with self._locked(fcntl.LOCK_EX):
+            fd = os.open(self.path(), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size == 0:
+                    os.write(fd, f"# {self.name} wal {time.time_ns()}\n".encode())
+                elif os.pread(fd, 1, size - 1) != b"\n":
+                    # Drop a line torn by a crash so it can't swallow this commit
+                    os.ftruncate(fd, os.pread(fd, size, 0).rfind(b"\n") + 1)
+                os.write(fd, records)
+                if WAL_FSYNC and STORE_DURABILITY != "relaxed":
+                    os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+
+            store_wal_bytes.set(size, store=self.name)
+            if size >= WAL_COMPACT_BYTES:
+                try:
+                    self._compact()
+                except (IOError, OSError) as e:
+                    # The commit is in the log; compaction retries on the next one
+                    print(f"⚠️ Error compacting {self.name}, keeping the log: {e}")
+
+    def compact(self):
+        """Fold the log into the snapshot now."""
+        with self._locked(fcntl.LOCK_EX):
+            self._compact()
+
+    def _compact(self):
+        """Write the log's records into the snapshot, then start a new log (raises if a write fails)."""
+        tail = self._replay()
+        if tail:
+            changes = {o: json.loads(value) if value else _MISSING for o, value in tail.items()}
+            if isinstance(self.inner, ShardedJSONBackend):
+                self.inner.save_owners(changes)
+            else:
+                self.inner.save(self._apply(self.inner.load(), tail))
+
+        # Start a new log; readers notice the new header
+        path = self.path()
+        with open(path + ".tmp", "w") as f:
+            f.write(f"# {self.name} wal {time.time_ns()}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        store_operations_total.inc(store=self.name, op="compact")
+        store_wal_bytes.set(0, store=self.name)
+
+    def version(self) -> Hashable:
+        try:
+            st = os.stat(self.path())
+            log = (st.st_ino, st.st_size)
+        except OSError:
+            log = None
+        return (self.inner.version(), log)
+
+
+class LogBackend:
+    """
+    A document of per-owner record lists as an append-only log.
+
+    Each record is one line (`"<owner>"<TAB><json>`, an empty value
+    clears the owner) in numbered segment files, <dir>/<n>.log; a new
+    segment is started at LOG_SEGMENT_BYTES. Every process keeps an
+    index of each owner's last `keep` record offsets, updated by reading
+    only what was appended since it last looked, so reading an owner's
+    last N records reads N lines. Older records stay in the log until a
+    background compaction rewrites it, once they make up most of it.
+    """
+
+    scoped = True
+    LOCK = "lock"
+
+    def __init__(self, name: str, path: Callable[[], str], log: Callable[[], str], keep: Optional[int]):
+        """
+        Args:
+            name: Document name
+            path: Single-file document to import on first use
+            log: Directory holding the segments
+            keep: Records kept per owner (None = all)
+        """
+        self.name = name
+        self.path = path
+        self.log = log
+        self.keep = keep
+
+        # owner -> [(segment, offset, length), ...], as of scanned: segment -> bytes read
+        self.index: Dict[str, list] = {}
+        self.scanned: Dict[int, int] = {}
+        self.compacting = False
+        self.unsynced = False
+
+    def _segment(self, n: int) -> str:
+        return os.path.join(self.log(), f"{n:08d}.log")
+
+    def _segments(self) -> list:
+        return sorted(int(f[:-4]) for f in os.listdir(self.log()) if f.endswith(".log") and f[:-4].isdigit())
+
+    @contextmanager
+    def _locked(self, mode: int):
+        """Appends and compaction hold LOCK_EX; reads hold LOCK_SH."""
+        self._ensure_imported()
+        with open(os.path.join(self.log(), self.LOCK), "a") as f:
+            fcntl.flock(f.fileno(), mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _lines(owner: str, records: list) -> bytes:
+        return "".join(f"{json.dumps(owner)}\t{json.dumps(record)}\n" for record in records).encode()
+
+    def _ensure_imported(self):
+        """Create the log directory, importing the single-file document once."""
+        path = self.log()
+        if os.path.isdir(path):
+            return
+
+        legacy = JSONBackend(self.name, self.path).load()
+        temp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(temp, exist_ok=True)
+        with open(os.path.join(temp, f"{1:08d}.log"), "wb") as f:
+            for owner, records in legacy.items():
+                f.write(self._lines(str(owner), records[-self.keep:] if self.keep else records))
+        try:
+            os.rename(temp, path)
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)  # another process got here first
+            return
+        if legacy:
+            print(f"📦 Moved {self.path()} into {path}/")
+
+    def _scan(self):
+        """Index what was appended since the last scan (from scratch after a compaction)."""
+        segments = self._segments()
+        if any(n not in segments for n in self.scanned):
+            self.index, self.scanned = {}, {}
+
+        for n in segments:
+            offset = self.scanned.get(n, 0)
+            with open(self._segment(n), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn by a crash mid-append
+                    owner, _, value = line.partition(b"\t")
+                    try:
+                        owner = json.loads(owner)
+                    except json.JSONDecodeError:
+                        owner = None
+                    if owner is None:
+                        pass
+                    elif value.strip():
+                        entries = self.index.setdefault(owner, [])
+                        entries.append((n, offset, len(line)))
+                        if self.keep and len(entries) > 2 * self.keep:
+                            del entries[:-self.keep]
+                    else:
+                        self.index.pop(owner, None)
+                    offset += len(line)
+            self.scanned[n] = offset
+
+    def _entries(self, owner: str, limit: Optional[int] = None) -> list:
+        entries = self.index.get(owner, [])
+        count = min(n for n in (limit, self.keep, len(entries)) if n is not None)
+        return entries[len(entries) - count:]
+
+    def _read(self, entries: list) -> list:
+        records = []
+        files = {}
+        try:
+            for n, offset, length in entries:
+                if n not in files:
+                    files[n] = os.open(self._segment(n), os.O_RDONLY)
+                line = os.pread(files[n], length, offset)
+                records.append(json.loads(line.partition(b"\t")[2]))
+        finally:
+            for fd in files.values():
+                os.close(fd)
+        return records
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        with self._locked(fcntl.LOCK_SH):
+            self._scan()
+            owners = list(self.index) if owner is None else [o for o in [owner] if o in self.index]
+            return {o: self._read(self._entries(o)) for o in owners}
+
+    def tail(self, owner: str, limit: Optional[int] = None) -> list:
+        """An owner's last `limit` records, oldest first."""
+        with self._locked(fcntl.LOCK_SH):
+            self._scan()
+            return self._read(self._entries(owner, limit))
+
+    def count(self, owner: str) -> int:
+        with self._locked(fcntl.LOCK_SH):
+            self._scan()
+            return len(self._entries(owner))
+
+    def slice(self, owner: str, start: int, stop: int) -> list:
+        """An owner's records [start:stop] (positions as in count())."""
+        with self._locked(fcntl.LOCK_SH):
+            self._scan()
+            return self._read(self._entries(owner)[start:stop])
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        if owner is None:
+            with self._locked(fcntl.LOCK_EX):
+                self._rewrite({str(o): records for o, records in data.items()})
+            return
+
+        # Clear the owner, then write its records back
+        records = data.get(owner) or []
+        self._append(f"{json.dumps(owner)}\t\n".encode() + self._lines(owner, records[-self.keep:] if self.keep else records))
+
+    def append(self, owner: str, record):
+        """Add one record to the end of an owner's list."""
+        self._append(self._lines(owner, [record]))
+
+    def _append(self, lines: bytes):
+        with self._locked(fcntl.LOCK_EX):
+            segments = self._segments()
+            n = segments[-1] if segments else 1
+            fd = os.open(self._segment(n), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size >= LOG_SEGMENT_BYTES:
+                    os.close(fd)
+                    n += 1
+                    fd = os.open(self._segment(n), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+                    self._maybe_compact(segments)
+                elif size and os.pread(fd, 1, size - 1) != b"\n":
+                    # Drop a line torn by a crash so it can't swallow this record
+                    os.ftruncate(fd, os.pread(fd, size, 0).rfind(b"\n") + 1)
+                os.write(fd, lines)
+                if STORE_DURABILITY == "strict":
+                    os.fsync(fd)
+                else:
+                    self.unsynced = True  # fsynced by the next flush
+            finally:
+                os.close(fd)
+
+    def sync(self):
+        """fsync the segment being appended to (write-behind durability)."""
+        if not self.unsynced or STORE_DURABILITY == "relaxed":
+            return
+        self.unsynced = False
+        with self._locked(fcntl.LOCK_SH):
+            segments = self._segments()
+            if segments:
+                fd = os.open(self._segment(segments[-1]), os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def _maybe_compact(self, segments: list):
+        """Compact in the background once most of the log is trimmed or cleared records."""
+        self._scan()
+        live = sum(length for owner in self.index for _, _, length in self._entries(owner))
+        if self.compacting or live * 2 > sum(self.scanned.get(n, 0) for n in segments):
+            return
+        self.compacting = True
+        threading.Thread(target=self.compact, name=f"{self.name}-compact", daemon=True).start()
+
+    def compact(self):
+        """Rewrite the log with only the records still kept."""
+        try:
+            with self._locked(fcntl.LOCK_EX):
+                self._scan()
+                self._rewrite({o: self._read(self._entries(o)) for o in self.index})
+        except (IOError, OSError) as e:
+            print(f"⚠️ Error compacting {self.name}: {e}")
+        finally:
+            self.compacting = False
+
+    def _rewrite(self, data: Dict[str, list]):
+        """Replace every segment with one holding `data` (LOCK_EX held)."""
+        segments = self._segments()
+        n = segments[-1] + 1 if segments else 1
+        temp = self._segment(n) + ".tmp"
+        with open(temp, "wb") as f:
+            for owner, records in data.items():
+                f.write(self._lines(owner, records[-self.keep:] if self.keep else records))
+            f.flush()
+            if STORE_DURABILITY != "relaxed":
+                os.fsync(f.fileno())
+        os.replace(temp, self._segment(n))
+        for old in segments:
+            os.unlink(self._segment(old))
+        self.index, self.scanned = {}, {}
+        store_operations_total.inc(store=self.name, op="compact")
+
+    def version(self) -> Hashable:
+        try:
+            segments = self._segments()
+            return (tuple(segments), os.stat(self._segment(segments[-1])).st_size if segments else 0)
+        except OSError:
+            return None
+
+
+class SQLiteBackend:
+    """A document in the state database."""
+
+    scoped = True
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        return db.load_document(self.name, owner)
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        db.save_document(self.name, data, owner)
+
+    def version(self) -> Hashable:
+        return (db.DB_FILE, db.document_version(self.name))
+
+
+class RedisBackend:
+    """A document as a Redis hash (owner -> JSON)."""
+
+    scoped = True
+
+    def __init__(self, name: str, client):
+        self.name = name
+        self.client = client
+        self.key = f"{REDIS_PREFIX}{name}"
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        if owner is not None:
+            value = self.client.hget(self.key, owner)
+            return {owner: json.loads(value)} if value is not None else {}
+        return {field: json.loads(value) for field, value in self.client.hgetall(self.key).items()}
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        pipe = self.client.pipeline(transaction=True)
+        if owner is not None:
+            if owner in data:
+                pipe.hset(self.key, owner, json.dumps(data[owner]))
+            else:
+                pipe.hdel(self.key, owner)
+        else:
+            current = self.client.hgetall(self.key)
+            fields = {str(k): json.dumps(v) for k, v in data.items()}
+            gone = set(current) - set(fields)
+            changed = {k: v for k, v in fields.items() if current.get(k) != v}
+            if gone:
+                pipe.hdel(self.key, *gone)
+            if changed:
+                pipe.hset(self.key, mapping=changed)
+        pipe.incr(f"{self.key}:version")
+        pipe.execute()
+
+    def version(self) -> Hashable:
+        return self.client.get(f"{self.key}:version")
+
+
+_redis_client = None  # set once a connection succeeds
+
+
+def _redis():
+    """
+    Shared Redis client.
+
+    Raises:
+        ConnectionError: Redis is configured but can't be reached. Nothing
+            falls back to the JSON files - a process writing there while
+            the others use Redis would split the state - and the next call
+            tries again.
+    """
+    global _redis_client
+    if _redis_client is None:
+        if not REDIS_AVAILABLE:
+            print("❌ Redis store configured but the redis package isn't installed")
+            raise ConnectionError("redis package not installed")
+        try:
+            client = redis.Redis.from_url(REDIS_URL, decode_responses=True, socket_connect_timeout=2)
+            client.ping()
+        except Exception as e:
+            print(f"❌ Redis store unreachable ({type(e).__name__}) - not saving or loading until it's back")
+            raise ConnectionError("Redis store unreachable") from e
+        _redis_client = client
+    return _redis_client
+
+
+class Store:
+    """Load/save/cache one document on the configured backend."""
+
+    def __init__(self, name: str, path: Callable[[], str], check_interval: float = CHECK_INTERVAL,
+                 shards: Optional[Callable[[], str]] = None, wal: bool = False,
+                 log: Optional[Callable[[], str]] = None, keep: Optional[int] = None,
+                 binary: bool = False):
+        """
+        Args:
+            name: Document name (SQLite/Redis key, metrics label)
+            path: Returns the JSON file path (looked up each time so tests can swap files)
+            check_interval: Max seconds before get() notices an external change
+            shards: Returns a directory for one JSON file per owner; `path`
+                is then only read once, to split it up
+            wal: Put a write-ahead log in front of the JSON files (WAL_ENABLED)
+            log: Returns a directory for an append-only log of each owner's
+                records (see append()); `path` is then only read once, to import it
+            keep: Records kept per owner by append()
+            binary: Hot document - save JSON files as binary snapshots
+                (SNAPSHOT_FORMAT, see codec.py)
+        """
+        self.name = name
+        self.path = path
+        self.shards = shards
+        self.wal = wal
+        self.log = log
+        self.keep = keep
+        self.binary = binary
+        self.check_interval = check_interval
+        self.backends = {}
+
+        # Read cache
+        self.data = None
+        self.state = None
+        self.checked_at = 0.0
+        self.generation = 0  # bumps on every reload
+        self.lock = threading.RLock()
+
+        # Saves not written yet (batch() or write-behind)
+        self.saves = 0
+        self.batch_depth = 0
+        self.pending_full = None
+        self.pending_owners: Dict[str, object] = {}
+        self.pending_readds = set()  # deleted then saved again: goes last, as on disk
+        self.pending_updates: Dict[str, list] = {}  # owner -> [change, ...] from update()
+
+        _stores[name] = self
+
+    def backend(self):
+        """Backend for the current STORAGE_BACKEND."""
+        kind = STORAGE_BACKEND
+        backend = self.backends.get(kind)
+        if backend is None:
+            if kind == "sqlite":
+                backend = SQLiteBackend(self.name)
+            elif kind == "redis":
+                backend = RedisBackend(self.name, _redis())
+            else:
+                backend = self.json_backend()
+            self.backends[kind] = backend
+        return backend
+
+    def json_backend(self):
+        """The JSON file layout for this document."""
+        if self.log is not None:
+            return LogBackend(self.name, self.path, self.log, self.keep)
+        if self.shards is not None:
+            backend = ShardedJSONBackend(self.name, self.path, self.shards, self.binary)
+            log = lambda: os.path.join(self.shards(), "wal")  # noqa: E731
+        else:
+            backend = JSONBackend(self.name, self.path, self.binary)
+            log = lambda: self.path() + ".wal"  # noqa: E731
+
+        if self.wal and WAL_ENABLED:
+            backend = WALBackend(backend, log)
+        return backend
+
+    def _timed(self, op: str, run: Callable):
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            store_operations_total.inc(store=self.name, op=op)
+            store_operation_seconds.observe(time.perf_counter() - start, store=self.name, op=op)
+
+    # ---- load / save ----
+
+    def load(self, owner: Optional[str] = None) -> Dict:
+        """
+        A fresh copy of the document to read or edit.
+
+        Args:
+            owner: Only this owner's entry is needed (other owners may
+                be missing from the result on SQLite/Redis)
+        """
+        owner = None if owner is None else str(owner)
+        with self.lock:
+            if self.pending_full is not None:
+                data = _copy(self.pending_full)
+            else:
+                data = self._timed("load", lambda: self.backend().load(owner))
+
+            for pending_owner, value in self.pending_owners.items():
+                if owner is not None and pending_owner != owner:
+                    continue
+                if value is _MISSING or pending_owner in self.pending_readds:
+                    data.pop(pending_owner, None)
+                if value is not _MISSING:
+                    data[pending_owner] = _copy(value)
+
+            for pending_owner, changes in self.pending_updates.items():
+                if owner is None or pending_owner == owner:
+                    _apply_changes(data, pending_owner, changes)
+            return data
+
+    def save(self, data: Dict, owner: Optional[str] = None):
+        """
+        Save the document (written now or by the flusher, per STORE_DURABILITY).
+
+        Args:
+            owner: Only this owner changed - pass what load(owner) returned
+        """
+        owner = None if owner is None else str(owner)
+        with self.lock:
+            self.data = None
+            self.saves += 1
+            # What the caller loaded already had pending updates applied
+            if isinstance(data, ShardView):
+                for o in _view_changes(data):
+                    self.pending_updates.pop(o, None)
+            elif owner is None:
+                self.pending_updates.clear()
+            else:
+                self.pending_updates.pop(owner, None)
+
+            if self.batch_depth or STORE_DURABILITY != "strict":
+                # Keep a copy: the caller's objects may change before the flush
+                if owner is not None:
+                    value = _copy(data.get(owner, _MISSING))
+                    if value is not _MISSING and self.pending_owners.get(owner) is _MISSING:
+                        del self.pending_owners[owner]
+                        self.pending_readds.add(owner)
+                    self.pending_owners[owner] = value
+                elif isinstance(data, ShardView):
+                    self.pending_owners.update({o: _copy(v) for o, v in _view_changes(data).items()})
+                else:
+                    self.pending_full = _copy(data)
+                    self.pending_owners.clear()
+                    self.pending_readds.clear()
+                if not self.batch_depth:
+                    _mark_dirty(self)
+                return
+
+            self._timed("save", lambda: self.backend().save(data, owner))
+
+    @contextmanager
+    def batch(self):
+        """
+        Coalesce saves into one write when the block ends (or at the
+        next flush, unless STORE_DURABILITY is strict).
+
+        load() inside the block sees the pending changes.
+        """
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    if STORE_DURABILITY == "strict":
+                        self.flush()
+                    else:
+                        _mark_dirty(self)
+
+    def flush(self):
+        """Write pending saves as one backend save (one commit with a WAL)."""
+        with self.lock:
+            full, owners, readds = self.pending_full, self.pending_owners, self.pending_readds
+            updates = self.pending_updates
+            self.pending_full, self.pending_owners, self.pending_readds = None, {}, set()
+            self.pending_updates = {}
+            if full is not None or owners:
+                self._write(full, owners, readds)
+            if updates:
+                self._write_updates(updates)
+            sync = getattr(self.backend(), "sync", None)
+            if sync:
+                sync()
+
+    def update(self, owner: str, change: Callable):
+        """
+        Read-modify-write one owner's entry without losing concurrent writes.
+
+        change(value) gets a copy of the owner's current entry (None if
+        there isn't one) and returns the new entry (None to delete).
+        Writes run under a lock shared with other processes. With
+        write-behind, change() runs again on the latest entry when the
+        write is flushed, so it must only depend on the value it's given.
+
+        Returns:
+            The new entry
+        """
+        owner = str(owner)
+        with self.lock:
+            self.data = None
+            self.saves += 1
+            if self.batch_depth or STORE_DURABILITY != "strict":
+                data = self.load(owner)
+                self.pending_updates.setdefault(owner, []).append(change)
+                if not self.batch_depth:
+                    _mark_dirty(self)
+                _apply_changes(data, owner, [change])
+                return data.get(owner)
+
+            with self._exclusive():
+                data = self.load(owner)
+                _apply_changes(data, owner, [change])
+                self._timed("save", lambda: self.backend().save(data, owner))
+            return data.get(owner)
+
+    def append(self, owner: str, record):
+        """
+        Add a record to the end of an owner's list, keeping the last `keep`.
+
+        The log backend writes just the record; other backends rewrite
+        the owner's list.
+        """
+        owner = str(owner)
+        with self.lock:
+            backend = self.backend()
+            if not hasattr(backend, "append"):
+                self.update(owner, lambda records: ((records or []) + [record])[-(self.keep or 0):])
+                return
+
+            if self._pending():
+                self.flush()  # keep the log in save order
+            self.data = None
+            self.saves += 1
+            self._timed("append", lambda: backend.append(owner, record))
+            if backend.unsynced:
+                _mark_dirty(self)
+
+    def tail(self, owner: str, limit: Optional[int] = None) -> list:
+        """An owner's last `limit` records (all if None), oldest first."""
+        owner = str(owner)
+        with self.lock:
+            backend = self.backend()
+            if hasattr(backend, "tail") and not self._pending():
+                return self._timed("load", lambda: backend.tail(owner, limit))
+            records = self.load(owner).get(owner) or []
+            return records[-limit:] if limit else records
+
+    def count(self, owner: str) -> int:
+        """Number of records in an owner's list."""
+        owner = str(owner)
+        with self.lock:
+            if hasattr(self.backend(), "count") and not self._pending():
+                return self._timed("load", lambda: self.backend().count(owner))
+            return len(self.load(owner).get(owner) or [])
+
+    def slice(self, owner: str, start: int, stop: int) -> list:
+        """An owner's records [start:stop], reading only those from a log."""
+        owner = str(owner)
+        with self.lock:
+            if hasattr(self.backend(), "slice") and not self._pending():
+                return self._timed("load", lambda: self.backend().slice(owner, start, stop))
+            return (self.load(owner).get(owner) or [])[start:stop]
+
+    def _pending(self) -> bool:
+        return self.pending_full is not None or bool(self.pending_owners) or bool(self.pending_updates)
+
+    @contextmanager
+    def _exclusive(self):
+        """Lock shared by every process's update() on this document."""
+        with open(self.path() + ".lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _write_updates(self, updates: Dict[str, list]):
+        """Re-run update() changes on the latest stored entries and save them."""
+        with self._exclusive():
+            backend = self.backend()
+            if backend.scoped:
+                changed = {}
+                for owner, changes in updates.items():
+                    data = self._timed("load", lambda: backend.load(owner))
+                    _apply_changes(data, owner, changes)
+                    changed[owner] = data.get(owner, _MISSING)
+                self._write(None, changed, set())
+            else:
+                data = self._timed("load", backend.load)
+                for owner, changes in updates.items():
+                    _apply_changes(data, owner, changes)
+                self._timed("save", lambda: backend.save(data))
+        self.data = None
+
+    def _write(self, full, owners: Dict, readds: set):
+        backend = self.backend()
+        if full is None and hasattr(backend, "save_owners"):
+            self._timed("save", lambda: backend.save_owners(owners))  # one commit with a WAL
+        elif full is None and backend.scoped:
+            for owner, value in owners.items():
+                entry = {} if value is _MISSING else {owner: value}
+                self._timed("save", lambda: backend.save(entry, owner))
+        else:
+            data = full if full is not None else self._timed("load", backend.load)
+            for owner, value in owners.items():
+                if value is _MISSING or owner in readds:
+                    data.pop(owner, None)
+                if value is not _MISSING:
+                    data[owner] = value
+            self._timed("save", lambda: backend.save(data))
+        self.data = None
+
+    # ---- read cache ----
+
+    def get(self) -> Dict:
+        """
+        Current document from memory (shared - don't mutate).
+
+        The backend is re-checked at most once per check_interval and
+        reloaded if another process changed it. save() in this process
+        drops the cached copy.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.data is not None and now - self.checked_at < self.check_interval:
+                store_operations_total.inc(store=self.name, op="cache_hit")
+                return self.data
+
+            self.checked_at = now
+            state = self.version()
+            if self.data is None or state != self.state:
+                self.data = self.load()
+                self.state = state
+                self.generation += 1
+            else:
+                store_operations_total.inc(store=self.name, op="cache_hit")
+
+            return self.data
+
+    def version(self) -> Tuple:
+        """Token that changes whenever the document is saved (by anyone)."""
+        return (STORAGE_BACKEND, self.backend().version(), self.saves)
+
+    def current_generation(self) -> int:
+        """Generation after picking up any change - for caches built on top."""
+        self.get()
+        return self.generation
+
+    def compact(self):
+        """Fold this document's write-ahead log (if any) into its files."""
+        backend = self.backend()
+        if isinstance(backend, WALBackend):
+            with self.lock:
+                self.flush()
+                backend.compact()
+
+    def invalidate(self):
+        """Drop the cached copy; the next get() reloads."""
+        with self.lock:
+            self.data = None
+
+
+_dirty = set()  # stores with saves waiting for the flusher
+_dirty_lock = threading.Lock()
+_flush_lock = threading.Lock()  # flush() returns only once an ongoing flush is done too
+_flusher: Optional[threading.Thread] = None
+
+
+def _mark_dirty(store: Store):
+    global _flusher
+    with _dirty_lock:
+        _dirty.add(store)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="store-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(STORE_FLUSH_MS / 1000)
+        flush()
+
+
+def flush():
+    """Write every store's pending saves now."""
+    with _flush_lock:
+        with _dirty_lock:
+            stores = list(_dirty)
+            _dirty.clear()
+        for store in stores:
+            try:
+                store.flush()
+            except Exception as e:
+                print(f"⚠️ Error flushing {store.name}: {e}")
+
+
+def migrate(target: str, force: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Copy every document from its JSON file to the `target` backend.
+
+    Runs once per target - later calls do nothing unless `force` is
+    set. The JSON files are left in place as a backup.
+
+    Args:
+        target: "sqlite" or "redis"
+
+    Returns:
+        Owners copied per document, or None if already migrated
+    """
+    # Every module that owns a store registers it on import
+    import storage, wallets, lists, groups, alert_history  # noqa: F401
+    import timebased_alerts, notification_settings, settings, subscriptions  # noqa: F401
+    flush()
+
+    if target == "sqlite":
+        make = SQLiteBackend
+    elif target == "redis":
+        make = lambda name: RedisBackend(name, _redis())  # noqa: E731
+    else:
+        raise ValueError(f"Can't migrate to {target!r}")
+
+    marker = make("_migrated")
+    if marker.load() and not force:
+        return None
+
+    counts = {}
+    for name, store in sorted(_stores.items()):
+        data = store.json_backend().load()
+        make(name).save(data)
+        counts[name] = len(data)
+
+    marker.save({"json": time.time()})
+    return counts
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["migrate"] or sys.argv[2:3] not in (["sqlite"], ["redis"]):
+        print("Usage: python store.py migrate sqlite|redis [--force]")
+        sys.exit(1)
+
+    target = sys.argv[2]
+    counts = migrate(target, force="--force" in sys.argv)
+    if counts is None:
+        print(f"ℹ️ Already migrated to {target} (use --force to copy the JSON files again)")
+    else:
+        print(f"✅ Migrated to {target}: " + ", ".join(f"{name} ({n})" for name, n in counts.items()))
+        print(f"   Set STORAGE_BACKEND={target} to use it")
@@ -5,13 +5,15 @@ Subscription and tier system for monetization
 Defines feature gates and user tier management.
 """
 
-import json
-import os
 import time
 from typing import Dict, Optional
+from store import Store
 
 SUBS_FILE = "subscriptions.json"
 
+# Tier checks read from memory via get()
+_store = Store("subscriptions", lambda: SUBS_FILE)
+
 # Tier definitions
 TIERS = {
     "free": {
@@ -57,26 +59,15 @@ TIERS = {
 
 def load_subscriptions():
     """Load subscription data."""
-    if not os.path.exists(SUBS_FILE):
-        return {}
-    
-    try:
-        with open(SUBS_FILE, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
+    return _store.load()
 
 def save_subscriptions(data):
     """Save subscription data."""
-    try:
-        with open(SUBS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except IOError as e:
-        print(f"Error saving subscriptions: {e}")
+    _store.save(data)
 
 def get_user_tier(user_id: str) -> str:
     """Get user's subscription tier."""
-    data = load_subscriptions()
+    data = _store.get()
     user_id = str(user_id)
     
     if user_id not in data:
@@ -95,8 +86,8 @@ def set_user_tier(user_id: str, tier: str, duration_days: int = 30) -> bool:
     if tier not in TIERS:
         return False
     
-    data = load_subscriptions()
     user_id = str(user_id)
+    data = _store.load(user_id)
     
     data[user_id] = {
         "tier": tier,
@@ -105,7 +96,7 @@ def set_user_tier(user_id: str, tier: str, duration_days: int = 30) -> bool:
         "auto_renew": False
     }
     
-    save_subscriptions(data)
+    _store.save(data, user_id)
     return True
 
 def get_user_limits(user_id: str) -> Dict:
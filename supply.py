@@ -1,5 +1,6 @@
 import requests
 import time
+from metrics import provider_request_seconds
 
 SUPPLY_CACHE = {}
 RPC_URL = "https://api.mainnet-beta.solana.com"
@@ -18,7 +19,8 @@ def get_token_supply_and_decimals(mint):
 
     for attempt in range(MAX_RETRIES):
         try:
-            r = requests.post(RPC_URL, json=payload, timeout=10)
+            with provider_request_seconds.time(endpoint="solana_rpc"):
+                r = requests.post(RPC_URL, json=payload, timeout=10)
             if r.status_code != 200:
                 if attempt < MAX_RETRIES - 1:
                     time.sleep(0.5 * (attempt + 1))
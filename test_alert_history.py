@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test alert history counters and paged queries
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import alert_history
+import store
+from alert_history import get_global_stats, get_history_stats, log_alert, query_history
+from metrics import store_operations_total
+
+
+def test_alert_history_queries():
+    """Test incremental counters, the one-time backfill and cursor paging."""
+    print("🧪 Testing Alert History Queries...\n")
+
+    tmp_dir = tempfile.mkdtemp()
+    originals = (alert_history.HISTORY_FILE, alert_history.HISTORY_DIR, alert_history.STATS_FILE)
+    alert_history.HISTORY_FILE = os.path.join(tmp_dir, "alert_history.json")
+    alert_history.HISTORY_DIR = os.path.join(tmp_dir, "alert_history")
+    alert_history.STATS_FILE = os.path.join(tmp_dir, "alert_stats.json")
+    alert_history._store.backends.clear()
+    alert_history._stats.backends.clear()
+    alert_history._stats.invalidate()
+
+    old = [{"timestamp": f"2024-01-01T0{i}:00:00", "type": "x", "ca": "CA_OLD", "details": {}} for i in range(3)]
+    with open(alert_history.HISTORY_FILE, "w") as f:
+        json.dump({"111": old}, f)
+
+    try:
+        # Test 1: Counters start from the existing history
+        print("✅ Test 1: Existing history counted once")
+        stats = get_history_stats(111)
+        assert stats["total_alerts"] == 3 and stats["most_alerted_coin"] == "CA_OLD"
+        assert stats["alerts_by_hour"] == {"2024-01-01T00": 1, "2024-01-01T01": 1, "2024-01-01T02": 1}
+        print("   ✓ 3 imported alerts\n")
+
+        # Test 2: log_alert updates counters without reading history
+        print("✅ Test 2: Counters kept up to date")
+        for i in range(25):
+            log_alert(111, "mc" if i % 5 else "pct", f"CA{i % 2}", {"mc": i})
+        log_alert(222, "x", "CA1", {})
+        reads = store_operations_total.get(store="alert_history", op="load")
+        stats = get_history_stats(111)
+        assert store_operations_total.get(store="alert_history", op="load") == reads, "Stats read history"
+        assert stats["total_alerts"] == 28
+        assert stats["alerts_by_type"] == {"x": 3, "mc": 20, "pct": 5}
+        assert stats["most_alerted_coin"] == "CA0"
+        assert get_global_stats()["total_alerts"] == 29
+        print("   ✓ Per-user and global counts\n")
+
+        # Test 3: Pages walk back in time without overlap
+        print("✅ Test 3: Cursor paging")
+        seen, cursor = [], None
+        while True:
+            page, cursor = query_history(111, page_size=10, cursor=cursor)
+            seen += page
+            assert len(page) <= 10
+            if cursor is None:
+                break
+        assert len(seen) == 28 and [a["ca"] for a in seen[-3:]] == ["CA_OLD"] * 3
+        assert seen == sorted(seen, key=lambda a: a["timestamp"], reverse=True)
+        print("   ✓ 28 alerts in 3 pages, newest first\n")
+
+        # Test 4: Filters
+        print("✅ Test 4: Time range and type filters")
+        page, cursor = query_history(111, alert_type="pct", page_size=3)
+        assert [a["details"]["mc"] for a in page] == [20, 15, 10] and cursor
+        page, cursor = query_history(111, alert_type="pct", page_size=3, cursor=cursor)
+        assert [a["details"]["mc"] for a in page] == [5, 0] and cursor is None
+        page, _ = query_history(111, since="2024-01-01T01:00:00", until="2024-01-02")
+        assert [a["timestamp"] for a in page] == ["2024-01-01T02:00:00", "2024-01-01T01:00:00"]
+        print("   ✓ pct only; Jan 1 from 01:00\n")
+
+        # Test 5: Alerts sharing a timestamp across a page boundary
+        print("✅ Test 5: Same-timestamp alerts")
+
+        class FrozenClock:
+            @staticmethod
+            def now():
+                return datetime(2024, 2, 1, 12, 0, 0)
+
+        alert_history.datetime = FrozenClock
+        try:
+            for i in range(7):
+                log_alert(333, "x", f"CA{i}", {"mc": i})
+        finally:
+            alert_history.datetime = datetime
+        seen, cursor = [], None
+        while True:
+            page, cursor = query_history(333, page_size=3, cursor=cursor)
+            seen += [a["details"]["mc"] for a in page]
+            if cursor is None:
+                break
+        assert seen == [6, 5, 4, 3, 2, 1, 0], seen
+        page, _ = query_history(333, page_size=3, cursor="2024-02-01T12:00:00")
+        assert page == [], "Older bare-timestamp cursors still work"
+        print("   ✓ All 7 returned over 3 pages, none skipped\n")
+
+        # Test 6: Clearing resets the user but not the global count
+        print("✅ Test 6: Clear history")
+        assert alert_history.clear_user_history(111)
+        assert get_history_stats(111)["total_alerts"] == 0
+        assert query_history(111) == ([], None)
+        assert get_global_stats()["total_alerts"] == 36
+        print("   ✓ User counters gone, alerts fired unchanged\n")
+    finally:
+        store.flush()
+        (alert_history.HISTORY_FILE, alert_history.HISTORY_DIR, alert_history.STATS_FILE) = originals
+        alert_history._store.backends.clear()
+        alert_history._stats.backends.clear()
+        alert_history._stats.invalidate()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_alert_history_queries()
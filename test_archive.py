@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the on-disk tick archive
+"""
+
+import os
+import tempfile
+import time
+
+from core import archive
+from ui.dashboard import sparkline
+
+
+def test_tick_archive():
+    """Test day files, range scans, torn tails and pruning."""
+    print("🧪 Testing Tick Archive...\n")
+
+    original = archive.ARCHIVE_DIR
+    archive.ARCHIVE_DIR = tempfile.mkdtemp()
+    try:
+        # Test 1: Quotes land in one file per CA and UTC day
+        print("✅ Test 1: Day files")
+        midnight = (time.time() // 86400) * 86400
+        for i in range(120):
+            archive.record("CA_A", midnight - 3600 + i * 60, 1000 + i, 50, 10)
+        archive.record("CA_B", midnight, 7, 7, 7)
+        assert archive.scan("CA_A", midnight - 3600) == {field: [] for field in archive.FIELDS}, "Not flushed yet"
+        assert archive.flush() == 121
+        days = sorted(os.listdir(archive.ARCHIVE_DIR))
+        assert len(days) == 2 and sorted(os.listdir(os.path.join(archive.ARCHIVE_DIR, days[1]))) == ["CA_A.ticks", "CA_B.ticks"]
+        assert os.path.getsize(os.path.join(archive.ARCHIVE_DIR, days[0], "CA_A.ticks")) == 60 * archive.RECORD.size
+        print("   ✓ 60 records either side of midnight\n")
+
+        # Test 2: Range scans across days
+        print("✅ Test 2: Range scans")
+        quotes = archive.scan("CA_A", midnight - 600, midnight + 600)
+        assert quotes["mc"] == [float(1000 + i) for i in range(50, 70)]
+        assert quotes["ts"][0] == midnight - 600 and quotes["liquidity"] == [10.0] * 20
+        assert archive.scan("CA_B", midnight - 5, midnight + 5)["mc"] == [7.0]
+        assert archive.scan("CA_NONE", midnight - 3600)["ts"] == []
+        print("   ✓ 20 minutes around midnight\n")
+
+        # Test 3: A torn record is cut, not misread
+        print("✅ Test 3: Torn tail")
+        day_file = os.path.join(archive.ARCHIVE_DIR, days[1], "CA_B.ticks")
+        with open(day_file, "ab") as f:
+            f.write(b"\x01\x02\x03")
+        archive.record("CA_B", midnight + 60, 8, 8, 8)
+        archive.flush()
+        assert os.path.getsize(day_file) == 2 * archive.RECORD.size
+        assert archive.scan("CA_B", midnight - 5, midnight + 120)["mc"] == [7.0, 8.0]
+        print("   ✓ Partial record cut\n")
+
+        # Test 4: Old days pruned, sparkline from a scan
+        print("✅ Test 4: Retention and sparklines")
+        os.makedirs(os.path.join(archive.ARCHIVE_DIR, "2000-01-01"))
+        archive._pruned_day = None
+        archive.flush()
+        assert "2000-01-01" not in os.listdir(archive.ARCHIVE_DIR)
+        assert sparkline(archive.scan("CA_A", midnight - 3600, midnight + 3600)["mc"], width=4) == "▁▃▅█"
+        assert sparkline([1.0]) == ""
+        print("   ✓ Old day deleted; 4-char chart\n")
+    finally:
+        archive.ARCHIVE_DIR = original
+        archive._pruned_day = None
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_tick_archive()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test binary snapshots of the hot documents
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import codec
+import store
+from store import Store
+
+
+def test_snapshot_codec():
+    """Test the header, both body formats, store files and the JSON tool."""
+    print("🧪 Testing Snapshot Codec...\n")
+
+    doc = {
+        str(1000 + u): {
+            "coins": [{"ca": f"CA{u}_{i}", "start_mc": 1.5e5, "alerts": {"x": [2, 5]}, "paused": False}
+                      for i in range(5)],
+            "profile": {"mode": "aggressive"},
+        }
+        for u in range(10_000)
+    }
+
+    # Test 1: Versioned header, JSON body when msgpack is missing
+    print("✅ Test 1: Header and body formats")
+    blob = codec.encode(doc, codec.FORMAT_JSON)
+    assert blob[:4] == codec.MAGIC and blob[4] == codec.SCHEMA_VERSION and blob[5] == codec.FORMAT_JSON
+    assert codec.decode(blob) == doc
+    assert codec.decode(json.dumps({"1": [1]}, indent=2).encode()) == {"1": [1]}, "Plain JSON still read"
+    newer = codec.HEADER.pack(codec.MAGIC, codec.SCHEMA_VERSION + 1, codec.FORMAT_JSON, 0) + b"{}"
+    for bad in (newer, codec.MAGIC + b"\x01", codec.HEADER.pack(codec.MAGIC, 1, 9, 0)):
+        try:
+            codec.decode(bad)
+            assert False, "Should be rejected"
+        except ValueError:
+            pass
+    if codec.MSGPACK_AVAILABLE:
+        assert codec.decode(codec.encode(doc, codec.FORMAT_MSGPACK)) == doc
+    print(f"   ✓ Round trip; newer schema rejected (msgpack: {codec.MSGPACK_AVAILABLE})\n")
+
+    # Test 2: Hot stores save .snap snapshots and read old JSON files
+    print("✅ Test 2: Store files")
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "hot.json")
+    snap = os.path.join(workdir, "hot.snap")
+    with open(path, "w") as f:
+        json.dump({"1": {"coins": []}}, f, indent=2)
+    hot = Store("test_hot", lambda: path, binary=True)
+    original = store.SNAPSHOT_FORMAT
+    try:
+        assert hot.load() == {"1": {"coins": []}}
+        start = time.perf_counter()
+        hot.save(doc)
+        store.flush()
+        saved = time.perf_counter() - start
+        with open(snap, "rb") as f:
+            assert codec.is_snapshot(f.read())
+        with open(path) as f:
+            assert json.load(f) == {"1": {"coins": []}}, "The JSON file is kept as a fallback"
+        hot.invalidate()
+        start = time.perf_counter()
+        assert hot.load() == doc
+        loaded = time.perf_counter() - start
+
+        store.SNAPSHOT_FORMAT = "json"
+        hot.save({"1": {}})
+        store.flush()
+        with open(path) as f:
+            assert json.load(f) == {"1": {}}, "SNAPSHOT_FORMAT=json writes JSON again"
+        assert not os.path.exists(snap)
+    finally:
+        store.SNAPSHOT_FORMAT = original
+        store.flush()
+    print(f"   ✓ 10k users saved in {saved * 1000:.0f} ms, loaded in {loaded * 1000:.0f} ms\n")
+
+    # Test 3: Snapshots written under a .json name are renamed on first read
+    print("✅ Test 3: Binary .json files migrated")
+    users = os.path.join(workdir, "users")
+    os.makedirs(users)
+    with open(os.path.join(users, "index"), "wb") as f:
+        f.write(codec.encode(["1"]))
+    with open(os.path.join(users, "1.json"), "wb") as f:
+        f.write(codec.encode({"coins": [{"ca": "CA1"}]}))
+    sharded = Store("test_hot_users", lambda: os.path.join(workdir, "unused.json"), shards=lambda: users, binary=True)
+    assert sharded.load("1") == {"1": {"coins": [{"ca": "CA1"}]}}
+    assert sorted(os.listdir(users)) == ["1.snap", "index"], os.listdir(users)
+    sharded.save({}, "1")
+    store.flush()
+    assert not os.path.exists(os.path.join(users, "1.snap")), "Deleting an owner removes its snapshot"
+    print("   ✓ users/1.json -> users/1.snap\n")
+
+    # Test 4: Export to JSON and import back
+    print("✅ Test 4: JSON export/import tool")
+    snapshot = os.path.join(workdir, "groups.snap")
+    exported = os.path.join(workdir, "groups.export.json")
+    with open(snapshot, "wb") as f:
+        f.write(codec.encode({"-100": {"name": "trenches"}}))
+    tool = os.path.join(os.path.dirname(os.path.abspath(__file__)), "codec.py")
+    subprocess.run([sys.executable, tool, "export", snapshot, exported], check=True, capture_output=True)
+    with open(exported) as f:
+        assert json.load(f) == {"-100": {"name": "trenches"}}
+    os.unlink(snapshot)
+    subprocess.run([sys.executable, tool, "import", exported, snapshot], check=True, capture_output=True)
+    with open(snapshot, "rb") as f:
+        blob = f.read()
+    assert codec.is_snapshot(blob) and codec.decode(blob) == {"-100": {"name": "trenches"}}
+    print("   ✓ Snapshot -> JSON -> snapshot\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_snapshot_codec()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite state backend
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+
+import db
+import groups
+import lists
+import storage
+import store
+import wallets
+from metrics import storage_rows_written_total
+
+
+def _rows_written(table: str) -> float:
+    return storage_rows_written_total.get(table=table)
+
+
+def test_sqlite_backend():
+    """Test migration, diff saves and per-user edits."""
+    print("🧪 Testing SQLite State Backend...\n")
+
+    workdir = tempfile.mkdtemp()
+    originals = (store.STORAGE_BACKEND, store.STORE_DURABILITY, db.DB_FILE,
+                 storage.DATA_FILE, storage.USERS_DIR, wallets.WALLET_FILE,
+                 lists.LIST_FILE, groups.GROUPS_FILE)
+
+    data = {
+        "111": {
+            "coins": [{
+                "ca": "CA1", "start_mc": 100000, "alerts": {"x": 2, "mc": 500000},
+                "triggered": {}, "history": [{"mc": 100000}]
+            }],
+            "profile": {"mode": "aggressive"}
+        },
+        "legacy": [{"ca": "CA2", "start_mc": 5000, "alerts": {}, "triggered": {}}]
+    }
+    wallets_data = {"111": [{"address": "W1", "label": "whale"}]}
+    lists_data = {"111": {"AI": {"coins": ["CA1"], "meta_alerts": {"n_pumping": 2}, "meta_triggered": {}}}}
+    groups_data = {"-100": {"coins": [{"ca": "CA3", "alerts": {}, "triggered": {}}], "admins": [111]}}
+
+    try:
+        storage.DATA_FILE = os.path.join(workdir, "data.json")
+        storage.USERS_DIR = os.path.join(workdir, "users")
+        wallets.WALLET_FILE = os.path.join(workdir, "wallets.json")
+        lists.LIST_FILE = os.path.join(workdir, "lists.json")
+        groups.GROUPS_FILE = os.path.join(workdir, "groups.json")
+        for path, value in [(storage.DATA_FILE, data), (wallets.WALLET_FILE, wallets_data),
+                            (lists.LIST_FILE, lists_data), (groups.GROUPS_FILE, groups_data)]:
+            with open(path, "w") as f:
+                json.dump(value, f)
+
+        db.DB_FILE = os.path.join(workdir, "state.db")
+        store.STORAGE_BACKEND = "sqlite"
+        store.STORE_DURABILITY = "strict"  # count rows per save
+
+        print("✅ Test 1: JSON files migrate once, unchanged")
+        counts = store.migrate("sqlite")
+        assert (counts["data"], counts["wallets"], counts["lists"], counts["groups"]) == (2, 1, 1, 1)
+        assert store.migrate("sqlite") is None, "Second run should do nothing"
+        assert storage.load_data() == data
+        assert wallets.load_wallets() == wallets_data
+        assert lists.load_lists() == lists_data
+        assert groups.load_groups() == groups_data
+        mode = db._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal", mode
+        print("   ✓ Users, wallets, lists and groups round-trip (WAL mode)\n")
+
+        print("✅ Test 2: Saving only writes rows that changed")
+        before = {t: _rows_written(t) for t in ("users", "coins", "coin_alerts", "coin_triggered")}
+        current = storage.load_data()
+        storage.save_data(current)
+        assert all(_rows_written(t) == n for t, n in before.items()), "Unchanged save wrote rows"
+
+        current["111"]["coins"][0]["triggered"]["x"] = True
+        storage.save_data(current)
+        assert _rows_written("coin_triggered") == before["coin_triggered"] + 1
+        assert _rows_written("coins") == before["coins"]
+        assert storage.get_user_coins("111")[0]["triggered"] == {"x": True}
+        print("   ✓ One triggered flag = one row written\n")
+
+        print("✅ Test 3: Per-user edits keep the same API")
+        storage.add_coin("222", {"ca": "CA9", "start_mc": 1000, "alerts": {"x": 3}, "triggered": {}})
+        storage.set_user_profile("222", {"mode": "conservative"})
+        assert storage.get_user_profile("222") == {"mode": "conservative"}
+        assert set(storage.load_data()) == {"111", "legacy", "222"}
+
+        assert storage.remove_coin("111", "CA1")
+        alert_rows = db._connect().execute(
+            "SELECT COUNT(*) FROM coin_alerts WHERE user_id = '111'"
+        ).fetchone()[0]
+        assert alert_rows == 0, "Alert rows should go with their coin"
+        assert "111" not in storage.load_data()
+
+        assert wallets.add_wallet("222", "W2", "degen")
+        assert not wallets.add_wallet("222", "W2", "degen")
+        assert lists.add_coin_to_list("111", "AI", "CA7")
+        assert groups.add_coin_to_group("-100", "CA8", {"x": 2}, 1000)
+        assert [c["ca"] for c in groups.get_group_coins("-100")] == ["CA3", "CA8"]
+        print("   ✓ Coins, profiles, wallets, lists and groups\n")
+
+        print("✅ Test 4: A CA listed twice is reported, not silently dropped")
+        twice = {"333": {"coins": [{"ca": "CA5", "start_mc": 1, "alerts": {}, "triggered": {}},
+                                   {"ca": "CA5", "start_mc": 2, "alerts": {}, "triggered": {}}]}}
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            db.save_users(twice, "333")
+        assert "333 tracks CA5 twice" in out.getvalue(), out.getvalue()
+        assert [c["start_mc"] for c in db.load_users("333")["333"]["coins"]] == [1]
+        print("   ✓ First kept, duplicate logged\n")
+
+        print("✅ Test 5: Old databases drop the per-coin token columns")
+        db.DB_FILE = os.path.join(workdir, "old.db")
+        old = sqlite3.connect(db.DB_FILE)
+        old.executescript(db._SCHEMA.replace("    paused INTEGER,\n", "    paused INTEGER,\n    low_mc REAL,\n    ath_mc REAL,\n"))
+        old.execute("INSERT INTO users (user_id, doc) VALUES ('1', '{\"coins\":[]}')")
+        old.execute("INSERT INTO coins (user_id, ca, position, low_mc, ath_mc) VALUES ('1', 'CA1', 0, 50, 900)")
+        old.commit()
+        old.close()
+        columns = {row[1] for row in db._connect().execute("PRAGMA table_info(coins)")}
+        assert not columns & {"low_mc", "ath_mc"}, columns
+        coin = db.load_users("1")["1"]["coins"][0]
+        assert (coin["low_mc"], coin["ath_mc"]) == (50, 900), "Old values kept for tokens.seed()"
+        print("   ✓ Values moved into the coin's doc, columns dropped\n")
+    finally:
+        (store.STORAGE_BACKEND, store.STORE_DURABILITY, db.DB_FILE,
+         storage.DATA_FILE, storage.USERS_DIR, wallets.WALLET_FILE,
+         lists.LIST_FILE, groups.GROUPS_FILE) = originals
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_sqlite_backend()
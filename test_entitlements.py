@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test cached delivery profiles
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import notification_settings
+import settings
+import store
+from entitlements import get_delivery_profile, notification_category
+
+
+def test_delivery_profiles():
+    """Test profile resolution and invalidation on writes."""
+    print("🧪 Testing Delivery Profiles...\n")
+
+    tmp_dir = tempfile.mkdtemp()
+    original_settings = settings.SETTINGS_FILE
+    original_notif = notification_settings.NOTIF_SETTINGS_FILE
+    settings.SETTINGS_FILE = os.path.join(tmp_dir, "settings.json")
+    notification_settings.NOTIF_SETTINGS_FILE = os.path.join(tmp_dir, "notification_settings.json")
+    settings._store.invalidate()
+    notification_settings._store.invalidate()
+
+    try:
+        # Test 1: Free plan is silent
+        print("✅ Test 1: Free chats get silent alerts")
+        profile = get_delivery_profile(1001)
+        assert profile.plan == "free" and not profile.loud
+        assert profile.disable_notification("x")
+        print("   ✓ Silent by default\n")
+
+        # Test 2: Setter invalidates the cache
+        print("✅ Test 2: Plan change via setter")
+        settings.set_chat_setting(1001, "plan", "pro")
+        profile = get_delivery_profile(1001)
+        assert profile.plan == "pro" and profile.loud and profile.meta_alerts
+        assert not profile.disable_notification("x")
+        print("   ✓ Upgrade visible immediately\n")
+
+        # Test 3: Per-type sound preferences
+        print("✅ Test 3: Muted alert types")
+        notification_settings.update_notification_setting(1001, "volume", False)
+        profile = get_delivery_profile(1001)
+        assert profile.disable_notification("volume_spike")
+        assert not profile.disable_notification("mc")
+        assert notification_category("combo_triple") == "combo"
+        print("   ✓ Volume alerts silent, MC alerts loud\n")
+
+        # Test 4: Cached reads don't hit disk
+        print("✅ Test 4: Repeated lookups are served from memory")
+        assert get_delivery_profile(1001) is get_delivery_profile(1001)
+        print("   ✓ Same profile object\n")
+
+        # Test 5: External writes are noticed via mtime
+        print("✅ Test 5: File changed by another process")
+        store.flush()  # our saves reach the file before the other process writes
+        with open(settings.SETTINGS_FILE, "w") as f:
+            json.dump({"1001": {"plan": "pro", "alert_mode": "silent"}}, f)
+        settings._store.checked_at = 0  # skip the 1s check throttle
+        time.sleep(0.01)
+        profile = get_delivery_profile(1001)
+        assert not profile.loud, "Silent mode should be picked up"
+        print("   ✓ Reloaded on mtime change\n")
+    finally:
+        store.flush()
+        settings.SETTINGS_FILE = original_settings
+        notification_settings.NOTIF_SETTINGS_FILE = original_notif
+        settings._store.invalidate()
+        notification_settings._store.invalidate()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_delivery_profiles()
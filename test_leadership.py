@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test monitor leader election and fencing
+"""
+
+import json
+import os
+import tempfile
+
+from core.leadership import LeaderLease, StaleLeaderError, fenced_write
+
+
+def test_leader_election():
+    """Test one leader at a time, failover and fenced writes."""
+    print("🧪 Testing Leader Election...\n")
+
+    lease_dir = tempfile.mkdtemp()
+    state_file = os.path.join(lease_dir, "data.json")
+
+    def save(value):
+        with open(state_file, "w") as f:
+            json.dump(value, f)
+
+    replica_a = LeaderLease("monitor", lease_dir)
+    replica_b = LeaderLease("monitor", lease_dir)
+
+    try:
+        print("✅ Test 1: Only one replica leads")
+        assert replica_a.try_acquire()
+        assert not replica_b.try_acquire(), "Second replica must stand by"
+        assert replica_a.is_leader() and not replica_b.is_leader()
+        print(f"   ✓ Replica A leads with token {replica_a.token}\n")
+
+        print("✅ Test 2: Leader writes are fenced")
+        replica_a.fenced(state_file, lambda: save({"writer": "a"}))
+        print("   ✓ Write accepted\n")
+
+        print("✅ Test 3: Failover bumps the fencing token")
+        old_token = replica_a.token
+        replica_a.release()  # leader dies - the OS drops its lock
+        assert replica_b.try_acquire()
+        assert replica_b.token == old_token + 1
+        replica_b.fenced(state_file, lambda: save({"writer": "b"}))
+        print(f"   ✓ Replica B leads with token {replica_b.token}\n")
+
+        print("✅ Test 4: Stale leader can't overwrite state")
+        try:
+            fenced_write(state_file, old_token, lambda: save({"writer": "a"}))
+            assert False, "Stale write should be rejected"
+        except StaleLeaderError:
+            pass
+        with open(state_file) as f:
+            assert json.load(f) == {"writer": "b"}
+        assert not replica_a.is_leader()
+        print("   ✓ Old token rejected, new leader's data kept\n")
+    finally:
+        replica_a.release()
+        replica_b.release()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_leader_election()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test metrics registry and Prometheus exposition
+"""
+
+from metrics import MetricsRegistry
+
+
+def test_metrics():
+    """Test counters, gauges and histograms render correctly."""
+    print("🧪 Testing Metrics...\n")
+
+    registry = MetricsRegistry()
+    alerts = registry.counter("test_alerts_total", "Alerts")
+    lag = registry.gauge("test_lag_seconds", "Lag")
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1))
+
+    # Test 1: Counters add up per label set
+    print("✅ Test 1: Counters")
+    alerts.inc(type="mc")
+    alerts.inc(type="mc")
+    alerts.inc(type="x")
+    assert alerts.get(type="mc") == 2
+    assert alerts.total() == 3
+    print("   ✓ Counts per label\n")
+
+    # Test 2: Histogram buckets are cumulative
+    print("✅ Test 2: Histograms")
+    latency.observe(0.05, endpoint="dexscreener")
+    latency.observe(0.5, endpoint="dexscreener")
+    summary = latency.summary(endpoint="dexscreener")
+    assert summary["count"] == 2
+    assert abs(summary["avg"] - 0.275) < 1e-9
+    print("   ✓ Count and average tracked\n")
+
+    # Test 3: Exposition format
+    print("✅ Test 3: Prometheus text format")
+    lag.set(1.5)
+    text = registry.render()
+    assert "# TYPE test_alerts_total counter" in text
+    assert 'test_alerts_total{type="mc"} 2.0' in text
+    assert "test_lag_seconds 1.5" in text
+    assert 'test_latency_seconds_bucket{endpoint="dexscreener",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{endpoint="dexscreener",le="+Inf"} 2' in text
+    print("   ✓ Scrape output valid\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_metrics()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test the monitor loop end to end with a stubbed provider and outbox
+"""
+
+import asyncio
+import os
+import tempfile
+
+import storage
+import store
+import tokens
+import core.monitor as monitor
+from core import archive, rollups
+from core.snapshot import quote_from_token
+from metrics import monitor_phase_seconds
+
+
+class StalledOutbox:
+    """Outbox whose send_message waits until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.rows = []
+
+    async def send_message(self, chat_id, text, disable_notification=False, parse_mode=None, dedupe_key=None):
+        await self.release.wait()
+        self.rows.append(text)
+        return len(self.rows)
+
+
+def test_alerts_queued_before_save():
+    """Test triggered flags are saved only after the alert is in the outbox."""
+    print("🧪 Testing Monitor Save Ordering...\n")
+
+    data = {"123": {"coins": [{"ca": "CAX", "start_mc": 100000, "alerts": {"x": 2}, "triggered": {},
+                               "liquidity": 100000, "volume_24h": 500000}]}}
+    outbox = StalledOutbox()
+    saves = []  # outbox rows at each save of coin state
+
+    def save_coin_state(touched):
+        saves.append((len(outbox.rows), {uid: [dict(c["triggered"]) for c in coins] for uid, coins in touched.items()}))
+
+    tmp = tempfile.mkdtemp()
+    original = (monitor.fetch_quote, monitor.load_data, monitor.load_lists, monitor.log_alert,
+                storage.save_coin_state, tokens.TOKENS_FILE, archive.ARCHIVE_DIR)
+    monitor.fetch_quote = lambda ca: quote_from_token(ca, {"mc": 300000, "price": 1, "liquidity": 100000, "volume_24h": 500000})
+    monitor.load_data = lambda: data
+    monitor.load_lists = lambda: {}
+    monitor.log_alert = lambda *args: None
+    storage.save_coin_state = save_coin_state
+    tokens.TOKENS_FILE = os.path.join(tmp, "tokens.json")
+    archive.ARCHIVE_DIR = os.path.join(tmp, "ticks")
+    tokens._store.invalidate()
+
+    async def run():
+        task = asyncio.create_task(monitor.start_monitor(outbox=outbox))
+        try:
+            # Test 1: Delivery stalled - the alert fired but nothing is saved
+            print("✅ Test 1: Deliver stage stalled")
+            await asyncio.sleep(0.5)
+            assert data["123"]["coins"][0]["triggered"] == {"x": True}, "Flag set in memory"
+            assert outbox.rows == [] and saves == [], f"Saved before the outbox row: {saves}"
+            print("   ✓ Triggered in memory, not saved\n")
+
+            # Test 2: Once the row is queued the save follows
+            print("✅ Test 2: Deliver stage released")
+            outbox.release.set()
+            for _ in range(50):
+                if saves:
+                    break
+                await asyncio.sleep(0.05)
+            assert saves == [(1, {"123": [{"x": True}]})], f"Unexpected saves: {saves}"
+            for phase in ("coins", "meta", "save"):
+                assert monitor_phase_seconds.summary(phase=phase)["count"] >= 1, f"No {phase} timing"
+            print("   ✓ Saved after the outbox row existed; phases timed\n")
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    try:
+        asyncio.run(run())
+    finally:
+        store.flush()
+        (monitor.fetch_quote, monitor.load_data, monitor.load_lists, monitor.log_alert,
+         storage.save_coin_state, tokens.TOKENS_FILE, archive.ARCHIVE_DIR) = original
+        tokens._store.invalidate()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+class ListShardLeases:
+    """Leases holding one list and one of its two coins."""
+
+    def refresh(self):
+        pass
+
+    def owns(self, key):
+        return key in ("123:list:L", "CA_MINE")
+
+
+def test_list_coins_of_other_shards():
+    """Test a list's coins owned by another shard are priced but not archived or saved."""
+    print("🧪 Testing List Coins Across Shards...\n")
+
+    lists_data = {"123": {"L": {"coins": ["CA_MINE", "CA_OTHER"], "meta_alerts": {"n_pumping": 5}}}}
+    fetched, archived, saved = set(), [], []
+
+    def fetch_quote(ca):
+        fetched.add(ca)
+        return quote_from_token(ca, {"mc": 300000, "price": 1, "liquidity": 100000, "volume_24h": 500000})
+
+    tmp = tempfile.mkdtemp()
+    original = (monitor.fetch_quote, monitor.load_data, monitor.load_lists, archive.record,
+                tokens.save_token_state, tokens.TOKENS_FILE)
+    monitor.fetch_quote = fetch_quote
+    monitor.load_data = lambda: {}
+    monitor.load_lists = lambda: lists_data
+    archive.record = lambda ca, *args: archived.append(ca)
+    tokens.save_token_state = lambda state, cas: saved.append(set(cas))
+    tokens.TOKENS_FILE = os.path.join(tmp, "tokens.json")
+    tokens._store.invalidate()
+
+    async def run():
+        task = asyncio.create_task(monitor.start_monitor(outbox=StalledOutbox(), leases=ListShardLeases()))
+        try:
+            for _ in range(50):
+                if saved:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    try:
+        asyncio.run(run())
+
+        # Test 1: Both list coins priced for the meta stage
+        print("✅ Test 1: List coins fetched")
+        assert fetched == {"CA_MINE", "CA_OTHER"}, fetched
+        assert rollups.has("CA_OTHER"), "Rollups kept in memory for meta movement"
+        print("   ✓ Own and other shard's coin quoted\n")
+
+        # Test 2: Shared files only written by the CA's owner
+        print("✅ Test 2: Single writer per CA")
+        assert set(archived) == {"CA_MINE"}, archived
+        assert saved and all(cas == {"CA_MINE"} for cas in saved), saved
+        print("   ✓ Archive and token state for CA_MINE only\n")
+    finally:
+        store.flush()
+        (monitor.fetch_quote, monitor.load_data, monitor.load_lists, archive.record,
+         tokens.save_token_state, tokens.TOKENS_FILE) = original
+        tokens._store.invalidate()
+        rollups.forget_untracked(set())
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+def test_dedupe_keys():
+    """Test different or re-armed alerts get different outbox dedupe keys."""
+    print("🧪 Testing Alert Dedupe Keys...\n")
+
+    def key(item):
+        return monitor._format_alert(item)["dedupe_key"]
+
+    # Test 1: A replay of the same firing dedupes
+    print("✅ Test 1: Same firing")
+    coin = {"ca": "CAX", "start_mc": 1000, "alerts": {"x": 2}, "rev": 3}
+    first = key(("coin", "123", coin, "x", "X", 2000, monitor._arming(coin, "x")))
+    assert first == key(("coin", "123", dict(coin), "x", "X", 2000, monitor._arming(coin, "x")))
+    print("   ✓ Same key\n")
+
+    # Test 2: Re-armed by a reset (rev bump) or a new target
+    print("✅ Test 2: Re-armed alert")
+    reset = dict(coin, rev=4)
+    retarget = dict(coin, alerts={"x": 3})
+    assert key(("coin", "123", reset, "x", "X", 2000, monitor._arming(reset, "x"))) != first
+    assert key(("coin", "123", retarget, "x", "X", 3000, monitor._arming(retarget, "x"))) != first
+    print("   ✓ New key after a reset or a new target\n")
+
+    # Test 3: Two time-based alerts expiring on one coin
+    print("✅ Test 3: Two time-based alerts")
+    keys = {
+        key(("coin", "123", coin, "time_expired", "⏰", 900, monitor._timebased_arming(
+            {"subtype": "mc", "target": 5000, "created_at": created_at})))
+        for created_at in ("2026-01-01T00:00:00", "2026-01-01T00:05:00")
+    }
+    assert len(keys) == 2
+    print("   ✓ One key each\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_alerts_queued_before_save()
+    test_list_coins_of_other_shards()
+    test_dedupe_keys()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test alert outbox between monitor worker and bot
+"""
+
+import asyncio
+import os
+import tempfile
+
+from telegram.error import Forbidden, RetryAfter
+
+import core.delivery as delivery
+import core.outbox as outbox
+from core.coalescer import TELEGRAM_MAX_LENGTH, build_digests
+from core.delivery import DeliveryWorker
+
+
+def test_outbox():
+    """Test queueing and draining outbox messages."""
+    print("🧪 Testing Alert Outbox...\n")
+
+    tmp_dir = tempfile.mkdtemp()
+    original_file = outbox.OUTBOX_FILE
+    outbox.OUTBOX_FILE = os.path.join(tmp_dir, "outbox.db")
+
+    try:
+        # Test 1: OutboxBot queues instead of sending
+        print("✅ Test 1: OutboxBot queues messages")
+        bot = outbox.OutboxBot()
+        asyncio.run(bot.send_message(chat_id=12345, text="🚨 MC ALERT", parse_mode="HTML"))
+        asyncio.run(bot.send_message(chat_id=-100777, text="📊 VOLUME SPIKE", disable_notification=True))
+        assert outbox.count_pending() == 2, f"Expected 2 pending, got {outbox.count_pending()}"
+        print("   ✓ Messages queued\n")
+
+        # Test 2: Pending rows keep order and fields
+        print("✅ Test 2: Fetch pending in order")
+        pending = outbox.fetch_pending()
+        assert [row["chat_id"] for row in pending] == ["12345", "-100777"]
+        assert pending[0]["parse_mode"] == "HTML"
+        assert pending[1]["disable_notification"] == 1
+        print("   ✓ Order and fields preserved\n")
+
+        # Test 3: Sent rows leave the queue
+        print("✅ Test 3: Mark sent")
+        outbox.mark_sent([pending[0]["id"]])
+        assert outbox.count_pending() == 1, "Sent message should leave the queue"
+        print("   ✓ Sent messages removed from queue\n")
+
+        # Test 4: Same alert queued twice is only delivered once
+        print("✅ Test 4: Dedupe repeated alerts")
+        first = outbox.enqueue_message(555, "🚀 X ALERT", dedupe_key="555:ca:x:1000")
+        second = outbox.enqueue_message(555, "🚀 X ALERT", dedupe_key="555:ca:x:1000")
+        assert first is not None and second is None, "Duplicate alert should be dropped"
+        print("   ✓ Duplicate dropped\n")
+    finally:
+        outbox.OUTBOX_FILE = original_file
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+class FakeBot:
+    """Records sends; fails the first send to chat 1 with a flood wait."""
+
+    def __init__(self):
+        self.sent = []
+        self.flooded = False
+
+    async def send_message(self, chat_id, text, disable_notification=False, parse_mode=None):
+        if chat_id == "1" and not self.flooded:
+            self.flooded = True
+            raise RetryAfter(0)
+        if chat_id == "3":
+            raise Forbidden("bot was blocked by the user")
+        self.sent.append((chat_id, text))
+
+
+def test_delivery_worker():
+    """Test delivery honours flood waits and drops undeliverable chats."""
+    print("🧪 Testing Delivery Worker...\n")
+
+    tmp_dir = tempfile.mkdtemp()
+    original_file = outbox.OUTBOX_FILE
+    original_window = delivery.COALESCE_WINDOW
+    outbox.OUTBOX_FILE = os.path.join(tmp_dir, "outbox.db")
+    delivery.COALESCE_WINDOW = 0
+
+    async def drain(worker):
+        for row in outbox.fetch_pending():
+            worker._dispatch(row)
+        await asyncio.gather(*list(worker.chat_tasks.values()))
+
+    try:
+        outbox.enqueue_message(1, "alert for chat 1")
+        outbox.enqueue_message(2, "alert for chat 2")
+        outbox.enqueue_message(3, "alert for blocked chat")
+
+        bot = FakeBot()
+        worker = DeliveryWorker(bot)
+        asyncio.run(drain(worker))
+
+        print("✅ Test 1: Flood wait is retried, not lost")
+        assert ("1", "alert for chat 1") in bot.sent, f"Chat 1 not delivered: {bot.sent}"
+        assert ("2", "alert for chat 2") in bot.sent
+        print("   ✓ Delivered after retry_after\n")
+
+        print("✅ Test 2: Blocked chats leave the queue")
+        assert outbox.count_pending() == 0, f"Expected empty queue, got {outbox.count_pending()}"
+        assert not worker.in_flight, "Nothing should be in flight"
+        print("   ✓ Queue drained\n")
+    finally:
+        outbox.OUTBOX_FILE = original_file
+        delivery.COALESCE_WINDOW = original_window
+
+
+def test_coalescer():
+    """Test merging a chat's alerts into digests."""
+    print("🧪 Testing Alert Coalescer...\n")
+
+    rows = [
+        {"id": 1, "text": "📊 VOLUME SPIKE", "parse_mode": "HTML", "disable_notification": 1},
+        {"id": 2, "text": "📈 % CHANGE ALERT", "parse_mode": "HTML", "disable_notification": 0},
+        {"id": 3, "text": "🚀 LIST ALERT: AI & Agents", "parse_mode": None, "disable_notification": 1},
+    ]
+
+    print("✅ Test 1: Alerts merge into one digest")
+    digests = build_digests(rows)
+    assert len(digests) == 1, f"Expected 1 digest, got {len(digests)}"
+    assert digests[0]["row_ids"] == [1, 2, 3]
+    assert digests[0]["text"].startswith("🔔 3 ALERTS")
+    assert "AI &amp; Agents" in digests[0]["text"], "Plain text must be escaped in HTML digests"
+    assert digests[0]["disable_notification"] is False, "Loud if any alert is loud"
+    print("   ✓ One message instead of three\n")
+
+    print("✅ Test 2: Digests respect Telegram's length limit")
+    long_rows = [
+        {"id": i, "text": "x" * 1500, "parse_mode": None, "disable_notification": 0}
+        for i in range(1, 7)
+    ]
+    digests = build_digests(long_rows)
+    assert len(digests) > 1, "Oversized digest should be split"
+    assert all(len(d["text"]) <= TELEGRAM_MAX_LENGTH for d in digests)
+    assert sorted(i for d in digests for i in d["row_ids"]) == [1, 2, 3, 4, 5, 6]
+    print(f"   ✓ Split into {len(digests)} messages\n")
+
+    print("✅ Test 3: Single alert is sent unchanged")
+    digests = build_digests(rows[:1])
+    assert digests[0]["text"] == "📊 VOLUME SPIKE"
+    print("   ✓ No digest header for one alert\n")
+
+
+if __name__ == "__main__":
+    test_outbox()
+    test_delivery_worker()
+    test_coalescer()
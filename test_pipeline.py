@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test the monitor's staged pipeline
+"""
+
+import asyncio
+
+from core.pipeline import Stage, StageQueue
+from metrics import pipeline_queue_depth, pipeline_items_total
+
+
+def test_pipeline():
+    """Test stage flow, queue depth, backpressure and error isolation."""
+    print("🧪 Testing Pipeline...\n")
+
+    async def run():
+        source = StageQueue("test_source", 2)
+        sink = StageQueue("test_sink", 100)
+        release = asyncio.Event()
+
+        async def double(item):
+            if item == "boom":
+                raise ValueError("bad item")
+            await release.wait()
+            await sink.put(item * 2)
+
+        stage = Stage("test_double", source, double, workers=2)
+        stage.start()
+
+        try:
+            print("✅ Test 1: Full queue pushes back on the producer")
+            for i in range(4):
+                await source.put(i)  # two held by workers, two queued
+            assert pipeline_queue_depth.get(queue="test_source") == 2
+            blocked = asyncio.create_task(source.put(4))
+            await asyncio.sleep(0.05)
+            assert not blocked.done(), "Producer should wait on a full queue"
+            print("   ✓ Producer waits while the stage is busy\n")
+
+            print("✅ Test 2: Items flow through every worker")
+            release.set()
+            await blocked
+            await source.join()
+            results = sorted([sink.get_nowait() for _ in range(sink.qsize())])
+            assert results == [0, 2, 4, 6, 8]
+            assert pipeline_queue_depth.get(queue="test_source") == 0
+            print(f"   ✓ {results}\n")
+
+            print("✅ Test 3: A failing item doesn't stop the stage")
+            await source.put("boom")
+            await source.put(5)
+            await source.join()
+            assert sink.get_nowait() == 10
+            assert pipeline_items_total.get(stage="test_double") == 7
+            print("   ✓ Error logged, next item processed\n")
+        finally:
+            await stage.stop()
+
+    asyncio.run(run())
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_pipeline()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test OHLCV rollups per CA
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+import meta_engine
+import core.monitor as monitor
+from core import archive, rollups
+from core.rollups import BarRing
+from meta_engine import detect_meta_movement
+
+
+def test_rollups():
+    """Test bar updates, retention and the horizons read from them."""
+    print("🧪 Testing Rollups...\n")
+
+    # Test 1: Quotes in the same bar update it in place
+    print("✅ Test 1: OHLCV bars")
+    ring = BarRing(seconds=60, capacity=3)
+    for ts, price in [(0, 100.0), (20, 120.0), (40, 90.0), (59, 110.0), (60, 111.0)]:
+        ring.add(ts, price, ts * 10)
+    first, second = ring.bars()
+    assert (first["open"], first["high"], first["low"], first["close"]) == (100.0, 120.0, 90.0, 110.0)
+    assert first["volume"] == 590 and second["ts"] == 60 and second["open"] == 111.0
+    print("   ✓ One bar per minute\n")
+
+    # Test 2: Bounded by bar count and by time
+    print("✅ Test 2: Retention")
+    for minute in range(2, 6):
+        ring.add(minute * 60, 100.0 + minute, 0)
+    assert [bar["ts"] for bar in ring.bars()] == [180, 240, 300]
+    ring.add(1000 * 60, 1.0, 0)
+    assert [bar["ts"] for bar in ring.bars()] == [60000], "Bars older than the window expire"
+    assert ring.close_at(59_999) is None and ring.close_at(60_030) == 1.0
+    print("   ✓ 3 bars max, stale ones dropped\n")
+
+    # Test 3: 1h change, 24h high and ATH
+    print("✅ Test 3: Horizons")
+    start = time.time() - 2 * 86400
+    for minute in range(0, 2 * 1440, 5):
+        mc = 500_000 if minute == 2820 else 100_000 + minute * 10  # 24h high an hour ago
+        rollups.record("CA_R", start + minute * 60, mc, 5000)
+    rollups.record("CA_R", start + 2 * 86400, 250_000, 5000)
+    assert rollups.ath("CA_R") == 500_000
+    assert rollups.high("CA_R", 86400) == 500_000
+    assert round(rollups.drawdown("CA_R", 86400)) == 50
+    assert round(rollups.pct_change("CA_R", 3600), 1) == round((250_000 - 500_000) / 500_000 * 100, 1)
+    assert len(rollups.bars("CA_R", "1d")) == 3 and len(rollups.bars("CA_R", "1m")) <= 120
+    rollups.record("CA_NEW", time.time() - 3600, 2000, 1)
+    rollups.record("CA_NEW", time.time(), 1000, 1)
+    assert rollups.pct_change("CA_NEW", 7200) is None, "Not quoted for two hours yet"
+    assert rollups.high("CA_NEW", 86400) is None and rollups.drawdown("CA_NEW") is None, "No 24h high yet"
+    print("   ✓ Down 50% from the 24h high; -50% over 1h; nothing claimed before 24h\n")
+
+    # Test 4: Meta movement reads pct_1h from rollups
+    print("✅ Test 4: Meta movement")
+    now = time.time()
+    coins = {"1": []}
+    for i in range(3):
+        ca = f"CA_META{i}"
+        rollups.record(ca, now - 3600, 100_000, 1)
+        rollups.record(ca, now, 130_000, 1)
+        coins["1"].append({"ca": ca, "symbol": f"M{i}"})
+    movers = detect_meta_movement("memes", [f"CA_META{i}" for i in range(3)], coins)
+    assert movers and [round(pct) for _, _, pct in movers] == [30, 30, 30]
+
+    class Pro:
+        meta_alerts = True
+
+    original_profile = monitor.get_delivery_profile
+    monitor.get_delivery_profile = lambda user_id: Pro()
+    try:
+        movement = monitor._meta_movement("1", "memes", [f"CA_META{i}" for i in range(3)], coins)
+        assert movement and movement["type"] == "movement"
+        assert monitor._meta_movement("1", "memes", [f"CA_META{i}" for i in range(3)], coins) is None, "Cooldown"
+        assert "META HEATING UP" in monitor.format_meta_alert(movement)
+    finally:
+        monitor.get_delivery_profile = original_profile
+        meta_engine.reset_cooldowns()
+    rollups.forget_untracked({"CA_R"})
+    assert rollups.ath("CA_META0") is None and rollups.ath("CA_R")
+    print("   ✓ 3 coins up 30% in 1h; the monitor alerts once per cooldown\n")
+
+    # Test 5: Bars rebuilt from the tick archive after a restart
+    print("✅ Test 5: Restore from the archive")
+    original_dir = archive.ARCHIVE_DIR
+    archive.ARCHIVE_DIR = os.path.join(tempfile.mkdtemp(), "ticks")
+    try:
+        start = time.time() - 26 * 3600
+        for minute in range(0, 26 * 60, 2):
+            mc = 300_000 if minute == 60 else 100_000 + minute
+            rollups.record("CA_LIVE", start + minute * 60, mc, minute)
+            archive.record("CA_ARCH", start + minute * 60, mc, minute, 1)
+        archive.flush()
+        rollups.restore("CA_ARCH", archive.retained("CA_ARCH"))
+        for resolution in rollups.RESOLUTIONS:
+            assert rollups.bars("CA_ARCH", resolution) == rollups.bars("CA_LIVE", resolution), resolution
+        assert rollups.ath("CA_ARCH") == 300_000
+        assert rollups.high("CA_ARCH", 86400) == rollups.high("CA_LIVE", 86400) < 300_000
+        assert rollups.pct_change("CA_ARCH", 3600) == rollups.pct_change("CA_LIVE", 3600)
+    finally:
+        archive.ARCHIVE_DIR = original_dir
+        rollups.forget_untracked(set())
+    print("   ✓ Same bars, ATH and 24h high as if never restarted\n")
+
+    # Test 6: Restores run off the evaluator; quotes meanwhile aren't lost
+    print("✅ Test 6: Background restore")
+    release = threading.Event()
+    archived = {"ts": [time.time() - 5400], "mc": [100_000.0], "volume": [1.0]}
+
+    def load():
+        release.wait(5)
+        return archived
+
+    try:
+        rollups.schedule_restore("CA_BG", load)
+        assert rollups.has("CA_BG"), "Not scheduled twice"
+        rollups.record("CA_BG", time.time(), 150_000, 2)
+        assert rollups.pct_change("CA_BG", 3600) is None and rollups.ath("CA_BG") is None, "Unknown while restoring"
+        release.set()
+        rollups._restore_queue.join()
+        assert rollups.pct_change("CA_BG", 3600) == 50.0
+        assert rollups.ath("CA_BG") == 150_000, "Quote recorded during the restore kept"
+    finally:
+        release.set()
+        rollups.forget_untracked(set())
+    print("   ✓ Unknown until restored, then archive + live quotes\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_rollups()
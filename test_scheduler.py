@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test plan-tiered poll scheduler
+"""
+
+from core.scheduler import PollScheduler
+
+
+def test_poll_scheduler():
+    """Test per-plan freshness, CA dedupe and SLA reporting."""
+    print("🧪 Testing Poll Scheduler...\n")
+
+    plans = {"pro_user": "pro", "free_user": "free", "basic_user": "basic"}
+    scheduler = PollScheduler(tick=5)
+
+    tracked = [
+        ("free_user", "SHARED"),
+        ("pro_user", "SHARED"),
+        ("free_user", "FREE_ONLY"),
+        ("basic_user", "BASIC_ONLY"),
+    ]
+    targets = scheduler.targets(tracked, plans.get)
+
+    # Test 1: The freshest tier wins for a shared CA
+    print("✅ Test 1: Shared CA gets pro freshness")
+    assert targets["SHARED"] == ("pro", 10), f"Unexpected target: {targets['SHARED']}"
+    assert targets["FREE_ONLY"] == ("free", 120)
+    assert targets["BASIC_ONLY"] == ("basic", 30)
+    print("   ✓ Pro freshness for everyone tracking it\n")
+
+    # Test 2: Everything is due on the first tick
+    print("✅ Test 2: Never-fetched CAs are due")
+    now = 1000.0
+    due = scheduler.due(targets, now)
+    assert set(due) == {"SHARED", "FREE_ONLY", "BASIC_ONLY"}
+    scheduler.record(due, due, now)
+    print("   ✓ All three fetched\n")
+
+    # Test 3: Only CAs past their interval are due later
+    print("✅ Test 3: Per-tier intervals")
+    assert scheduler.due(targets, now + 5) == ["SHARED"], "Pro CA due a tick early"
+    assert set(scheduler.due(targets, now + 25)) == {"SHARED", "BASIC_ONLY"}
+    assert "FREE_ONLY" not in scheduler.due(targets, now + 100)
+    print("   ✓ Pro 10s, basic 30s, free 120s\n")
+
+    # Test 4: SLA attainment per tier
+    print("✅ Test 4: SLA attainment")
+    scheduler.record(["SHARED"], [], now + 10)  # pro fetch failed
+    attainment = scheduler.measure_sla(targets, now + 20)
+    assert attainment["pro"] == 0.0, f"Stale pro CA should miss: {attainment}"
+    assert attainment["basic"] == 1.0 and attainment["free"] == 1.0
+    print("   ✓ Pro missed, basic/free met\n")
+
+    # Test 5: Untracked CAs are forgotten
+    print("✅ Test 5: Forget untracked CAs")
+    scheduler.forget_untracked({"SHARED": ("pro", 10)})
+    assert set(scheduler.last_attempt) == {"SHARED"}
+    print("   ✓ Bookkeeping pruned\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_poll_scheduler()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test sharded monitor workers
+"""
+
+import os
+import tempfile
+import time
+
+from core.monitor import tracked_pairs
+from core.sharding import HashRing, ShardLeases
+from storage import merge_coin_state
+
+
+def test_hash_ring():
+    """Test CAs spread evenly and move little when shards are added."""
+    print("🧪 Testing Hash Ring...\n")
+
+    cas = [f"CA{i:05d}" for i in range(4000)]
+
+    print("✅ Test 1: Even spread across shards")
+    ring = HashRing(4)
+    counts = [0] * 4
+    for ca in cas:
+        counts[ring.shard_for(ca)] += 1
+    assert min(counts) > 600, f"Uneven spread: {counts}"
+    print(f"   ✓ {counts}\n")
+
+    print("✅ Test 2: Adding a shard moves a minority of CAs")
+    bigger = HashRing(5)
+    moved = sum(1 for ca in cas if ring.shard_for(ca) != bigger.shard_for(ca))
+    assert moved < len(cas) * 0.35, f"Too many CAs moved: {moved}"
+    print(f"   ✓ {moved} of {len(cas)} moved\n")
+
+
+def test_shard_leases():
+    """Test takeover of a dead worker's shard and hand-back."""
+    print("🧪 Testing Shard Leases...\n")
+
+    lease_dir = tempfile.mkdtemp()
+    worker_a = ShardLeases(0, 2, lease_dir)
+    worker_b = ShardLeases(1, 2, lease_dir)
+
+    try:
+        print("✅ Test 1: Each worker settles on its own shard")
+        worker_a.refresh()  # B hasn't started yet - A covers shard 1 too
+        worker_b.refresh()
+        assert worker_a.refresh() == {0}, "A should hand shard 1 to B"
+        assert worker_b.refresh() == {1}
+        print("   ✓ Shards 0 and 1 owned\n")
+
+        print("✅ Test 2: Dead worker's shard is taken over")
+        worker_b.close()
+        old = time.time() - 60
+        os.utime(os.path.join(lease_dir, "shard-1.alive"), (old, old))
+        assert worker_a.refresh() == {0, 1}, "Worker A should take over shard 1"
+        print("   ✓ Worker A owns both shards\n")
+
+        print("✅ Test 3: Returning worker gets its shard back")
+        assert worker_b.refresh() == set(), "Shard still held by A"
+        assert worker_a.refresh() == {0}, "A should hand shard 1 back"
+        assert worker_b.refresh() == {1}
+        print("   ✓ Shard 1 back with worker B\n")
+
+        print("✅ Test 4: Coins and lists are split between shards")
+        data = {"1": {"coins": [{"ca": f"CA{i}"} for i in range(50)]}}
+        mine_a = {ca for _, ca in tracked_pairs(data, {}, worker_a.owns)}
+        mine_b = {ca for _, ca in tracked_pairs(data, {}, worker_b.owns)}
+        assert mine_a and mine_b and not (mine_a & mine_b)
+        assert len(mine_a | mine_b) == 50
+        print(f"   ✓ {len(mine_a)} / {len(mine_b)} coins, no overlap\n")
+
+        print("✅ Test 5: Saving keeps other shards' changes")
+        fresh = {"coins": [{"ca": ca, "triggered": {"x": True}} for ca in sorted(mine_a | mine_b)]}
+        ours = [{"ca": ca, "triggered": {}} for ca in sorted(mine_a)]  # shard A's coins only
+        merged = merge_coin_state(fresh, ours)
+        assert all(coin["triggered"] == {"x": True} for coin in merged["coins"] if coin["ca"] in mine_b)
+        print("   ✓ Shard B's triggers not overwritten by shard A\n")
+
+        print("✅ Test 6: User edits win over stale flags")
+        ours = [{"ca": "CA1", "rev": 0, "alerts": {"x": 2}, "triggered": {"x": True, "bounce": True}}]
+        cleared = {"coins": [{"ca": "CA1", "rev": 1, "alerts": {}, "triggered": {}}]}
+        assert merge_coin_state(cleared, ours)["coins"][0]["triggered"] == {}, "Reset re-arms every alert"
+        edited = {"coins": [{"ca": "CA1", "rev": 1, "alerts": {"x": 2, "pct": 50}, "triggered": {}}]}
+        assert merge_coin_state(edited, ours)["coins"][0]["triggered"] == {"x": True}
+        print("   ✓ Only flags of alerts still configured the same way survive an edit\n")
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_hash_ring()
+    test_shard_leases()
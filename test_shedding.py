@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test deadline-aware load shedding
+"""
+
+import time
+
+from core import ticks
+from core.alerts import AlertEngine
+from core.monitor import near_threshold_cas
+from core.shedding import LoadShedder, SKIP_HISTORY, DEFER_META, NEAR_ONLY
+from core.snapshot import MarketSnapshot, quote_from_token
+
+
+def test_load_shedding():
+    """Test shed levels and near-threshold polling."""
+    print("🧪 Testing Load Shedding...\n")
+
+    # Test 1: Overruns escalate one level at a time
+    print("✅ Test 1: Escalate on overrun")
+    shedder = LoadShedder(deadline=5)
+    shedder.observe(6)
+    assert shedder.sheds(SKIP_HISTORY) and not shedder.sheds(DEFER_META)
+    shedder.observe(7)
+    shedder.observe(8)
+    shedder.observe(9)
+    assert shedder.sheds(NEAR_ONLY) and shedder.level == NEAR_ONLY, "Capped at near_only"
+    print("   ✓ normal -> skip_history -> defer_meta -> near_only\n")
+
+    # Test 2: Fast ticks recover, borderline ticks hold
+    print("✅ Test 2: Recover with hysteresis")
+    shedder.observe(4)
+    assert shedder.level == NEAR_ONLY, "Borderline tick should not step down"
+    shedder.observe(1)
+    assert shedder.level == DEFER_META
+    print("   ✓ Steps down only on comfortably fast ticks\n")
+
+    # Test 3: Threshold distance
+    print("✅ Test 3: Distance to armed thresholds")
+    coin = {"ca": "NEAR", "start_mc": 100000, "alerts": {"x": 2}, "triggered": {}}
+    assert abs(AlertEngine.threshold_distance(coin, 180000) - 0.1) < 1e-9
+    assert AlertEngine.threshold_distance({"alerts": {}}, 180000) is None
+    assert AlertEngine.armed_alerts({"alerts": {"x": 2}, "triggered": {"x": True}}) == []
+    print("   ✓ 1.8x is 10% from a 2x alert\n")
+
+    # Test 4: Only coins near thresholds keep polling
+    print("✅ Test 4: Near-threshold CAs")
+    data = {
+        "1": {"coins": [
+            coin,
+            {"ca": "FAR", "start_mc": 100000, "alerts": {"x": 10}, "triggered": {}},
+            {"ca": "IDLE", "start_mc": 100000, "alerts": {}},
+            {"ca": "COMBO", "combo_alerts": {"triple": {"mc": 1}}},
+        ]}
+    }
+    snapshot = MarketSnapshot({
+        ca: quote_from_token(ca, {"mc": 180000}) for ca in ["NEAR", "FAR", "IDLE", "COMBO"]
+    })
+    near = near_threshold_cas(data, snapshot)
+    assert near == {"NEAR", "COMBO"}, f"Unexpected near set: {near}"
+    assert shedder.filter_due(["NEAR", "FAR"], near) == ["NEAR", "FAR"], "No filtering below near_only"
+    shedder.level = NEAR_ONLY
+    assert shedder.filter_due(["NEAR", "FAR"], near) == ["NEAR"]
+    print("   ✓ Far and idle coins shed\n")
+
+    # Test 5: Automatic checks need history too
+    print("✅ Test 5: Shed history skips automatic checks")
+    coin = {"ca": "SHED", "start_mc": 100000, "alerts": {}, "triggered": {}, "liquidity": 100000}
+    fired = dict.fromkeys(AlertEngine.AUTOMATIC_ALERTS, True)
+    assert AlertEngine.needs_history(coin), "Automatic checks count as armed"
+    assert not AlertEngine.needs_history(dict(coin, triggered=fired))
+    assert AlertEngine.needs_history(dict(coin, triggered=fired, alerts={"x": 2}))
+    try:
+        for i in range(3):
+            ticks.record("SHED", time.time() - 30 + i, 100000, 100, 100000)
+        assert [t for t, _ in AlertEngine.evaluate_all(coin, 100000, 1000, "aggressive", 100000)] == ["volume_spike"]
+        assert AlertEngine.evaluate_all(coin, 100000, 1000, "aggressive", 100000, history=False) == []
+    finally:
+        ticks.forget_untracked(set())
+    print("   ✓ Quote not in history - no volume spike against stale samples\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_load_shedding()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test per-cycle market snapshot
+"""
+
+import core.snapshot as snapshot
+from core.monitor import collect_cas
+from meta_alerts import evaluate_meta_alerts
+
+
+def test_snapshot():
+    """Test that each CA is fetched once and every evaluator sees the same quote."""
+    print("🧪 Testing Market Snapshot...\n")
+
+    calls = []
+    prices = {"CA1": 100000, "CA2": 250000}
+
+    def fake_market_cap(ca):
+        calls.append(ca)
+        mc = prices.get(ca)
+        return {"mc": mc, "price": 0.1, "liquidity": 5000, "volume_24h": 20000} if mc else None
+
+    original = snapshot.get_market_cap
+    snapshot.get_market_cap = fake_market_cap
+
+    try:
+        data = {
+            "111": {"coins": [{"ca": "CA1"}, {"ca": "CA2"}, {"ca": "CA3", "paused": True}]},
+            "222": [{"ca": "CA1"}]
+        }
+        lists_data = {
+            "111": {"Runners": {"coins": ["CA1", "CA2"], "meta_alerts": {"total_mc": 300000}}},
+            "222": {"Quiet": {"coins": ["CA4"]}}
+        }
+
+        # Test 1: Only unpaused coins and lists with meta alerts are fetched
+        print("✅ Test 1: Collect CAs for the cycle")
+        cas = collect_cas(data, lists_data)
+        assert cas == ["CA1", "CA2"], f"Unexpected CAs: {cas}"
+        print("   ✓ Paused coins and quiet lists skipped\n")
+
+        # Test 2: Each CA is fetched once, even when listed twice
+        print("✅ Test 2: One fetch per CA")
+        snap = snapshot.get_quotes(cas + ["CA1", "MISSING"])
+        assert sorted(calls) == ["CA1", "CA2", "MISSING"], f"Unexpected fetches: {calls}"
+        assert len(snap) == 2 and "MISSING" not in snap
+        assert snap.mc("CA1") == 100000
+        print("   ✓ Duplicates collapsed, failures dropped\n")
+
+        # Test 3: Meta alerts read the snapshot instead of fetching
+        print("✅ Test 3: Meta alerts use the snapshot")
+        calls.clear()
+        result = evaluate_meta_alerts(
+            "Runners", ["CA1", "CA2"], {}, {"total_mc": 300000}, {}, snap
+        )
+        assert calls == [], "Meta alerts should not fetch market data"
+        assert result and result["type"] == "total_mc", f"Unexpected result: {result}"
+        print("   ✓ Total MC alert fired from snapshot\n")
+
+        # Test 4: UI reuses the published snapshot
+        print("✅ Test 4: UI quotes reuse the monitor snapshot")
+        snapshot.publish_snapshot(snap)
+        quotes = snapshot.get_quotes(["CA1", "CA2"])
+        assert calls == [], "Fresh snapshot should be reused"
+        assert quotes.mc("CA2") == 250000
+        print("   ✓ No extra provider calls\n")
+    finally:
+        snapshot.get_market_cap = original
+        snapshot.publish_snapshot(None)
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_snapshot()
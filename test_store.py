@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Test the shared document store
+"""
+
+import json
+import os
+import tempfile
+import time
+
+import alert_history
+import codec
+import db
+import storage
+import store
+import tokens
+from metrics import store_operations_total, storage_rows_written_total
+from store import Store
+
+
+def test_document_store():
+    """Test caching, batching and per-owner saves across backends."""
+    print("🧪 Testing Document Store...\n")
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "doc.json")
+    originals = (store.STORAGE_BACKEND, store.STORE_DURABILITY, db.DB_FILE,
+                 alert_history.HISTORY_FILE, storage.DATA_FILE, storage.USERS_DIR,
+                 store.WAL_ENABLED, store.WAL_COMPACT_BYTES, alert_history.HISTORY_DIR,
+                 alert_history._store.keep, store.LOG_SEGMENT_BYTES, alert_history.STATS_FILE,
+                 tokens.TOKENS_FILE, store.REDIS_URL, store._redis_client)
+
+    try:
+        store.STORE_DURABILITY = "strict"
+        doc = Store("test_doc", lambda: path)
+
+        print("✅ Test 1: JSON saves are atomic and cached reads reload on change")
+        doc.save({"1": {"tier": "pro"}})
+        assert os.listdir(workdir) == ["doc.json"], "Temp file left behind"
+        assert doc.get() == {"1": {"tier": "pro"}}
+        generation = doc.current_generation()
+
+        with open(path, "w") as f:  # another process writes the file
+            json.dump({"1": {"tier": "basic"}, "2": {}}, f)
+        doc.checked_at = 0  # skip the 1s check throttle
+        assert doc.get()["1"]["tier"] == "basic"
+        assert doc.current_generation() == generation + 1
+        hits = store_operations_total.get(store="test_doc", op="cache_hit")
+        doc.get()
+        assert store_operations_total.get(store="test_doc", op="cache_hit") == hits + 1
+        print("   ✓ External change picked up, repeat reads hit memory\n")
+
+        print("✅ Test 2: Batched saves write once")
+        saves = store_operations_total.get(store="test_doc", op="save")
+        with doc.batch():
+            for i in range(10):
+                data = doc.load("1")
+                data["1"]["count"] = i
+                doc.save(data, "1")
+            assert doc.load()["1"]["count"] == 9, "Reads inside a batch see pending saves"
+        assert store_operations_total.get(store="test_doc", op="save") == saves + 1
+        assert doc.load() == {"1": {"tier": "basic", "count": 9}, "2": {}}
+        print("   ✓ 10 saves -> 1 write\n")
+
+        print("✅ Test 3: SQLite saves only the owner that changed")
+        db.DB_FILE = os.path.join(workdir, "state.db")
+        store.STORAGE_BACKEND = "sqlite"
+        alert_history.HISTORY_FILE = os.path.join(workdir, "alert_history.json")
+        alert_history.STATS_FILE = os.path.join(workdir, "alert_stats.json")
+
+        alert_history.log_alert(111, "x", "CA1", {"mc": 1})
+        alert_history.log_alert(222, "x", "CA2", {"mc": 2})
+        written = storage_rows_written_total.get(table="documents")
+        alert_history.log_alert(111, "mc", "CA1", {"mc": 3})
+        # The user's history row, plus their counters and the global counters
+        assert storage_rows_written_total.get(table="documents") == written + 3
+        assert [a["type"] for a in alert_history.get_user_history(111)] == ["mc", "x"]
+        assert len(alert_history.get_user_history(222)) == 1
+        assert not os.path.exists(alert_history.HISTORY_FILE), "Nothing should go to JSON"
+        print("   ✓ One user's alert = one history row\n")
+
+        print("✅ Test 4: Sharded user files - one write per user changed")
+        store.STORAGE_BACKEND = "json"
+        store.WAL_ENABLED = False
+        storage._store.backends.clear()
+        storage.DATA_FILE = os.path.join(workdir, "data.json")
+        storage.USERS_DIR = os.path.join(workdir, "users")
+        tokens.TOKENS_FILE = os.path.join(workdir, "tokens.json")
+        with open(storage.DATA_FILE, "w") as f:
+            json.dump({uid: {"coins": [{"ca": f"CA{uid}"}], "profile": {}} for uid in ("1", "2", "3")}, f)
+
+        def inodes():
+            return {name: os.stat(os.path.join(storage.USERS_DIR, name)).st_ino
+                    for name in os.listdir(storage.USERS_DIR)}
+
+        assert storage.get_user_coins("2") == [{"ca": "CA2"}], "data.json split on first use"
+        before = inodes()
+        assert set(before) == {"1.snap", "2.snap", "3.snap", "index", "index.lock"}
+
+        storage.add_coin("1", {"ca": "CA9", "start_mc": 1000})
+        after = inodes()
+        assert [n for n in before if after[n] != before[n]] == ["1.snap"]
+
+        data = storage.load_data()
+        assert list(data) == ["1", "2", "3"] and not data.loaded, "Nothing read until accessed"
+        data["3"]["profile"] = {"mode": "conservative"}
+        data["4"] = {"coins": [], "profile": {}}
+        storage.save_data(data)
+        changed = [n for n, ino in inodes().items() if after.get(n) != ino]
+        assert sorted(changed) == ["3.snap", "4.snap", "index"], changed
+
+        assert storage.remove_coin("2", "CA2")
+        assert "2.snap" not in os.listdir(storage.USERS_DIR)
+        assert list(storage.load_data()) == ["1", "3", "4"]
+        assert storage.get_user_profile("3") == {"mode": "conservative"}
+        print("   ✓ Only the touched user's file (and the index on add/remove) rewritten\n")
+
+        print("✅ Test 5: Write-ahead log - append, replay, compact")
+        store.WAL_ENABLED = True
+        storage._store.backends.clear()
+        wal = os.path.join(storage.USERS_DIR, "wal")
+        files = inodes()
+
+        storage.set_user_profile("1", {"mode": "conservative"})
+        with storage._store.batch():
+            for ca in ("CA5", "CA6", "CA7"):
+                storage.add_coin("5", {"ca": ca, "start_mc": 1})
+        assert inodes()["1.snap"] == files["1.snap"], "Change goes to the log, not the user file"
+        with open(wal) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 3, "Header + one record per commit"
+
+        with open(wal, "a") as f:
+            f.write('"1"\t{"coins": [], "prof')  # crash mid-append
+        data = storage.load_data()
+        assert data["1"]["profile"] == {"mode": "conservative"}, "Torn record ignored"
+        assert [c["ca"] for c in data["5"]["coins"]] == ["CA5", "CA6", "CA7"]
+        storage.remove_coin("3", "CA3")
+        assert "3" not in storage.load_data()
+
+        storage._store.compact()
+        with open(wal) as f:
+            assert len(f.read().splitlines()) == 1, "Log starts over after compaction"
+        assert sorted(n for n in os.listdir(storage.USERS_DIR) if n.endswith(".snap")) == ["1.snap", "4.snap", "5.snap"]
+        with open(os.path.join(storage.USERS_DIR, "1.snap"), "rb") as f:
+            assert codec.decode(f.read())["profile"] == {"mode": "conservative"}
+        assert list(storage.load_data()) == ["1", "4", "5"]
+
+        store.WAL_COMPACT_BYTES = 1
+        storage.set_user_profile("4", {"mode": "degen"})
+        with open(os.path.join(storage.USERS_DIR, "4.snap"), "rb") as f:
+            assert codec.decode(f.read())["profile"] == {"mode": "degen"}, "Log compacted once over the limit"
+
+        def disk_full(*args, **kwargs):
+            raise OSError("No space left on device")
+
+        mkstemp, store.tempfile.mkstemp = store.tempfile.mkstemp, disk_full
+        try:
+            storage.set_user_profile("5", {"mode": "degen"})  # logged; compaction fails
+            try:
+                storage._store.compact()
+                assert False, "Failed snapshot write must raise"
+            except OSError:
+                pass
+        finally:
+            store.tempfile.mkstemp = mkstemp
+        with open(wal) as f:
+            assert len(f.read().splitlines()) == 2, "Log kept when the snapshot write fails"
+        assert storage.load_data()["5"]["profile"] == {"mode": "degen"}
+        storage._store.compact()
+        with open(os.path.join(storage.USERS_DIR, "5.snap"), "rb") as f:
+            assert codec.decode(f.read())["profile"] == {"mode": "degen"}, "Folded in once the disk recovers"
+        print("   ✓ One fsynced append per commit; torn tail ignored; compaction folds the log; failed folds keep it\n")
+
+        print("✅ Test 6: Grouped durability - saves written behind, once per flush")
+        store.STORE_DURABILITY = "grouped"
+        saves = store_operations_total.get(store="test_doc", op="save")
+        mtime = os.stat(path).st_mtime_ns
+        for i in range(50):
+            data = doc.load("1")
+            data["1"]["count"] = i
+            doc.save(data, "1")
+            data["1"]["count"] = -1  # changes after save() aren't saved
+        assert os.stat(path).st_mtime_ns == mtime, "Nothing written yet"
+        assert doc.load()["1"]["count"] == 49 and doc.get()["1"]["count"] == 49
+
+        store.flush()
+        assert store_operations_total.get(store="test_doc", op="save") == saves + 1
+        with open(path) as f:
+            assert json.load(f)["1"]["count"] == 49
+
+        doc.save({"1": {"tier": "pro"}})
+        deadline = time.time() + 5
+        while doc.backend().load().get("1") != {"tier": "pro"}:
+            assert time.time() < deadline, "Background flusher never wrote"
+            time.sleep(0.05)
+        print("   ✓ 50 saves -> 1 write; the flusher writes on its own\n")
+
+        print("✅ Test 7: UI edits during a monitor tick aren't lost")
+        for durability in ("strict", "grouped"):
+            store.STORE_DURABILITY = durability
+            storage.add_coin("7", {"ca": "CA1", "start_mc": 100, "alerts": {"x": 2, "mc": 500}, "triggered": {}})
+
+            tick = storage.load_data()  # monitor reads, then the UI writes
+            coin = tick["7"]["coins"][0]
+            coin["ath_mc"] = 300
+            coin["triggered"].update({"x": True, "mc": True})
+            storage.update_coin("7", "CA1", lambda c: c.update(paused=True, alerts={"x": 2, "mc": 900}))
+            storage.add_coin("7", {"ca": "CA2", "start_mc": 1})
+            storage.save_coin_state({"7": [coin]})
+            store.flush()
+
+            saved = storage._store.backend().load("7")["7"]["coins"]
+            assert [c["ca"] for c in saved] == ["CA1", "CA2"], "Coin added mid-tick kept"
+            assert saved[0]["paused"] and saved[0]["alerts"]["mc"] == 900, "UI edit kept"
+            assert "ath_mc" not in saved[0], "Token fields kept per CA, not per user"
+            assert saved[0]["triggered"] == {"x": True}, "Trigger for an edited alert dropped"
+            storage.remove_coin("7", "CA1")
+            storage.remove_coin("7", "CA2")
+        print("   ✓ Monitor writes triggers per coin, kept only for unchanged alerts\n")
+
+        print("✅ Test 8: Alert history is an append-only log")
+        store.STORE_DURABILITY = "strict"
+        alert_history._store.backends.clear()
+        alert_history._store.keep = 5
+        alert_history.HISTORY_DIR = os.path.join(workdir, "alert_history")
+        with open(alert_history.HISTORY_FILE, "w") as f:
+            json.dump({"111": [{"timestamp": "2024-01-01T00:00:00", "type": "x", "ca": "CA1", "details": {}}]}, f)
+
+        assert [a["ca"] for a in alert_history.get_user_history(111)] == ["CA1"], "JSON history imported"
+        segment = os.path.join(alert_history.HISTORY_DIR, "00000001.log")
+        inode, size = os.stat(segment).st_ino, os.path.getsize(segment)
+        alert_history.log_alert(111, "mc", "CA2", {"mc": 1})
+        assert os.stat(segment).st_ino == inode, "Appended, not rewritten"
+        with open(segment) as f:
+            assert len(f.read()[size:].splitlines()) == 1
+
+        for i in range(10):
+            alert_history.log_alert(111, "pct", f"CA{i}", {})
+            alert_history.log_alert(222, "x", f"CA{i}", {})
+        assert [a["ca"] for a in alert_history.get_user_history(111, limit=2)] == ["CA9", "CA8"]
+        assert len(alert_history.get_user_history(111)) == 5, "Capped at keep"
+
+        other = store.LogBackend("alert_history", lambda: alert_history.HISTORY_FILE,
+                                 lambda: alert_history.HISTORY_DIR, 5)  # another process
+        assert other.load() == alert_history.load_history()
+        assert alert_history.clear_user_history(222) and alert_history.get_user_history(222) == []
+
+        before = os.path.getsize(segment)
+        alert_history._store.backend().compact()
+        assert sorted(os.listdir(alert_history.HISTORY_DIR)) == ["00000002.log", "lock"]
+        assert os.path.getsize(os.path.join(alert_history.HISTORY_DIR, "00000002.log")) < before / 3
+        assert other.tail("111", 1)[0]["ca"] == "CA9", "Other readers follow the compaction"
+
+        store.LOG_SEGMENT_BYTES = 300
+        compactions = store_operations_total.get(store="alert_history", op="compact")
+        for i in range(30):
+            alert_history.log_alert(111, "pct", f"CA{i}", {})
+        deadline = time.time() + 5
+        while store_operations_total.get(store="alert_history", op="compact") == compactions:
+            assert time.time() < deadline, "Background compaction never ran"
+            time.sleep(0.05)
+        assert [a["ca"] for a in alert_history.get_user_history(111)] == [f"CA{i}" for i in range(29, 24, -1)]
+        print("   ✓ One line per alert; last N read by offset; compaction drops trimmed records\n")
+
+        # Test 9: A configured Redis that can't be reached is an error, not JSON
+        print("✅ Test 9: Unreachable Redis fails loudly")
+        store.STORAGE_BACKEND = "redis"
+        store.REDIS_URL = "redis://localhost:1/0"
+        store._redis_client = None
+        redis_doc = Store("test_redis", lambda: path)
+        for _ in range(2):  # retried on every use, never cached as "use JSON"
+            try:
+                redis_doc.backend()
+                assert False, "Should raise while Redis is down"
+            except ConnectionError:
+                pass
+        assert "json" not in redis_doc.backends and store._redis_client is None
+        store.STORAGE_BACKEND = "json"
+        print("   ✓ ConnectionError on each attempt; no JSON fallback\n")
+    finally:
+        store.flush()
+        (store.STORAGE_BACKEND, store.STORE_DURABILITY, db.DB_FILE,
+         alert_history.HISTORY_FILE, storage.DATA_FILE, storage.USERS_DIR,
+         store.WAL_ENABLED, store.WAL_COMPACT_BYTES, alert_history.HISTORY_DIR,
+         alert_history._store.keep, store.LOG_SEGMENT_BYTES, alert_history.STATS_FILE,
+         tokens.TOKENS_FILE, store.REDIS_URL, store._redis_client) = originals
+        storage._store.backends.clear()
+        tokens._store.invalidate()
+        alert_history._store.backends.clear()
+        alert_history._stats.invalidate()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_document_store()
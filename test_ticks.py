@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test per-CA tick ring buffers
+"""
+
+import time
+
+from core import ticks
+from core.alerts import AlertEngine
+from core.ticks import TickRing
+from intelligence import analyze_momentum, detect_dump_stabilize_bounce
+
+
+def test_tick_rings():
+    """Test append/expiry/wrap, views and the readers built on them."""
+    print("🧪 Testing Tick Rings...\n")
+
+    # Test 1: Fixed capacity, oldest overwritten, views across the wrap
+    print("✅ Test 1: Ring wraps and expires")
+    ring = TickRing(capacity=4)
+    for i in range(6):
+        ring.append(float(i), 100.0 + i, 10.0, 50.0)
+    view = ring.view()
+    assert len(view) == 4 and view.column("mc") == [102.0, 103.0, 104.0, 105.0]
+    assert view.last(2).column("ts") == [4.0, 5.0]
+    assert view.since(3.5).column("ts") == [4.0, 5.0]
+    ring.expire(5.0)
+    assert ring.view().column("ts") == [5.0]
+    print("   ✓ Last 4 kept, expiry drops the oldest\n")
+
+    # Test 2: One ring per CA shared by every subscriber
+    print("✅ Test 2: Shared by subscribers")
+    now = time.time()
+    for i in range(5):
+        ticks.record("CA_T", now - 50 + i * 10, 100_000 + i * 10_000, 1000, 50_000)
+    a = {"ca": "CA_T", "history": "ignored"}
+    b = {"ca": "CA_T"}
+    assert analyze_momentum(ticks.history(a["ca"])) == analyze_momentum(ticks.history(b["ca"]))
+    direction, strength = analyze_momentum(ticks.history("CA_T"))
+    assert direction == "up" and strength == 1.0
+    assert analyze_momentum(ticks.history("CA_NONE")) == ("stable", 0.0)
+    assert analyze_momentum([{"mc": 100}, {"mc": 150}])[0] == "up", "Lists still accepted"
+    ticks.forget_untracked({"CA_T"})
+    ticks.record("CA_OLD", now, 1, 1, 1)
+    ticks.forget_untracked({"CA_T"})
+    assert len(ticks.history("CA_OLD")) == 0 and len(ticks.history("CA_T")) == 5
+    print("   ✓ Same view for both users; untracked CAs dropped\n")
+
+    # Test 3: Pattern and spike detection read the ring
+    print("✅ Test 3: Bounce, volume spike and liquidity drop")
+    for i, (mc, volume) in enumerate([(300_000, 1000), (360_000, 1100), (300_000, 1200), (340_000, 1300)]):
+        ticks.record("CA_B", now - 30 + i * 10, mc, volume, 80_000)
+    coin = {"ca": "CA_B", "ath_mc": 1_000_000}
+    assert detect_dump_stabilize_bounce(coin, 340_000, 1300) == (False, ""), "Range too wide"
+    ticks.forget_untracked(set())  # start CA_B over
+    for i, (mc, volume) in enumerate([(300_000, 1000), (305_000, 1100), (300_000, 1200), (340_000, 1300)]):
+        ticks.record("CA_B", now - 30 + i * 10, mc, volume, 80_000)
+    assert detect_dump_stabilize_bounce(coin, 340_000, 1300) == (True, "dump_stabilize_bounce")
+
+    ticks.record("CA_B", now + 2, 300_000, 9000, 20_000)
+    fired, msg = AlertEngine.should_alert_volume_spike(coin, 9000)
+    assert fired and "Spike: " in msg
+    fired, msg = AlertEngine.should_alert_liquidity_change(coin, 20_000)
+    assert fired and "-75.0%" in msg
+    print("   ✓ Views over the same samples\n")
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_tick_rings()
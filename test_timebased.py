@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test in-memory time-based alert scheduler
+"""
+
+import os
+import tempfile
+import time
+
+import store
+import timebased_alerts
+from timebased_alerts import TimeBasedScheduler, load_timebased
+
+
+def test_timebased_scheduler():
+    """Test targets, deadline expiry and write-behind saves."""
+    print("🧪 Testing Time-Based Scheduler...\n")
+
+    tmp_dir = tempfile.mkdtemp()
+    original_file = timebased_alerts.TIMEBASED_FILE
+    timebased_alerts.TIMEBASED_FILE = os.path.join(tmp_dir, "timebased.json")
+
+    try:
+        scheduler = TimeBasedScheduler()
+        scheduler.add(111, "CA_TARGET", "2x", 2, expiry_hours=1)
+        scheduler.add(111, "CA_EXPIRE", "mc", 500000, expiry_hours=1)
+
+        # Test 1: User changes are written straight through
+        print("✅ Test 1: New alerts saved immediately")
+        assert len(load_timebased()["111"]) == 2
+        assert len(scheduler.active(111)) == 2
+        print("   ✓ Both alerts on disk\n")
+
+        # Test 2: Target met fires once
+        print("✅ Test 2: Target met")
+        assert scheduler.check(111, "CA_TARGET", 150000, 100000) is None
+        result = scheduler.check(111, "CA_TARGET", 250000, 100000)
+        assert result and result["type"] == "time_target_met", f"Unexpected: {result}"
+        assert scheduler.check(111, "CA_TARGET", 300000, 100000) is None, "Should only fire once"
+        print("   ✓ Fired once at 2.5x\n")
+
+        # Test 3: Triggers are saved on flush, not per alert
+        print("✅ Test 3: Write-behind persistence")
+        on_disk = {a["ca"]: a for a in load_timebased()["111"]}
+        assert not on_disk["CA_TARGET"]["triggered"], "Trigger should wait for flush"
+        scheduler.flush()
+        on_disk = {a["ca"]: a for a in load_timebased()["111"]}
+        assert on_disk["CA_TARGET"]["triggered"]
+        print("   ✓ Saved on flush\n")
+
+        # Test 4: Deadline fires without the coin being checked again
+        print("✅ Test 4: Expiry heap fires at the deadline")
+        scheduler.check(111, "CA_EXPIRE", 200000, 100000)
+        assert scheduler.pop_expired(now=time.time()) == [], "Nothing due yet"
+        fired = scheduler.pop_expired(now=time.time() + 7200)
+        assert len(fired) == 1, f"Expected one expiry, got {fired}"
+        user_id_str, ca, result = fired[0]
+        assert (user_id_str, ca) == ("111", "CA_EXPIRE")
+        assert result["type"] == "time_expired" and result["actual"] == 200000
+        assert scheduler.pop_expired(now=time.time() + 7200) == [], "Expiry fires once"
+        print("   ✓ TIME EXPIRED from last seen price\n")
+
+        # Test 5: Another process's changes are picked up
+        print("✅ Test 5: Reload on file change")
+        other = TimeBasedScheduler()
+        other.add(222, "CA_OTHER", "mc", 1000000, expiry_hours=1)
+        scheduler.flush()
+        assert len(scheduler.active(222)) == 1
+        assert "222" in load_timebased(), "Flush must not drop other process's alerts"
+        print("   ✓ Merged external additions\n")
+
+        # Test 6: Flushing writes only the triggers
+        print("✅ Test 6: Flush keeps concurrent edits")
+        scheduler.add(333, "CA_MINE", "2x", 2, expiry_hours=1)
+        assert scheduler.check(333, "CA_MINE", 300000, 100000)
+        scheduler._file_state = lambda: "unchanged"  # the edit below lands after our last reload
+        scheduler.file_state = "unchanged"
+        other.add(333, "CA_THEIRS", "mc", 1000000, expiry_hours=1)
+        scheduler.flush()
+        on_disk = {a["ca"]: a["triggered"] for a in load_timebased()["333"]}
+        assert on_disk == {"CA_MINE": True, "CA_THEIRS": False}, f"Unexpected: {on_disk}"
+        print("   ✓ Other process's alert kept, trigger saved\n")
+    finally:
+        store.flush()
+        timebased_alerts.TIMEBASED_FILE = original_file
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_timebased_scheduler()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test per-token state shared by every subscriber
+"""
+
+import os
+import tempfile
+
+import store
+import tokens
+import wallet_alert_engine
+from storage import merge_coin_state
+
+
+def test_token_state():
+    """Test seeding, once-per-quote updates, merged saves and normalized coins."""
+    print("🧪 Testing Token State...\n")
+
+    original = (tokens.TOKENS_FILE, store.STORE_DURABILITY)
+    tokens.TOKENS_FILE = os.path.join(tempfile.mkdtemp(), "tokens.json")
+    tokens._store.invalidate()
+    try:
+        # Test 1: Seeded from the per-user fields it replaces
+        print("✅ Test 1: Seed from subscribers")
+        a = {"ca": "CA1", "start_mc": 100, "ath_mc": 500, "low_mc": 80, "avg_volume": 1000}
+        b = {"ca": "CA1", "start_mc": 300, "ath_mc": 900, "low_mc": 250}
+        token = tokens.seed([a, b])
+        assert token == {"ath_mc": 900, "low_mc": 80, "avg_volume": 1000}
+        assert tokens.seed([a], stored={"ath_mc": 1}) == {"ath_mc": 1}, "Saved state wins"
+        print("   ✓ Highest ATH, lowest low\n")
+
+        # Test 2: One update per quote, seen by every subscriber
+        print("✅ Test 2: Shared by subscribers")
+        tokens.record_mc(token, 1200)
+        tokens.record_mc(token, 0)  # bad quote ignored
+        for coin in (a, b):
+            tokens.join(coin, token)
+        assert a["ath_mc"] == b["ath_mc"] == 1200 and a["low_mc"] == b["low_mc"] == 80
+        tokens.record_volume(token, 3100)
+        assert token["avg_volume"] == 1000 + 2100 * 2 / 21
+        print("   ✓ ATH 1200 for both; avg volume moves 2/21 of the way\n")
+
+        # Test 3: Saves touch only the given CAs and keep wallet state
+        print("✅ Test 3: Saving token state")
+        for durability in ("strict", "grouped"):
+            store.STORE_DURABILITY = durability
+            tokens.update_token("CA2", lambda t: t.update(ath_mc=5))
+            tokens.set_wallet_state("CA1", "W1", {"last_signature": "sig1"})
+            tokens.save_token_state({"CA1": token}, ["CA1"])
+            store.flush()
+            assert tokens.get_token("CA1")["ath_mc"] == 1200
+            assert tokens.get_wallet_state("CA1", "W1") == {"last_signature": "sig1"}, "Wallet state kept"
+            assert tokens.get_token("CA2") == {"ath_mc": 5}, "Other CAs untouched"
+            tokens.save_token_state({}, ["CA1", "CA2"])
+            store.flush()
+            assert tokens.load_tokens() == {}
+        print("   ✓ Market fields merged; missing CAs deleted\n")
+
+        # Test 4: User coins keep only their own fields
+        print("✅ Test 4: Normalized coin records")
+        stored = {"coins": [dict(a, history=[{"mc": 1}], wallet_state={}, alerts={"x": 2})]}
+        merge_coin_state(stored, [dict(a, triggered={"x": True}, rev=0)])
+        assert sorted(stored["coins"][0]) == ["alerts", "ca", "start_mc", "triggered"]
+        print("   ✓ ath_mc/low_mc/avg_volume/history/wallet_state dropped\n")
+
+        # Test 5: The wallet engine's last signature lives on the token
+        print("✅ Test 5: Wallet buy dedupe across coin records")
+        engine = (wallet_alert_engine.get_recent_signatures, wallet_alert_engine.get_transaction,
+                  wallet_alert_engine.parse_token_inflow)
+        wallet_alert_engine.get_recent_signatures = lambda wallet, limit: [{"signature": "sig2"}]
+        wallet_alert_engine.get_transaction = lambda sig: {"sig": sig}
+        wallet_alert_engine.parse_token_inflow = lambda tx, wallet, mint: {"delta_tokens": 10, "usd": 500}
+        try:
+            first = wallet_alert_engine.detect_wallet_buys("W1", {"ca": "CA3"})
+            assert first and first["signature"] == "sig2"
+            assert wallet_alert_engine.detect_wallet_buys("W1", {"ca": "CA3"}) is None, "Fresh coin dict, same buy"
+            assert tokens.get_wallet_state("CA3", "W1") == {"last_signature": "sig2"}
+            assert wallet_alert_engine.detect_wallet_buys("W2", {"ca": "CA3"}), "Tracked per wallet"
+        finally:
+            (wallet_alert_engine.get_recent_signatures, wallet_alert_engine.get_transaction,
+             wallet_alert_engine.parse_token_inflow) = engine
+        print("   ✓ Second check of the same buy returns nothing\n")
+    finally:
+        store.flush()
+        tokens.TOKENS_FILE, store.STORE_DURABILITY = original
+        tokens._store.invalidate()
+
+    print("=" * 50)
+    print("✅ ALL TESTS PASSED")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    test_token_state()
@@ -81,8 +81,7 @@ def test_layer_3():
     # Test with USDC mint (just to test structure)
     coin = {
         "ca": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
-        "symbol": "USDC",
-        "wallet_state": {}
+        "symbol": "USDC"
     }
     
     try:
@@ -99,7 +98,7 @@ def test_layer_3():
         # Test deduplication (only if we saw a buy)
         if result:
             print("\n=== Testing Deduplication ===")
-            # Run again - should return None since last_signature is set
+            # Run again - should return None since last_signature is saved
             result2 = detect_wallet_buys(wallet, coin, min_usd=1)
             assert result2 is None, "Deduplication failed (got duplicate)"
         else:
@@ -119,8 +118,7 @@ def test_integration():
     
     coin = {
         "ca": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
-        "symbol": "USDC",
-        "wallet_state": {}
+        "symbol": "USDC"
     }
     
     try:
@@ -1,53 +1,339 @@
-"""Time-based alert system."""
+"""Time-based alert system.
+
+Alerts live in memory, indexed by (user, CA), with a min-heap of expiry
+times so deadlines fire on time without scanning every alert each cycle.
+Triggers are persisted write-behind (see TimeBasedScheduler.flush); user
+changes are written straight through so other processes pick them up.
+Both edit one user's alerts on disk at a time, never the whole file.
+"""
 from datetime import datetime, timedelta
-from typing import Dict, Optional
-import json
-import os
-import fcntl
-import tempfile
-import shutil
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import threading
+import time
+from store import Store
 
 TIMEBASED_FILE = "timebased_alerts.json"
 
+_store = Store("timebased_alerts", lambda: TIMEBASED_FILE)
+
 
 def load_timebased() -> Dict:
-    """Load time-based alerts from JSON file."""
-    if not os.path.exists(TIMEBASED_FILE):
-        return {}
-    
-    try:
-        with open(TIMEBASED_FILE, 'r') as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-            try:
-                data = json.load(f)
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            return data
-    except Exception as e:
-        print(f"⚠️ Error loading timebased alerts: {e}")
-        return {}
+    """Load time-based alerts."""
+    return _store.load()
 
 
 def save_timebased(data: Dict):
-    """Save time-based alerts to JSON file."""
-    try:
-        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(TIMEBASED_FILE) or ".")
-        try:
-            with os.fdopen(fd, "w") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    """Save time-based alerts."""
+    _store.save(data)
+
+
+def _expiry_ts(alert: Dict) -> float:
+    """Epoch expiry for an alert (parsed once, when it's indexed)."""
+    return datetime.fromisoformat(alert["expires_at"]).timestamp()
+
+
+def _alert_key(user_id_str: str, alert: Dict) -> Tuple:
+    """Identity of an alert that survives a reload from disk."""
+    return (user_id_str, alert["ca"], alert["type"], alert.get("created_at"))
+
+
+def _mark_on_disk(user_id_str: str, alerts: Optional[List[Dict]], keys) -> Optional[List[Dict]]:
+    """Set triggered on a user's stored alerts whose _alert_key is in keys."""
+    for alert in alerts or []:
+        if _alert_key(user_id_str, alert) in keys:
+            alert["triggered"] = True
+    return alerts
+
+
+def _target_met(alert: Dict, current_mc: float, start_mc: float) -> Tuple[bool, float]:
+    """Whether the alert's target is met, and the value it was judged on."""
+    if alert["type"] == "2x":
+        current_x = current_mc / start_mc if start_mc > 0 else 1
+        return current_x >= alert["target"], current_x
+    return current_mc >= alert["target"], current_mc
+
+
+EVALUATED_TYPES = ("2x", "mc")  # other types are stored but never fire
+
+
+def _expired_result(alert: Dict, ca: str, actual: float) -> Dict:
+    """TIME EXPIRED alert details."""
+    if alert["type"] == "2x":
+        message = f"⏰ TIME EXPIRED\n\n{ca[:8]}... did not {alert['target']}x in time\n\nCurrent: {actual:.2f}x"
+    else:
+        message = f"⏰ TIME EXPIRED\n\n{ca[:8]}... did not reach ${int(alert['target']):,} MC\n\nCurrent: ${int(actual):,}"
+    
+    return {
+        "type": "time_expired",
+        "subtype": alert["type"],
+        "target": alert["target"],
+        "created_at": alert.get("created_at"),
+        "actual": actual,
+        "message": message
+    }
+
+
+def _target_met_result(alert: Dict, ca: str, actual: float) -> Dict:
+    """TARGET MET alert details."""
+    if alert["type"] == "2x":
+        message = f"🎯 TARGET MET\n\n{ca[:8]}... hit {actual:.2f}x!\n\nTarget: {alert['target']}x"
+    else:
+        message = f"🎯 TARGET MET\n\n{ca[:8]}... hit ${int(actual):,} MC!\n\nTarget: ${int(alert['target']):,}"
+    
+    return {
+        "type": "time_target_met",
+        "subtype": alert["type"],
+        "target": alert["target"],
+        "created_at": alert.get("created_at"),
+        "actual": actual,
+        "message": message
+    }
+
+
+class TimeBasedScheduler:
+    """In-memory time-based alerts with an expiry heap and write-behind saves."""
+    
+    def __init__(self):
+        self.data = {}  # user_id_str -> [alert, ...] (the on-disk layout)
+        self.by_coin = {}  # (user_id_str, ca) -> [(expires_ts, alert), ...] untriggered only
+        self.heap = []  # (expires_ts, seq, user_id_str, ca, alert)
+        self.last_seen = {}  # (user_id_str, ca) -> (current_mc, start_mc)
+        self.pending = set()  # triggers not yet on disk
+        self.file_state = None
+        self.seq = itertools.count()
+        self.lock = threading.RLock()
+        self.loaded = False
+    
+    # ---- persistence ----
+    
+    def _file_state(self):
+        """Changes whenever the alerts are saved (by any process)."""
+        return _store.version()
+    
+    def _index(self):
+        """Rebuild the (user, CA) index and expiry heap from self.data."""
+        self.by_coin = {}
+        self.heap = []
+        
+        for user_id_str, alerts in self.data.items():
+            for alert in alerts:
+                if alert.get("triggered"):
+                    continue
                 try:
-                    json.dump(data, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())
-                finally:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            shutil.move(temp_path, TIMEBASED_FILE)
-        except Exception as e:
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise e
-    except (IOError, OSError) as e:
-        print(f"⚠️ Error saving timebased alerts: {e}")
+                    expires_ts = _expiry_ts(alert)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.by_coin.setdefault((user_id_str, alert["ca"]), []).append((expires_ts, alert))
+                self.heap.append((expires_ts, next(self.seq), user_id_str, alert["ca"], alert))
+        
+        heapq.heapify(self.heap)
+    
+    def refresh(self):
+        """Reload from disk if another process changed the file, keeping unsaved triggers."""
+        with self.lock:
+            state = self._file_state()
+            if self.loaded and state == self.file_state:
+                return
+            
+            self.data = load_timebased()
+            self.file_state = state
+            self.loaded = True
+            
+            for user_id_str, alerts_list in self.data.items():
+                for alert in alerts_list:
+                    if _alert_key(user_id_str, alert) in self.pending:
+                        alert["triggered"] = True
+            
+            self._index()
+    
+    def flush(self):
+        """
+        Write triggers to disk (once per cycle rather than once per alert).
+        
+        Only the triggered alerts change, one user at a time, so alerts
+        other processes added or cleared since we loaded are kept.
+        """
+        with self.lock:
+            if not self.pending:
+                return
+            
+            by_user = {}
+            for key in self.pending:
+                by_user.setdefault(key[0], set()).add(key)
+            for user_id_str, keys in by_user.items():
+                _store.update(user_id_str, lambda alerts, u=user_id_str, k=keys: _mark_on_disk(u, alerts, k))
+            self.pending.clear()
+    
+    def _mark_triggered(self, user_id_str: str, ca: str, alert: Dict):
+        """Retire an alert from the index; it's saved on the next flush."""
+        alert["triggered"] = True
+        self.pending.add(_alert_key(user_id_str, alert))
+        
+        entries = self.by_coin.get((user_id_str, ca))
+        if entries:
+            entries[:] = [entry for entry in entries if entry[1] is not alert]
+            if not entries:
+                del self.by_coin[(user_id_str, ca)]
+    
+    # ---- user changes (write-through) ----
+    
+    def add(self, user_id: int, ca: str, alert_type: str, target_value: float, expiry_hours: int):
+        """Add an alert and save it straight away."""
+        with self.lock:
+            self.refresh()
+            user_id_str = str(user_id)
+            now = datetime.now()
+            
+            alert = {
+                "ca": ca,
+                "type": alert_type,
+                "target": target_value,
+                "expires_at": (now + timedelta(hours=expiry_hours)).isoformat(),
+                "created_at": now.isoformat(),
+                "triggered": False
+            }
+            
+            self.data.setdefault(user_id_str, []).append(alert)
+            expires_ts = _expiry_ts(alert)
+            self.by_coin.setdefault((user_id_str, ca), []).append((expires_ts, alert))
+            heapq.heappush(self.heap, (expires_ts, next(self.seq), user_id_str, ca, alert))
+            _store.update(user_id_str, lambda alerts: (alerts or []) + [dict(alert)])
+    
+    def clear_coin(self, user_id: int, ca: str):
+        """Remove all alerts for a coin and save straight away."""
+        with self.lock:
+            self.refresh()
+            user_id_str = str(user_id)
+            
+            if user_id_str not in self.data:
+                return
+            
+            self.data[user_id_str] = [
+                alert for alert in self.data[user_id_str]
+                if alert["ca"] != ca
+            ]
+            self.by_coin.pop((user_id_str, ca), None)
+            self.last_seen.pop((user_id_str, ca), None)
+            _store.update(user_id_str, lambda alerts: [a for a in alerts or [] if a["ca"] != ca])
+    
+    def active(self, user_id: int) -> List[Dict]:
+        """Untriggered, unexpired alerts for a user."""
+        with self.lock:
+            self.refresh()
+            user_id_str = str(user_id)
+            now = time.time()
+            
+            return [
+                alert
+                for (uid, _), entries in self.by_coin.items() if uid == user_id_str
+                for expires_ts, alert in entries if now < expires_ts
+            ]
+    
+    # ---- evaluation ----
+    
+    def check(self, user_id: int, ca: str, current_mc: float, start_mc: float) -> Optional[Dict]:
+        """
+        Evaluate a coin's alerts against a fresh price.
+        
+        O(1) lookup - only the alerts for this (user, CA) are touched.
+        
+        Returns:
+            Alert details if one should fire/expire, None otherwise
+        """
+        if not self.loaded:
+            self.refresh()
+        
+        with self.lock:
+            key = (str(user_id), ca)
+            self.last_seen[key] = (current_mc, start_mc)
+            
+            entries = self.by_coin.get(key)
+            if not entries:
+                return None
+            
+            now = time.time()
+            for expires_ts, alert in list(entries):
+                if alert["type"] not in EVALUATED_TYPES:
+                    continue
+                
+                met, actual = _target_met(alert, current_mc, start_mc)
+                
+                if now >= expires_ts:
+                    # Deadline passed - expiry reports a miss, a hit was already reported
+                    self._mark_triggered(key[0], ca, alert)
+                    if not met:
+                        return _expired_result(alert, ca, actual)
+                elif met:
+                    self._mark_triggered(key[0], ca, alert)
+                    return _target_met_result(alert, ca, actual)
+            
+            return None
+    
+    def pop_expired(
+        self,
+        now: Optional[float] = None,
+        lookup: Optional[Callable[[str, str], Optional[Tuple[float, float]]]] = None,
+        owns: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, str, Dict]]:
+        """
+        Fire every alert whose deadline has passed, whether or not its coin
+        was checked this cycle.
+        
+        Args:
+            now: Epoch time (default: now)
+            lookup: (user_id_str, ca) -> (current_mc, start_mc), or None to
+                fall back to the last price seen by check()
+            owns: ca -> whether this process is responsible for it (sharded
+                monitors leave other shards' deadlines in the heap)
+        
+        Returns:
+            List of (user_id_str, ca, result) for expiries to send
+        """
+        self.refresh()
+        now = now if now is not None else time.time()
+        fired = []
+        not_ours = []
+        
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                entry = heapq.heappop(self.heap)
+                _, _, user_id_str, ca, alert = entry
+                
+                if owns is not None and not owns(ca):
+                    not_ours.append(entry)
+                    continue
+                
+                # Lazily skip alerts that fired, were cleared or were reloaded
+                entries = self.by_coin.get((user_id_str, ca), [])
+                if alert.get("triggered") or not any(entry[1] is alert for entry in entries):
+                    continue
+                if alert["type"] not in EVALUATED_TYPES:
+                    continue
+                
+                values = (lookup(user_id_str, ca) if lookup else None) or self.last_seen.get((user_id_str, ca))
+                self._mark_triggered(user_id_str, ca, alert)
+                
+                if values is None:
+                    continue  # never priced - nothing meaningful to report
+                
+                met, actual = _target_met(alert, *values)
+                if not met:
+                    fired.append((user_id_str, ca, _expired_result(alert, ca, actual)))
+            
+            for entry in not_ours:
+                heapq.heappush(self.heap, entry)
+        
+        return fired
+
+
+_scheduler = TimeBasedScheduler()
+
+
+def get_scheduler() -> TimeBasedScheduler:
+    """Process-wide scheduler."""
+    return _scheduler
 
 
 def add_timebaased_alert(
@@ -67,25 +353,7 @@ def add_timebaased_alert(
         target_value: Target value for the alert
         expiry_hours: Hours until alert expires
     """
-    data = load_timebased()
-    
-    user_id_str = str(user_id)
-    if user_id_str not in data:
-        data[user_id_str] = []
-    
-    expiry_time = (datetime.now() + timedelta(hours=expiry_hours)).isoformat()
-    
-    alert = {
-        "ca": ca,
-        "type": alert_type,
-        "target": target_value,
-        "expires_at": expiry_time,
-        "created_at": datetime.now().isoformat(),
-        "triggered": False
-    }
-    
-    data[user_id_str].append(alert)
-    save_timebased(data)
+    _scheduler.add(user_id, ca, alert_type, target_value, expiry_hours)
 
 
 def should_alert_timeased(
@@ -100,119 +368,14 @@ def should_alert_timeased(
     Returns:
         Alert details if should fire/expire, None otherwise
     """
-    data = load_timebased()
-    user_id_str = str(user_id)
-    
-    if user_id_str not in data:
-        return None
-    
-    alerts = data[user_id_str]
-    now = datetime.now()
-    
-    for alert in alerts:
-        if alert["ca"] != ca or alert["triggered"]:
-            continue
-        
-        expiry_time = datetime.fromisoformat(alert["expires_at"])
-        
-        # Check if expired
-        if now >= expiry_time:
-            alert_type = alert["type"]
-            
-            # Check if target was NOT met
-            if alert_type == "2x":
-                current_x = current_mc / start_mc if start_mc > 0 else 1
-                if current_x < alert["target"]:
-                    # Target not met
-                    alert["triggered"] = True
-                    save_timebased(data)
-                    
-                    return {
-                        "type": "time_expired",
-                        "subtype": alert_type,
-                        "target": alert["target"],
-                        "actual": current_x,
-                        "message": f"⏰ TIME EXPIRED\n\n{ca[:8]}... did not {alert['target']}x in time\n\nCurrent: {current_x:.2f}x"
-                    }
-            
-            elif alert_type == "mc":
-                if current_mc < alert["target"]:
-                    alert["triggered"] = True
-                    save_timebased(data)
-                    
-                    return {
-                        "type": "time_expired",
-                        "subtype": alert_type,
-                        "target": alert["target"],
-                        "actual": current_mc,
-                        "message": f"⏰ TIME EXPIRED\n\n{ca[:8]}... did not reach ${int(alert['target']):,} MC\n\nCurrent: ${int(current_mc):,}"
-                    }
-        
-        else:
-            # Not expired yet - check if target met
-            if alert_type == "2x":
-                current_x = current_mc / start_mc if start_mc > 0 else 1
-                if current_x >= alert["target"]:
-                    alert["triggered"] = True
-                    save_timebased(data)
-                    
-                    return {
-                        "type": "time_target_met",
-                        "subtype": alert_type,
-                        "target": alert["target"],
-                        "actual": current_x,
-                        "message": f"🎯 TARGET MET\n\n{ca[:8]}... hit {current_x:.2f}x!\n\nTarget: {alert['target']}x"
-                    }
-            
-            elif alert_type == "mc":
-                if current_mc >= alert["target"]:
-                    alert["triggered"] = True
-                    save_timebased(data)
-                    
-                    return {
-                        "type": "time_target_met",
-                        "subtype": alert_type,
-                        "target": alert["target"],
-                        "actual": current_mc,
-                        "message": f"🎯 TARGET MET\n\n{ca[:8]}... hit ${int(current_mc):,} MC!\n\nTarget: ${int(alert['target']):,}"
-                    }
-    
-    return None
+    return _scheduler.check(user_id, ca, current_mc, start_mc)
 
 
 def get_active_timebased(user_id: int) -> list:
     """Get all active (non-triggered, non-expired) time-based alerts for a user."""
-    data = load_timebased()
-    user_id_str = str(user_id)
-    
-    if user_id_str not in data:
-        return []
-    
-    now = datetime.now()
-    active = []
-    
-    for alert in data[user_id_str]:
-        if alert["triggered"]:
-            continue
-        
-        expiry_time = datetime.fromisoformat(alert["expires_at"])
-        if now < expiry_time:
-            active.append(alert)
-    
-    return active
+    return _scheduler.active(user_id)
 
 
 def clear_timebased_for_coin(user_id: int, ca: str):
     """Clear all time-based alerts for a specific coin."""
-    data = load_timebased()
-    user_id_str = str(user_id)
-    
-    if user_id_str not in data:
-        return
-    
-    data[user_id_str] = [
-        alert for alert in data[user_id_str]
-        if alert["ca"] != ca
-    ]
-    
-    save_timebased(data)
+    _scheduler.clear_coin(user_id, ca)
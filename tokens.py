@@ -0,0 +1,128 @@
+"""
+Token State - Market-derived state per CA, shared by every subscriber
+
+TOKEN_FIELDS describe the token, not a user's position in it, so they
+live here keyed by CA instead of on each user's coin. The monitor
+updates a token once per quote however many users track it; user coin
+records keep only their own fields (start_mc, alerts, triggered, paused,
+combo_alerts).
+"""
+
+from typing import Dict, Iterable, List, Optional
+from store import Store
+
+TOKENS_FILE = "tokens.json"
+
+TOKEN_FIELDS = ("ath_mc", "low_mc", "avg_volume", "wallet_state")
+MARKET_FIELDS = ("ath_mc", "low_mc", "avg_volume")  # what alert checks read off a coin
+AVG_VOLUME_SPAN = 20  # quotes averaged by avg_volume (exponential moving average)
+
+_store = Store("tokens", lambda: TOKENS_FILE, binary=True)
+
+def load_tokens() -> Dict:
+    """Every token's state: CA -> fields (a copy to edit)."""
+    return _store.load()
+
+def save_tokens(tokens: Dict):
+    """Save every token's state."""
+    _store.save(tokens)
+
+def get_token(ca: str) -> Dict:
+    """One token's state ({} if it has none yet)."""
+    return dict(_store.get().get(ca) or {})
+
+def update_token(ca: str, change) -> Dict:
+    """
+    Edit one token's state without overwriting concurrent changes.
+
+    Args:
+        change: Edits the state in place ({} for a new token)
+
+    Returns:
+        The token's updated state
+    """
+    def apply(token):
+        token = token or {}
+        change(token)
+        return token
+
+    return _store.update(ca, apply)
+
+def get_wallet_state(ca: str, wallet: str) -> Dict:
+    """Wallet scanner state for one wallet on this token (last_signature)."""
+    return dict((get_token(ca).get("wallet_state") or {}).get(wallet) or {})
+
+def set_wallet_state(ca: str, wallet: str, state: Dict):
+    """Save the wallet scanner's state for one wallet on this token."""
+    def change(token):
+        token.setdefault("wallet_state", {})[wallet] = state
+
+    update_token(ca, change)
+
+def save_token_state(tokens: Dict, cas: Iterable[str]):
+    """
+    Write the monitor's MARKET_FIELDS for these CAs onto their saved
+    state (other fields, like wallet_state, are kept). CAs missing from
+    `tokens` are deleted. Only the given CAs are touched, so sharded
+    monitors never overwrite each other's tokens.
+    """
+    def merge(stored, token):
+        if token is None:
+            return None
+        stored = stored or {}
+        stored.update({field: token[field] for field in MARKET_FIELDS if field in token})
+        return stored
+
+    with _store.batch():
+        for ca in cas:
+            _store.update(ca, lambda stored, token=tokens.get(ca): merge(stored, token))
+
+def seed(coins: List[Dict], stored: Optional[Dict] = None) -> Dict:
+    """
+    A token's state from what's already known.
+
+    Args:
+        coins: Subscribers' coin records - before normalization each
+            carried its own ath_mc/low_mc/avg_volume
+        stored: The token's saved state, if any (wins over the coins)
+    """
+    if stored:
+        return dict(stored)
+
+    token = {}
+    aths = [coin["ath_mc"] for coin in coins if coin.get("ath_mc")]
+    lows = [coin["low_mc"] for coin in coins if coin.get("low_mc")]
+    volumes = [coin["avg_volume"] for coin in coins if coin.get("avg_volume")]
+    if aths:
+        token["ath_mc"] = max(aths)
+    if lows:
+        token["low_mc"] = min(lows)
+    if volumes:
+        token["avg_volume"] = sum(volumes) / len(volumes)
+    return token
+
+def record_mc(token: Dict, mc: float):
+    """Fold a quote's MC into the token's ATH and low."""
+    if mc <= 0:
+        return
+    token["ath_mc"] = max(token.get("ath_mc", mc), mc)
+    token["low_mc"] = min(token.get("low_mc", mc), mc)
+
+def record_volume(token: Dict, volume: float):
+    """Fold a quote's 24h volume into avg_volume (after alerts compared against it)."""
+    if volume <= 0:
+        return
+    avg = token.get("avg_volume")
+    token["avg_volume"] = volume if not avg else avg + (volume - avg) * 2 / (AVG_VOLUME_SPAN + 1)
+
+def join(coin: Dict, token: Dict):
+    """Show the token's MARKET_FIELDS on a user's coin for alert checks (not saved)."""
+    for field in MARKET_FIELDS:
+        if field in token:
+            coin[field] = token[field]
+
+def strip(coin: Dict) -> Dict:
+    """Drop token fields (and the old per-coin history) from a user's coin record."""
+    for field in TOKEN_FIELDS + ("history",):
+        coin.pop(field, None)
+    return coin
@@ -4,9 +4,11 @@ from telegram.ext import ContextTypes
 from storage import load_data
 from wallets import load_wallets
 from lists import load_lists
-from alert_history import load_history
+from alert_history import get_global_stats
 from rate_limiter import api_limiter
 from cache_layer import cache
+from config import MONITOR_MODE
+import metrics
 import os
 
 
@@ -29,7 +31,6 @@ async def show_admin_dashboard(update: Update, context: ContextTypes.DEFAULT_TYP
     data = load_data()
     wallets_data = load_wallets()
     lists_data = load_lists()
-    history_data = load_history()
     
     # User stats
     total_users = len(data)
@@ -39,7 +40,7 @@ async def show_admin_dashboard(update: Update, context: ContextTypes.DEFAULT_TYP
     )
     total_wallets = sum(len(wallets) for wallets in wallets_data.values())
     total_lists = sum(len(lists) for lists in lists_data.values())
-    total_alerts = sum(len(alerts) for alerts in history_data.values())
+    total_alerts = get_global_stats()["total_alerts"]
     
     # API stats
     dex_stats = api_limiter.get_stats("dexscreener")
@@ -143,6 +144,47 @@ async def show_admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"  • Last hour: {stats['requests_last_hour']} req\n"
         text += f"  • Total: {stats['total_requests']} req\n\n"
     
+    # Monitor health (from the in-process metrics registry)
+    cycle = metrics.monitor_cycle_seconds.summary()
+    text += "<b>📡 Monitor:</b>\n"
+    if MONITOR_MODE == "worker":
+        text += "  • Runs as a separate worker - see its /metrics\n"
+    text += f"  • Cycles: {cycle['count']}\n"
+    text += f"  • Last cycle: {cycle['last']:.1f}s (avg {cycle['avg']:.1f}s)\n"
+    text += f"  • Overrun: {metrics.monitor_cycle_lag_seconds.get():.1f}s\n"
+    from core.shedding import SHED_LEVELS
+    shed_level = int(metrics.monitor_shed_level.get())
+    text += f"  • Load shedding: {SHED_LEVELS[shed_level]}\n"
+    shed = {what: int(metrics.monitor_shed_total.get(what=what)) for what in ["history", "meta", "poll"]}
+    if any(shed.values()):
+        text += f"  • Shed: {shed['history']} history, {shed['meta']} lists, {shed['poll']} polls\n"
+    for stage in ["fetch", "evaluate", "format", "deliver"]:
+        stage_stats = metrics.pipeline_stage_seconds.summary(stage=stage)
+        depth = int(metrics.pipeline_queue_depth.get(queue=stage))
+        text += f"  • {stage}: {stage_stats['avg'] * 1000:.0f}ms/item, {depth} queued\n"
+    for phase in ["coins", "meta", "save"]:
+        phase_stats = metrics.monitor_phase_seconds.summary(phase=phase)
+        text += f"  • {phase}: {phase_stats['avg']:.2f}s avg\n"
+    for tier in ["pro", "basic", "free"]:
+        checks = metrics.poll_sla_checks_total.get(tier=tier, result="met") + \
+            metrics.poll_sla_checks_total.get(tier=tier, result="missed")
+        if checks:
+            text += f"  • SLA {tier}: {metrics.poll_sla_attainment.get(tier=tier) * 100:.0f}%\n"
+    text += "\n"
+    
+    text += "<b>🌐 Providers (avg latency):</b>\n"
+    for endpoint in ["dexscreener", "solana_rpc"]:
+        latency = metrics.provider_request_seconds.summary(endpoint=endpoint)
+        text += f"  • {endpoint}: {latency['avg'] * 1000:.0f}ms ({latency['count']} req)\n"
+    text += f"  • Cache hit ratio: {metrics.cache_hit_ratio() * 100:.0f}%\n\n"
+    
+    text += "<b>🔔 Alerts:</b>\n"
+    text += f"  • Generated: {int(metrics.alerts_generated_total.total())}\n"
+    text += f"  • Delivered: {int(metrics.alerts_delivered_total.total())}\n"
+    text += f"  • Messages sent: {int(metrics.messages_sent_total.total())}\n"
+    text += f"  • Send failures: {int(metrics.delivery_failures_total.total())}\n"
+    text += f"  • Event loop lag: {metrics.event_loop_lag_seconds.get() * 1000:.0f}ms\n"
+    
     keyboard = [[InlineKeyboardButton("◀ Back", callback_data="admin_dashboard")]]
     
     await query.message.reply_text(
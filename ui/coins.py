@@ -257,29 +257,20 @@ async def toggle_pause_coin(update: Update, context: ContextTypes.DEFAULT_TYPE,
     query = update.callback_query
     user_id = query.from_user.id
     
-    from storage import load_data, save_data
-    data = load_data()
-    user_id_str = str(user_id)
-    
-    if user_id_str not in data:
-        await query.message.reply_text("❌ Error toggling pause state.")
-        return
-    
-    user_data = data[user_id_str]
-    if isinstance(user_data, dict):
-        coins = user_data.get("coins", [])
-    else:
-        coins = user_data
+    from storage import get_user_coins, update_coin
+    coins = get_user_coins(user_id)
     
     if coin_index >= len(coins):
         await query.message.reply_text("❌ Invalid coin selection.")
         return
     
-    coin = coins[coin_index]
-    current_state = coin.get("paused", False)
-    coin["paused"] = not current_state
+    def toggle_pause(coin):
+        coin["paused"] = not coin.get("paused", False)
     
-    save_data(data)
+    coin = update_coin(user_id, coins[coin_index].get("ca"), toggle_pause)
+    if coin is None:
+        await query.message.reply_text("❌ Error toggling pause state.")
+        return
     
     status = "Paused" if coin["paused"] else "Resumed"
     await query.message.reply_text(f"✅ {status}: {coin.get('ca', '')[:8]}...")
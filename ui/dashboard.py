@@ -3,10 +3,27 @@
 Dashboard UI - Portfolio Overview
 """
 
+import asyncio
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from core import archive
 from core.tracker import Tracker
 
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, width: int = 12) -> str:
+    """Values as a row of block characters (last value of each bucket)."""
+    if len(values) < 2:
+        return ""
+    if len(values) > width:
+        values = [values[(i + 1) * len(values) // width - 1] for i in range(width)]
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[0] * len(values)
+    return "".join(SPARK_CHARS[int((v - low) / (high - low) * (len(SPARK_CHARS) - 1))] for v in values)
+
 
 async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show portfolio dashboard."""
@@ -29,7 +46,10 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Show loading message for API calls
     loading_msg = await query.message.reply_text("⏳ Calculating portfolio...")
     
-    from mc import get_market_cap
+    from core.snapshot import get_quotes
+    
+    # One quote per coin, shared by the totals and the leaderboard
+    quotes = await asyncio.to_thread(get_quotes, [coin.get("ca", "") for coin in coins])
     
     text = "📊 Portfolio Dashboard\n"
     text += "━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
@@ -43,11 +63,10 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ca = coin.get("ca", "")
         start_mc = coin.get("start_mc", 0)
         
-        token = get_market_cap(ca)
-        if not token or not token.get("mc"):
+        current_mc = quotes.mc(ca)
+        if not current_mc:
             continue
         
-        current_mc = token["mc"]
         total_invested += start_mc
         total_current += current_mc
         
@@ -74,11 +93,10 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ca = coin.get("ca", "")
         start_mc = coin.get("start_mc", 0)
         
-        token = get_market_cap(ca)
-        if not token or not token.get("mc"):
+        current_mc = quotes.mc(ca)
+        if not current_mc:
             continue
         
-        current_mc = token["mc"]
         multiple = current_mc / start_mc if start_mc > 0 else 1
         
         performance_list.append({
@@ -90,12 +108,22 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Sort by performance
     performance_list.sort(key=lambda x: x["multiple"], reverse=True)
     
+    # Last 24h of archived quotes for the top 3
+    since = time.time() - 86400
+    top = performance_list[:3]
+    charts = await asyncio.gather(*(
+        asyncio.to_thread(archive.scan, perf["ca"], since) for perf in top
+    ))
+    
     text += "🏆 Top Performers:\n"
-    for i, perf in enumerate(performance_list[:3], 1):
+    for i, (perf, chart) in enumerate(zip(top, charts), 1):
         ca = perf["ca"]
         mult = perf["multiple"]
         emoji = "🟢" if mult >= 1 else "🔴"
         text += f"{i}. {emoji} {ca[:6]}...{ca[-4:]} - {mult:.2f}x\n"
+        spark = sparkline(chart["mc"])
+        if spark:
+            text += f"   {spark} 24h\n"
     
     keyboard = [
         [InlineKeyboardButton("🔄 Refresh Data", callback_data="menu_dashboard")],
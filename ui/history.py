@@ -1,17 +1,25 @@
 """UI for viewing alert history."""
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from alert_history import get_user_history, get_history_stats
+from alert_history import query_history, get_history_stats
 from datetime import datetime
+from typing import Optional
 
+PAGE_SIZE = 10
 
-async def show_alert_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show alert history dashboard."""
+
+async def show_alert_history(update: Update, context: ContextTypes.DEFAULT_TYPE, cursor: Optional[str] = None):
+    """
+    Show alert history dashboard.
+    
+    Args:
+        cursor: From the previous page's "Older" button
+    """
     query = update.callback_query
     user_id = query.from_user.id
     
     stats = get_history_stats(user_id)
-    recent = get_user_history(user_id, limit=10)
+    recent, next_cursor = query_history(user_id, page_size=PAGE_SIZE, cursor=cursor)
     
     text = "📊 Alert History\n\n"
     
@@ -30,7 +38,7 @@ async def show_alert_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Recent alerts
     if recent:
-        text += "Recent Alerts (10 max):\n\n"
+        text += f"{'Older' if cursor else 'Recent'} Alerts ({PAGE_SIZE} max):\n\n"
         for alert in recent:
             timestamp = datetime.fromisoformat(alert['timestamp'])
             time_str = timestamp.strftime("%m/%d %H:%M")
@@ -56,6 +64,8 @@ async def show_alert_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
         [InlineKeyboardButton("🗑️ Clear History", callback_data="history_clear")],
         [InlineKeyboardButton("◀ Back", callback_data="menu_home")]
     ]
+    if next_cursor:
+        keyboard.insert(0, [InlineKeyboardButton("⏪ Older", callback_data=f"history_page_{next_cursor}")])
     
     await query.message.reply_text(
         text,
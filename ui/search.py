@@ -97,24 +97,20 @@ async def pause_all_coins(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
     
-    from storage import load_data, save_data
-    data = load_data()
-    user_id_str = str(user_id)
+    from storage import get_user_coins, update_user
+    coins = get_user_coins(user_id)
     
-    if user_id_str not in data:
+    if not coins:
         await query.message.reply_text("No coins to pause.")
         return
     
-    user_data = data[user_id_str]
-    coins = user_data.get("coins", []) if isinstance(user_data, dict) else user_data
+    count = sum(1 for coin in coins if not coin.get("paused", False))
     
-    count = 0
-    for coin in coins:
-        if not coin.get("paused", False):
+    def set_paused(user_data):
+        for coin in user_data["coins"]:
             coin["paused"] = True
-            count += 1
     
-    save_data(data)
+    update_user(user_id, set_paused)
     
     await query.message.reply_text(f"✅ Paused {count} coin(s)")
 
@@ -124,24 +120,20 @@ async def resume_all_coins(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user_id = query.from_user.id
     
-    from storage import load_data, save_data
-    data = load_data()
-    user_id_str = str(user_id)
+    from storage import get_user_coins, update_user
+    coins = get_user_coins(user_id)
     
-    if user_id_str not in data:
+    if not coins:
         await query.message.reply_text("No coins to resume.")
         return
     
-    user_data = data[user_id_str]
-    coins = user_data.get("coins", []) if isinstance(user_data, dict) else user_data
+    count = sum(1 for coin in coins if coin.get("paused", False))
     
-    count = 0
-    for coin in coins:
-        if coin.get("paused", False):
+    def set_paused(user_data):
+        for coin in user_data["coins"]:
             coin["paused"] = False
-            count += 1
     
-    save_data(data)
+    update_user(user_id, set_paused)
     
     await query.message.reply_text(f"✅ Resumed {count} coin(s)")
 
@@ -168,23 +160,18 @@ async def delete_all_coins_confirmed(update: Update, context: ContextTypes.DEFAU
     query = update.callback_query
     user_id = query.from_user.id
     
-    from storage import load_data, save_data
-    data = load_data()
-    user_id_str = str(user_id)
+    from storage import get_user_coins, update_user
+    coins = get_user_coins(user_id)
     
-    if user_id_str not in data:
+    if not coins:
         await query.message.reply_text("No coins to delete.")
         return
     
-    user_data = data[user_id_str]
+    count = len(coins)
     
-    if isinstance(user_data, dict):
-        count = len(user_data.get("coins", []))
+    def clear_coins(user_data):
         user_data["coins"] = []
-    else:
-        count = len(user_data)
-        data[user_id_str] = []
     
-    save_data(data)
+    update_user(user_id, clear_coins)
     
     await query.message.reply_text(f"✅ Deleted {count} coin(s)")
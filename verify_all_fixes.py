@@ -121,8 +121,9 @@ try:
     test_user = "test_verification_9999999"
     
     # These should not crash even with no data
+    from collections.abc import Mapping
     data = load_data()
-    assert isinstance(data, dict), "load_data should return dict"
+    assert isinstance(data, Mapping), "load_data should return a mapping (lazy view of user files)"
     
     wallets = load_wallets()
     assert isinstance(wallets, dict), "load_wallets should return dict"
@@ -174,13 +175,14 @@ except Exception as e:
 # Test 9: File locking and atomic writes
 print("\n✅ Test 9: Atomic writes and file locking implemented")
 try:
-    import storage
+    import store
     import inspect
     
-    source = inspect.getsource(storage.save_data)
+    # Every storage module writes through the shared store backend
+    source = inspect.getsource(store.JSONBackend.save)
     
     assert "fcntl.flock" in source, "Should use file locking"
-    assert ".tmp" in source, "Should use temp files for atomic writes"
+    assert "mkstemp" in source, "Should use temp files for atomic writes"
     assert "os.replace" in source, "Should use os.replace for atomic swap"
     
     print("   ✓ Storage operations are thread-safe and atomic")
@@ -14,32 +14,20 @@ try:
     from lists import save_lists, load_lists
     from groups import save_groups, load_groups
     
-    # Check that all have the new imports
+    # All JSON files are written by the shared store backend
     import inspect
+    from store import JSONBackend
     
-    storage_code = inspect.getsource(save_data)
-    assert "tempfile" in storage_code, "storage.py missing atomic write"
-    assert "fcntl" in storage_code, "storage.py missing file locking"
+    store_code = inspect.getsource(JSONBackend.save)
+    assert "tempfile" in store_code, "store.py missing atomic write"
+    assert "fcntl" in store_code, "store.py missing file locking"
     
-    print("   ✓ storage.py uses atomic writes + file locking")
+    print("   ✓ store.py uses atomic writes + file locking")
     
-    wallets_code = inspect.getsource(save_wallets)
-    assert "tempfile" in wallets_code, "wallets.py missing atomic write"
-    assert "fcntl" in wallets_code, "wallets.py missing file locking"
-    
-    print("   ✓ wallets.py uses atomic writes + file locking")
-    
-    lists_code = inspect.getsource(save_lists)
-    assert "tempfile" in lists_code, "lists.py missing atomic write"
-    assert "fcntl" in lists_code, "lists.py missing file locking"
-    
-    print("   ✓ lists.py uses atomic writes + file locking")
-    
-    groups_code = inspect.getsource(save_groups)
-    assert "tempfile" in groups_code, "groups.py missing atomic write"
-    assert "fcntl" in groups_code, "groups.py missing file locking"
-    
-    print("   ✓ groups.py uses atomic writes + file locking")
+    for name, save in [("storage.py", save_data), ("wallets.py", save_wallets),
+                       ("lists.py", save_lists), ("groups.py", save_groups)]:
+        assert "_store.save" in inspect.getsource(save), f"{name} bypasses the store"
+        print(f"   ✓ {name} saves through the store")
     
 except Exception as e:
     print(f"   ✗ Atomic write verification failed: {e}")
@@ -107,17 +95,13 @@ except Exception as e:
 # Test 5: Verify retry logic exists
 print("\n✅ Test 5: Retry Logic")
 try:
-    storage_load = inspect.getsource(load_data)
-    assert "for attempt in range" in storage_load, "storage.py missing retry logic"
-    
-    wallets_load = inspect.getsource(load_wallets)
-    assert "for attempt in range" in wallets_load, "wallets.py missing retry logic"
-    
-    lists_load = inspect.getsource(load_lists)
-    assert "for attempt in range" in lists_load, "lists.py missing retry logic"
+    from store import JSONBackend
+    store_load = inspect.getsource(JSONBackend.load)
+    assert "for attempt in range" in store_load, "store.py missing retry logic"
     
-    groups_load = inspect.getsource(load_groups)
-    assert "for attempt in range" in groups_load, "groups.py missing retry logic"
+    for name, load in [("storage.py", load_data), ("wallets.py", load_wallets),
+                       ("lists.py", load_lists), ("groups.py", load_groups)]:
+        assert "_store.load" in inspect.getsource(load), f"{name} bypasses the store"
     
     print("   ✓ All storage modules have retry logic for concurrent access")
     
@@ -133,7 +117,7 @@ try:
     # Verify function exists
     code = inspect.getsource(update_group_coin_triggered)
     assert "coin[\"triggered\"] = triggered" in code, "Missing triggered state update"
-    assert "save_groups(data)" in code, "Missing save after update"
+    assert "_store.save(data, group_id)" in code, "Missing save after update"
     
     # Verify coins are initialized with triggered state
     add_code = inspect.getsource(add_coin_to_group)
@@ -6,7 +6,8 @@ Production-grade wallet buy detection with:
 - Tracked wallet + tracked coin (mint) matching
 - Token inflow detection via RPC
 - USD size calculation
-- Deduplication via last_signature tracking
+- Deduplication via last_signature tracking (per token and wallet, in
+  tokens.py, so every subscriber and restart shares it)
 - Zero spam, zero duplicates, zero guessing
 
 Returns alert dict ONLY when ALL conditions met:
@@ -20,6 +21,7 @@ Returns alert dict ONLY when ALL conditions met:
 import time
 import requests
 from typing import Dict, Optional
+import tokens
 from wallet_scanner import get_recent_signatures
 from wallet_parser import get_transaction, parse_token_inflow
 from price import get_token_price_usd
@@ -31,21 +33,20 @@ def detect_wallet_buys(wallet: str, coin: Dict, min_usd: float = 300) -> Optiona
     
     Args:
         wallet: Wallet address to monitor
-        coin: Coin dict with 'ca' (mint), 'wallet_state', etc.
+        coin: Coin dict with 'ca' (mint)
         min_usd: Minimum buy size in USD
     
     Returns:
         Alert dict with signature, amount, usd, price OR None
     """
     try:
-        # Get last seen signature for deduplication
-        wallet_state = coin.setdefault("wallet_state", {})
-        last_sig = wallet_state.get("last_signature")
-        
         mint = coin.get("ca")
         if not mint:
             return None
         
+        # Get last seen signature for deduplication
+        last_sig = tokens.get_wallet_state(mint, wallet).get("last_signature")
+        
         # Layer 1: Fetch recent signatures
         sigs = get_recent_signatures(wallet, limit=5)
         
@@ -84,7 +85,7 @@ def detect_wallet_buys(wallet: str, coin: Dict, min_usd: float = 300) -> Optiona
                 continue
             
             # SUCCESS - Update last seen signature
-            wallet_state["last_signature"] = sig
+            tokens.set_wallet_state(mint, wallet, {"last_signature": sig})
             
             return {
                 "signature": sig,
@@ -120,10 +121,9 @@ def detect_new_buys(
     limit: int = 10
 ) -> list:
     """Legacy function for backward compatibility."""
-    coin = {
-        "ca": mint,
-        "wallet_state": {"last_signature": last_signature}
-    }
+    if last_signature:
+        tokens.set_wallet_state(mint, wallet, {"last_signature": last_signature})
+    coin = {"ca": mint}
     result = detect_wallet_buys(wallet, coin, min_buy_usd)
     return [result] if result else []
 
@@ -141,8 +141,7 @@ if __name__ == "__main__":
     # Test with mock coin structure
     coin = {
         "ca": mint,
-        "symbol": "TEST",
-        "wallet_state": {}
+        "symbol": "TEST"
     }
     
     result = detect_wallet_buys(wallet, coin, min_usd)